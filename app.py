@@ -1,236 +1,111 @@
+import os
+import json
+import time
+import atexit
 import random
-import typing as t
-
-from tasker.bots import Bot
-from tasker.drivers import DRIVERS
+import asyncio
+import functools
+
+from tasker.bots import AsyncBot
+from tasker.drivers import breakers, limiters
+from tasker.gateway import ExecutionGateway
+from tasker.execution import ExecutionContext
+from tasker.metrics import create_seconds, registry
+from tasker.profiler import Profiler
+from tasker.registry import BotRegistry
+from tasker.snapshot import Snapshot, SnapshotError
+from tasker.utils import daemon_task
+from tasker.compiler import compile_node, bind_action
+from tasker.templates import templates
 from starlette.requests import Request
 from starlette.websockets import WebSocket
-from starlette.responses import JSONResponse
+from starlette.responses import JSONResponse, PlainTextResponse
 from starlette.applications import Starlette
 
 app = Starlette()
-bots: t.Mapping[str, Bot] = {}
-
-casts = {
-    "string": lambda i: str(i),
-    "number": lambda i: int(i),
-    "decimal": lambda i: float(i),
-    "boolean": lambda i: bool(i),
-}
+MAX_BATCH_WORKERS = 32
+MAX_GATEWAY_WORKERS = 32
+MAX_PROFILE_SECONDS = 60
+
+# At most MAX_BOTS bots are kept built; the least recently used ones, and
+# the ones idle for BOT_IDLE_SECONDS, are evicted down to their definition
+# and data and rebuilt when next looked up.
+MAX_BOTS = int(os.environ["TASKER_MAX_BOTS"]) if os.environ.get("TASKER_MAX_BOTS") else None
+BOT_IDLE_SECONDS = (
+    float(os.environ["TASKER_BOT_IDLE_SECONDS"])
+    if os.environ.get("TASKER_BOT_IDLE_SECONDS") else None
+)
+
+# Snapshots of every bot's definition and data are written to this file
+# every SNAPSHOT_INTERVAL seconds and on exit, and read back on startup.
+SNAPSHOT_PATH = os.environ.get("TASKER_SNAPSHOT")
+SNAPSHOT_INTERVAL = float(os.environ.get("TASKER_SNAPSHOT_INTERVAL", 60))
+
+gateway = ExecutionGateway(max_workers=MAX_GATEWAY_WORKERS)
+bots = BotRegistry(
+    lambda bot_data: create_bot_from_data(bot_data),
+    max_bots=MAX_BOTS,
+    idle_seconds=BOT_IDLE_SECONDS,
+    in_use=lambda bot: gateway.busy(bot),
+)
+
+
+def pinned(handler):
+    # Keeps the bot of the path built for the whole request: a bot evicted
+    # mid-handler would lose the handler's writes to a stale rebuilt copy.
+    @functools.wraps(handler)
+    async def wrapper(connection):
+        with bots.pin(connection.path_params.get("bot_id")):
+            return await handler(connection)
+
+    return wrapper
 
 
 def genarate_bot_id():
     return "bot_" + "".join([str(random.randint(0, 9)) for _ in range(5)])
 
 
-def evaluate_exec(value, context):
+def create_bot_from_data(bot_data):
+    started = time.perf_counter()
+    bot = templates.get(bot_data).create(
+        bot_data.get("data", {}), bot_data.get("config"), AsyncBot,
+        bot_data.get("name")
+    )
+    bot.definition = bot_data
+    create_seconds.observe(
+        (bot_data.get("compiler", "closures"),), time.perf_counter() - started
+    )
+    return bot
 
-    def exec_handle(*__, **kwargs):
-        action = value.get("action")
-        macro = value.get("macro")
-        args = value.get("args")
-        store = value.get("store")
-        returns = value.get("returns")
-        return_value = None
 
-        if not action and not macro:
-            return_value = evaluate(value, {**context, "args": kwargs})
+@app.route("/")
+def index_page(request: Request):
+    index = {}
+    for bot_id in bots:
+        try:
+            data, actions = bots.peek(bot_id)
+        except KeyError:
+            continue
+        index[bot_id] = {"data": data, "actions": actions}
 
-        if args:
-            args = evaluate(args, {**context, "args": kwargs})
-        else:
-            args = {}
+    return JSONResponse({"bots": index})
 
-        if action:
-            if "driver" in value:
-                if value["driver"] == True:
-                    driver = context["bot"].drivers.get(
-                        context["bot"].default_driver)
-                else:
-                    driver = context["bot"].drivers.get(value["driver"])
-                action = getattr(driver, action)
-            else:
-                action = context["bot"].actions.get(action)
-
-            if action:
-                return_value = action(**args)
-
-        if macro:
-            macro = context["bot"].macros.get(macro)
-            if macro:
-                return_value = macro(**args)
-
-        if store:
-            store_splits = store.split(".")
-
-            if len(store_splits) > 1:
-                # print(context)
-                target = context.get(store_splits[0])
-                for split in store_splits[1:-1]:
-                    if isinstance(target, dict):
-                        target = target.get(split)
-                    else:
-                        target = getattr(target, split)
-            else:
-                target = context
-
-            if isinstance(target, dict):
-                target[store_splits[-1]] = return_value
-            else:
-                setattr(target, store_splits[-1], return_value)
-
-        if returns:
-            return evaluate(returns, context)
-
-    return exec_handle
-
-
-def evaluate_if(value: t.Mapping, context: t.Mapping):
-    condition = evaluate(value.get("$$if"), context)
-    otherwise = value.get("$$else")
-    then = value.get("$$then")
-
-    if condition:
-        return evaluate(then, context)
-    else:
-        return evaluate(otherwise, context)
 
+@app.route("/metrics")
+def metrics(request: Request):
+    return PlainTextResponse(
+        registry.render(), media_type="text/plain; version=0.0.4"
+    )
 
-def evaluate_if_shorthand(value: t.Mapping, context: t.Mapping):
-    condition = evaluate(value.get("$$?"), context)
-    otherwise = value.get("$$:")
 
-    if condition:
-        return condition
-    else:
-        return evaluate(otherwise, context)
-
-
-def evaluate_macro(action: t.Mapping, bot: Bot):
-    macro = action.get("$$macro")
-    target = bot.macros.get(macro.get("target"))
-
-    def macro_handle(**kwargs):
-        args = macro.get("args")
-        if args:
-            args = evaluate(args, {"bot": bot, "args": kwargs})
-        else:
-            args = {}
-
-        if target:
-            return target(**args)
-
-    return macro_handle
-
-
-def evaluate(data: t.Any, context: t.Mapping) -> t.Mapping:
-    if not data:
-        return data
-
-    _ = lambda i, ctx=None: evaluate(i, {**context, **(ctx or {})})
-
-    if isinstance(data, str) and data.startswith("$$"):
-        splits = data.lstrip("$$").split(".")
-        value = context.get(splits[0]) or (context["bot"].data.get(splits[0])
-                                           if "bot" in context else None)
-
-        if not value:
-            return None
-
-        for split in splits[1:]:
-            if isinstance(value, dict):
-                value = value.get(split)
-            else:
-                value = getattr(value, split, None)
-            if not value:
-                break
-
-        return value
-    elif isinstance(data, list):
-        return [_(item) for item in data]
-    elif isinstance(data, dict):
-        fixed_data = {}
-        for key, value in data.items():
-            if key == "$$exec" and isinstance(value, dict):
-                fixed_data[key] = evaluate_exec(value, context)
-            elif key == "$$execs" and isinstance(value, list):
-                funcs = [_(item) for item in value]
-
-                def execs(*_, **kwargs):
-                    for func in funcs:
-                        func(**{**context, **kwargs})
-
-                fixed_data[key] = execs
-            elif key == "$$join" and isinstance(value, list):
-                return "".join(_(item) for item in value)
-            elif key == "$$cast" and isinstance(value, str):
-                target = _(data.get("target"))
-                cast = _(data.get("$$cast"))
-
-                return casts.get(cast)(target)
-            elif key == "$$assert":
-                assert evaluate(value, context), _(data.get("$$message")) or ""
-                return None
-            elif key == "$$if" and "$$then" in data:
-                return evaluate_if(data, context)
-            elif key == "$$?" and "$$:" in data:
-                return evaluate_if_shorthand(data, context)
-            else:
-                fixed_data[key] = evaluate(value, context)
-        return fixed_data
-    return data
+@app.route("/breakers")
+def circuit_breakers(request: Request):
+    return JSONResponse({"breakers": breakers.stats()})
 
 
-def create_bot_from_data(bot_data):
-    bot_config = {"default_driver": None, "drivers": {}, "macros": {}}
-
-    for driver_config in bot_data.get("drivers", []):
-        driver_class = DRIVERS.get(driver_config["driver"])
-        if not driver_class:
-            continue
-        driver_name = driver_config.get("name")
-        driver = driver_class(**driver_config.get("config", {}))
-        if driver_config.get("default"):
-            bot_config["default_driver"] = driver_name
-        bot_config["drivers"][driver_name] = driver
-
-    bot = Bot(**bot_config)
-    bot.data.update(**bot_data.get("data", {}))
-
-    for macro_name, macro in bot_data.get("macros", {}).items():
-        macro = evaluate(macro, {"bot": bot})
-        if isinstance(macro, dict):
-            if "$$exec" in macro:
-                macro = macro.get("$$exec")
-            elif "$$execs" in macro:
-                macro = macro.get("$$execs")
-        bot.macros[macro_name] = macro
-
-    for action_name, action in bot_data.get("actions", {}).items():
-        action = evaluate(action, {"bot": bot})
-
-        if isinstance(action, dict):
-            if "$$exec" in action:
-                action = action.get("$$exec")
-            elif "$$execs" in action:
-                action = action.get("$$execs")
-            elif "$$macro" in action:
-                action = evaluate_macro(action, bot)
-        bot.add_action(action_name, action)
-    return bot
-
-
-@app.route("/")
-def index_page(request: Request):
-    return JSONResponse({
-        "bots": {
-            bot_id: {
-                "data": bot.data,
-                "actions": list(bot.actions.keys())
-            }
-            for (bot_id, bot) in bots.items()
-        }
-    })
+@app.route("/limiters")
+def driver_limiters(request: Request):
+    return JSONResponse({"limiters": limiters.stats()})
 
 
 @app.route("/bots/create", methods=["POST"])
@@ -240,6 +115,7 @@ async def create_bot(request: Request):
 
     try:
         bot = create_bot_from_data(bot_data)
+        bot.name = bot_id
         bots[bot_id] = bot
     except Exception as e:
         return JSONResponse({
@@ -251,6 +127,7 @@ async def create_bot(request: Request):
 
 
 @app.route("/bots/{bot_id}/start/", methods=["POST"])
+@pinned
 async def start_bot(request: Request):
     bot_id = request.path_params.get("bot_id")
     bot = bots.get(bot_id)
@@ -263,6 +140,7 @@ async def start_bot(request: Request):
 
 
 @app.route("/bots/{bot_id}/data/", methods=["GET", "POST"])
+@pinned
 async def bot_data(request: Request):
     bot_id = request.path_params.get("bot_id")
     bot = bots.get(bot_id)
@@ -273,10 +151,14 @@ async def bot_data(request: Request):
             "args": ["Invalid 'bot_id'."]
         })
 
+    if request.method == "POST":
+        bot.data.update(await request.json())
+
     return JSONResponse({"bot_id": bot_id, "data": bot.data})
 
 
 @app.route("/bots/{bot_id}/status/", methods=["POST"])
+@pinned
 async def bot_status(request: Request):
     bot_id = request.path_params.get("bot_id")
     bot = bots.get(bot_id)
@@ -289,52 +171,39 @@ async def bot_status(request: Request):
 
 
 @app.route("/bots/{bot_id}/trigger", methods=["POST"])
+@pinned
 async def bot_trigger(request: Request):
     bot_id = request.path_params.get("bot_id")
     bot = bots.get(bot_id)
 
-    errors = []
-    returns = []
-
     if not bot:
         return JSONResponse({
             "error": "ValueError",
             "args": ["Invalid 'bot_id'."]
         })
 
-    @bot.on("action.execute:error")
-    def error_handler(action, exception):
-        errors.append({
-            "action": action,
-            "error": exception.__class__.__name__,
-            "args": exception.args,
-        })
-
-    @bot.on("action.execute:value")
-    def value_handler(action, return_value):
-        returns.append({"action": action, "value": return_value})
+    execution = ExecutionContext()
 
     try:
-        bot.execute(await request.json())
+        await gateway.run(
+            bot, bot.execute, await request.json(), execution=execution
+        )
     except RuntimeError:
         pass
 
-    bot.off("action.execute:value", value_handler)
-    bot.off("action.execute:error", error_handler)
-
     return JSONResponse({
-        "success": len(errors) == 0,
+        "success": execution.success,
         "data": bot.data,
-        "errors": errors,
-        "values": returns
+        "errors": execution.errors,
+        "values": execution.values,
+        "timings": execution.timings
     })
 
 
-@app.websocket_route("/bots/{bot_id}/watch/")
-async def watch_bot(websocket: WebSocket):
-    await websocket.accept()
-
-    bot_id = websocket.path_params.get("bot_id")
+@app.route("/bots/{bot_id}/trigger/batch", methods=["POST"])
+@pinned
+async def bot_trigger_batch(request: Request):
+    bot_id = request.path_params.get("bot_id")
     bot = bots.get(bot_id)
 
     if not bot:
@@ -343,58 +212,164 @@ async def watch_bot(websocket: WebSocket):
             "args": ["Invalid 'bot_id'."]
         })
 
-    @bot.on("action.execute:error")
-    async def error_handler(action, exception):
-        await websocket.send_json({
-            "type": "error",
-            "value": {
-                "action": action,
-                "error": exception.__class__.__name__,
-                "args": exception.args,
-            }
-        })
+    if "ndjson" in request.headers.get("content-type", ""):
+        contexts = [
+            json.loads(line)
+            for line in (await request.body()).decode().splitlines()
+            if line.strip()
+        ]
+    else:
+        contexts = await request.json()
 
-    @bot.on("action.execute:value")
-    async def value_handler(action, return_value):
-        await websocket.send_json({
-            "type": "return",
-            "value": {
-                "action": action,
-                "value": return_value
-            }
+    if not isinstance(contexts, list):
+        return JSONResponse({
+            "error": "ValueError",
+            "args": ["Expected a list of contexts."]
         })
 
-    @bot.on("action.execute")
-    async def execute_handler(action, success):
-        await websocket.send_json({
-            "type": "execute",
-            "value": {
-                "action": action,
-                "success": success
-            }
-        })
+    try:
+        workers = min(int(request.query_params.get("workers", 1)), MAX_BATCH_WORKERS)
+    except ValueError:
+        workers = 1
 
-    @bot.on("action.execute:before")
-    async def before_handler(action, function):
-        await websocket.send_json({
-            "type": "execute",
-            "value": {
-                "action": action
-            }
+    rows = await gateway.run(bot, bot.execute_batch, contexts, max_workers=workers)
+
+    return JSONResponse({
+        "success": all(row["success"] for row in rows),
+        "rows": rows
+    })
+
+
+@app.route("/bots/{bot_id}/profile")
+@pinned
+async def profile_bot(request: Request):
+    bot_id = request.path_params.get("bot_id")
+    bot = bots.get(bot_id)
+
+    if not bot:
+        return JSONResponse({
+            "error": "ValueError",
+            "args": ["Invalid 'bot_id'."]
         })
 
     try:
-        bot.execute(await websocket.receive_json())
-    except RuntimeError:
-        pass
+        seconds = float(request.query_params.get("seconds", 10))
+    except ValueError:
+        seconds = 10
+    seconds = min(max(seconds, 0), MAX_PROFILE_SECONDS)
+
+    profiler = Profiler(bot)
+    profiler.start()
+    try:
+        await asyncio.sleep(seconds)
     finally:
-        bot.off("action.execute", execute_handler)
-        bot.off("action.execute:value", value_handler)
-        bot.off("action.execute:error", error_handler)
-        bot.off("action.execute:before", before_handler)
+        profiler.stop()
+
+    return PlainTextResponse(profiler.collapsed())
+
+
+@app.websocket_route("/bots/{bot_id}/watch/")
+@pinned
+async def watch_bot(websocket: WebSocket):
+    await websocket.accept()
+
+    bot_id = websocket.path_params.get("bot_id")
+    bot = bots.get(bot_id)
+
+    if not bot:
+        return JSONResponse({
+            "error": "ValueError",
+            "args": ["Invalid 'bot_id'."]
+        })
+
+    # Listeners of a synchronous bot run on a gateway worker; hand their
+    # messages back to this loop in the order they were sent.
+    loop = asyncio.get_running_loop()
+    messages = asyncio.Queue()
+
+    def send(message):
+        loop.call_soon_threadsafe(messages.put_nowait, message)
+
+    context = await websocket.receive_json()
+
+    # Listen only while holding the bot, so other clients' executions of it
+    # never reach this socket.
+    async with gateway.lock(bot):
+        @bot.on("action.execute:error")
+        def error_handler(action, exception):
+            send({
+                "type": "error",
+                "value": {
+                    "action": action,
+                    "error": exception.__class__.__name__,
+                    "args": exception.args,
+                }
+            })
+
+        @bot.on("action.execute:value")
+        def value_handler(action, return_value):
+            send({
+                "type": "return",
+                "value": {
+                    "action": action,
+                    "value": return_value
+                }
+            })
+
+        @bot.on("action.execute")
+        def execute_handler(action, success):
+            send({
+                "type": "execute",
+                "value": {
+                    "action": action,
+                    "success": success
+                }
+            })
+
+        @bot.on("action.execute:before")
+        def before_handler(action, function):
+            send({
+                "type": "execute",
+                "value": {
+                    "action": action
+                }
+            })
+
+        @bot.on("action.execute:cached")
+        def cached_handler(action):
+            send({
+                "type": "cached",
+                "value": {
+                    "action": action
+                }
+            })
+
+        try:
+            execution = asyncio.ensure_future(gateway.call(bot.execute, context))
+
+            while not execution.done() or not messages.empty():
+                message = asyncio.ensure_future(messages.get())
+                await asyncio.wait(
+                    {message, execution}, return_when=asyncio.FIRST_COMPLETED
+                )
+                if message.done():
+                    await websocket.send_json(message.result())
+                else:
+                    message.cancel()
+
+            execution.result()
+        except RuntimeError:
+            pass
+        finally:
+            bot.off("action.execute:before", before_handler)
+            bot.off("action.execute", execute_handler)
+            bot.off("action.execute:value", value_handler)
+            bot.off("action.execute:error", error_handler)
+            bot.off("action.execute:cached", cached_handler)
 
 
 @app.route("/bots/{bot_id}/add_action", methods=["POST"])
+@pinned
 async def add_action(request: Request):
     bot_id = request.path_params.get("bot_id")
 
@@ -407,21 +382,24 @@ async def add_action(request: Request):
         })
 
     bot_data = await request.json()
-    action = evaluate(bot_data.get("action"), {"bot": bot})
-
-    if isinstance(action, dict):
-        if "$$exec" in action:
-            action = action.get("$$exec")
-        elif "$$execs" in action:
-            action = action.get("$$execs")
-        elif "$$macro" in action:
-            action = evaluate_macro(action, bot)
+    action = bind_action(compile_node(bot_data.get("action")), bot)
     bot.add_action(bot_data.get("name"), action)
+    # Keep the action when the bot is evicted or snapshotted.
+    definition = getattr(bot, "definition", None)
+    if definition is not None:
+        bot.definition = {
+            **definition,
+            "actions": {
+                **definition.get("actions", {}),
+                bot_data.get("name"): bot_data.get("action"),
+            },
+        }
 
     return JSONResponse({"success": True})
 
 
 @app.route("/bots/{bot_id}/remove_action/<action>", methods=["POST"])
+@pinned
 async def remove_action(request: Request):
     bot_id = request.path_params.get("bot_id")
     bot = bots.get(bot_id)
@@ -441,6 +419,7 @@ async def remove_action(request: Request):
 
 
 @app.route("/bots/{bot_id}/execute_action/<action>", methods=["POST"])
+@pinned
 async def execute_action(request: Request):
     bot_id = request.path_params.get("bot_id")
     bot = bots.get(bot_id)
@@ -454,30 +433,19 @@ async def execute_action(request: Request):
     bot_data = await request.json()
     action = bot_data.get("action")
 
-    errors = []
-    returns = []
-
-    @bot.on("action.execute:error")
-    def error_handler(action, exception):
-        errors.append({
-            "action": action,
-            "error": exception.__class__.__name__,
-            "args": exception.args,
-        })
-
-    @bot.on("action.execute:value")
-    def value_handler(action, return_value):
-        returns.append({"action": action, "value": return_value})
+    execution = ExecutionContext()
 
     try:
-        bot.execute_action(action)
+        await gateway.run(bot, bot.execute_action, action, execution=execution)
     except RuntimeError:
         pass
 
-    bot.off("action.execute:value", value_handler)
-    bot.off("action.execute:error", error_handler)
-
-    return JSONResponse({"success": True})
+    return JSONResponse({
+        "success": execution.success,
+        "errors": execution.errors,
+        "values": execution.values,
+        "timings": execution.timings
+    })
 
 
 bots["LoggerBot"] = create_bot_from_data({
@@ -546,3 +514,34 @@ bots["LoggerBot"] = create_bot_from_data({
     },
 })
 # bot.execute()
+
+
+@daemon_task
+def save_snapshots():
+    while True:
+        time.sleep(SNAPSHOT_INTERVAL)
+        try:
+            bots.save(SNAPSHOT_PATH)
+        except OSError as e:
+            print(repr(e))
+
+
+@daemon_task
+def evict_idle_bots():
+    while True:
+        time.sleep(BOT_IDLE_SECONDS)
+        bots.evict_idle()
+
+
+if BOT_IDLE_SECONDS:
+    evict_idle_bots()
+
+if SNAPSHOT_PATH:
+    if os.path.exists(SNAPSHOT_PATH):
+        try:
+            bots.load(Snapshot(SNAPSHOT_PATH))
+        except (OSError, SnapshotError) as e:
+            # Start with no bots rather than not at all.
+            print(f"Snapshot not loaded: {e!r}")
+    save_snapshots()
+    atexit.register(bots.save, SNAPSHOT_PATH)
@@ -0,0 +1,129 @@
+import sys
+import time
+import argparse
+import tracemalloc
+
+from app import create_bot_from_data
+from tasker.scope import Scope
+from tasker.compiler import compile_node
+from benchmarks.interpreter import evaluate, interpreted_bot
+
+
+def nested_bot(depth: int) -> dict:
+    macros = {
+        "level_0": {
+            "$$exec": {
+                "action": "add",
+                "driver": "calc",
+                "args": {"x": "$$args.value", "y": "$$bot.data.step"},
+            }
+        }
+    }
+
+    for level in range(1, depth):
+        macros[f"level_{level}"] = {
+            "$$exec": {
+                "macro": f"level_{level - 1}",
+                "args": {
+                    "value": {
+                        "$$?": "$$args.value",
+                        "$$:": "$$bot.data.start",
+                    },
+                    "trace": [
+                        {"level": level, "name": "$$bot.data.name"},
+                        ["$$args.value", "$$bot.data.step"],
+                    ],
+                },
+            }
+        }
+
+    return {
+        "data": {"name": "nested", "start": 1, "step": 2},
+        "drivers": [{"name": "calc", "default": True, "driver": "notify"}],
+        "macros": macros,
+        "actions": {
+            "run": {
+                "$$exec": {
+                    "macro": f"level_{depth - 1}",
+                    "args": {"value": "$$bot.data.start"},
+                    "store": "bot.data.result",
+                }
+            }
+        },
+    }
+
+
+def nested_value(depth: int):
+    value = "$$bot.data.name"
+    for level in range(depth):
+        value = {"level": level, "items": [value, "$$args.x"]}
+    return value
+
+
+def measure(func, iterations: int):
+    func()
+
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    start, _ = tracemalloc.get_traced_memory()
+    for _ in range(iterations):
+        func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    started = time.perf_counter()
+    for _ in range(iterations):
+        func()
+    elapsed = time.perf_counter() - started
+
+    return peak - start, elapsed / iterations
+
+
+def report(case: str, depth: int, *results: tuple) -> None:
+    peaks = "".join(f"{peak:>12}" for peak, _ in results)
+    seconds = "".join(f"{seconds * 1e6:>10.1f}" for _, seconds in results)
+    change = results[1][0] / results[0][0] - 1
+    print(f"{case:<16}{depth:>7}{peaks}{change:>+9.0%}{seconds}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description=(
+            "Peak allocations per execution of deeply nested bots: the reference "
+            "interpreter copying contexts at every level (before Scope) and "
+            "linking them through Scope, then the compiled bot."
+        )
+    )
+    parser.add_argument("--depths", type=int, nargs="+", default=[4, 16, 64])
+    parser.add_argument("--iterations", type=int, default=200)
+    options = parser.parse_args(argv)
+
+    print(
+        f"{'':<23}{'peak bytes':^36}{'':>9}{'usec/run':^30}\n"
+        f"{'case':<16}{'depth':>7}{'copying':>12}{'scope':>12}{'compiled':>12}"
+        f"{'change':>9}{'copying':>10}{'scope':>10}{'compiled':>10}"
+    )
+    for depth in options.depths:
+        sys.setrecursionlimit(max(sys.getrecursionlimit(), depth * 50))
+
+        definition = nested_bot(depth)
+        report(
+            "macro chain", depth,
+            measure(interpreted_bot(definition).actions["run"], options.iterations),
+            measure(interpreted_bot(definition, Scope).actions["run"], options.iterations),
+            measure(create_bot_from_data(definition).actions["run"], options.iterations),
+        )
+
+        value = nested_value(depth)
+        node = compile_node(value)
+        context = {"bot": interpreted_bot(definition), "args": {"x": 1}}
+        scope = Scope(context)
+        report(
+            "nested value", depth,
+            measure(lambda: evaluate(value, context), options.iterations),
+            measure(lambda: evaluate(value, scope), options.iterations),
+            measure(lambda: node(scope), options.iterations),
+        )
+
+if __name__ == "__main__":
+    main()
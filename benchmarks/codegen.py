@@ -0,0 +1,112 @@
+import copy
+import timeit
+import argparse
+
+from app import create_bot_from_data
+from benchmarks.interpreter import interpreted_bot
+
+DRIVERS_CONFIG = [{"name": "calc", "default": True, "driver": "notify"}]
+
+CASES = {
+    "arithmetic": {
+        "data": {"x": 3, "y": 4, "scale": "2"},
+        "drivers": DRIVERS_CONFIG,
+        "macros": {
+            "add": {
+                "$$exec": {
+                    "action": "add",
+                    "driver": "calc",
+                    "args": "$$args",
+                    "store": "bot.data.sum",
+                    "returns": "$$bot.data.sum",
+                }
+            }
+        },
+        "actions": {
+            "sum": {
+                "$$exec": {
+                    "macro": "add",
+                    "args": {
+                        "x": {"$$if": "$$bot.data.x", "$$then": "$$bot.data.x", "$$else": 0},
+                        "y": {"$$?": "$$bot.data.y", "$$:": 1},
+                    },
+                    "store": "bot.data.total",
+                }
+            },
+            "scaled": {
+                "$$exec": {
+                    "action": "add",
+                    "driver": True,
+                    "args": {
+                        "x": {"$$cast": "number", "target": "$$bot.data.scale"},
+                        "y": "$$bot.data.total",
+                    },
+                    "returns": {"value": "$$bot.data.total", "static": [1, {"a": 2}]},
+                }
+            },
+        },
+    },
+    "strings": {
+        "data": {"name": "Thraize", "value": 22},
+        "drivers": DRIVERS_CONFIG,
+        "macros": {},
+        "actions": {
+            "greeting": {
+                "$$exec": {
+                    "returns": {
+                        "$$join": [
+                            "Hello '",
+                            "$$bot.data.name",
+                            "'!!",
+                            "\nValue: ",
+                            {"$$cast": "string", "target": "$$bot.data.value"},
+                            {"$$if": "$$bot.data.flag", "$$then": " (on)", "$$else": " (off)"},
+                        ]
+                    }
+                }
+            },
+            "folded": {
+                "$$exec": {
+                    "returns": {
+                        "text": {"$$join": ["a", "b", {"$$cast": "string", "target": 1}]},
+                        "choice": {"$$if": 1, "$$then": "yes", "$$else": "no"},
+                    }
+                }
+            },
+            "check": {
+                "$$exec": {
+                    "$$assert": "$$bot.data.value",
+                    "$$message": {"$$join": ["missing ", "$$bot.data.name"]},
+                }
+            },
+        },
+    },
+}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Time the python code generation backend against the closures."
+    )
+    parser.add_argument("--number", type=int, default=20000)
+    options = parser.parse_args(argv)
+
+    print(f"{'case':<12}{'action':<10}{'backend':<14}{'usec/call':>10}")
+    for name in ("arithmetic", "strings"):
+        bots = {
+            "interpreter": interpreted_bot(copy.deepcopy(CASES[name])),
+            "closures": create_bot_from_data({**CASES[name], "compiler": "closures"}),
+            "python": create_bot_from_data({**CASES[name], "compiler": "python"}),
+        }
+        for action_name in CASES[name]["actions"]:
+            for backend, bot in bots.items():
+                action = bot.actions[action_name]
+                seconds = min(timeit.repeat(action, number=options.number, repeat=3))
+                print(
+                    f"{name:<12}{action_name:<10}{backend:<14}"
+                    f"{seconds / options.number * 1e6:>10.2f}"
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,193 @@
+import typing as t
+
+from tasker.bots import Bot
+from tasker.scope import Scope
+from tasker.drivers import DRIVERS
+from tasker.paths import accessor, setter
+from tasker.compiler import casts
+
+# The tree-walking interpreter app.py ran before definitions were compiled,
+# frozen as the reference the compiled backends are timed and checked
+# against. It has none of the runtime features (result cache, metrics,
+# breakers, limits) the compiled handles carry.
+#
+# Given a Scope, nested contexts are linked frames; given a plain dict, they
+# are copied at every level, as the interpreter did before Scope existed.
+
+
+def child(context: t.Mapping, vars: t.Mapping) -> t.Mapping:
+    if isinstance(context, Scope):
+        return context.child(vars)
+    return {**context, **vars}
+
+
+def nested(context: t.Mapping) -> t.Mapping:
+    if isinstance(context, Scope):
+        return context
+    return {**context}
+
+
+def evaluate_exec(value, context):
+
+    def exec_handle(*__, **kwargs):
+        local = child(context, {"args": kwargs})
+        action = value.get("action")
+        macro = value.get("macro")
+        args = value.get("args")
+        store = value.get("store")
+        returns = value.get("returns")
+        return_value = None
+
+        if not action and not macro:
+            return_value = evaluate(value, local)
+
+        if args:
+            args = evaluate(args, local)
+        else:
+            args = {}
+
+        if action:
+            if "driver" in value:
+                if value["driver"] == True:
+                    driver = context["bot"].drivers.get(context["bot"].default_driver)
+                else:
+                    driver = context["bot"].drivers.get(value["driver"])
+                action = getattr(driver, action)
+            else:
+                action = context["bot"].actions.get(action)
+
+            if action:
+                return_value = action(**args)
+
+        if macro:
+            macro = context["bot"].macros.get(macro)
+            if macro:
+                return_value = macro(**args)
+
+        if store:
+            setter(store)(context, return_value)
+
+        if returns:
+            return evaluate(returns, context)
+
+    return exec_handle
+
+
+def evaluate_if(value: t.Mapping, context: t.Mapping):
+    condition = evaluate(value.get("$$if"), context)
+    otherwise = value.get("$$else")
+    then = value.get("$$then")
+
+    if condition:
+        return evaluate(then, context)
+    else:
+        return evaluate(otherwise, context)
+
+
+def evaluate_if_shorthand(value: t.Mapping, context: t.Mapping):
+    condition = evaluate(value.get("$$?"), context)
+    otherwise = value.get("$$:")
+
+    if condition:
+        return condition
+    else:
+        return evaluate(otherwise, context)
+
+
+def evaluate_macro(action: t.Mapping, bot: Bot):
+    macro = action.get("$$macro")
+    target = bot.macros.get(macro.get("target"))
+
+    def macro_handle(**kwargs):
+        args = macro.get("args")
+        if args:
+            args = evaluate(args, Scope({"bot": bot, "args": kwargs}))
+        else:
+            args = {}
+
+        if target:
+            return target(**args)
+
+    return macro_handle
+
+
+def evaluate(data: t.Any, context: t.Mapping) -> t.Mapping:
+    if not data:
+        return data
+
+    _ = lambda i: evaluate(i, nested(context))
+
+    if isinstance(data, str) and data.startswith("$$"):
+        return accessor(data)(context)
+    elif isinstance(data, list):
+        return [_(item) for item in data]
+    elif isinstance(data, dict):
+        fixed_data = {}
+        for key, value in data.items():
+            if key == "$$exec" and isinstance(value, dict):
+                fixed_data[key] = evaluate_exec(value, context)
+            elif key == "$$execs" and isinstance(value, list):
+                funcs = [_(item) for item in value]
+
+                def execs(*_, **kwargs):
+                    for func in funcs:
+                        func(**{**context, **kwargs})
+
+                fixed_data[key] = execs
+            elif key == "$$join" and isinstance(value, list):
+                return "".join(_(item) for item in value)
+            elif key == "$$cast" and isinstance(value, str):
+                target = _(data.get("target"))
+                cast = _(data.get("$$cast"))
+
+                return casts.get(cast)(target)
+            elif key == "$$assert":
+                assert evaluate(value, context), _(data.get("$$message")) or ""
+                return None
+            elif key == "$$if" and "$$then" in data:
+                return evaluate_if(data, context)
+            elif key == "$$?" and "$$:" in data:
+                return evaluate_if_shorthand(data, context)
+            else:
+                fixed_data[key] = _(value)
+        return fixed_data
+    return data
+
+
+def interpreted_bot(bot_data: dict, context: t.Callable = dict) -> Bot:
+    bot_config = {"default_driver": None, "drivers": {}, "macros": {}}
+
+    for driver_config in bot_data.get("drivers", []):
+        driver_class = DRIVERS.get(driver_config["driver"])
+        if not driver_class:
+            continue
+        driver_name = driver_config.get("name")
+        if driver_config.get("default"):
+            bot_config["default_driver"] = driver_name
+        bot_config["drivers"][driver_name] = driver_class(
+            **driver_config.get("config", {})
+        )
+
+    bot = Bot(**bot_config)
+    bot.data.update(**bot_data.get("data", {}))
+
+    for macro_name, macro in bot_data.get("macros", {}).items():
+        macro = evaluate(macro, context({"bot": bot}))
+        if isinstance(macro, dict):
+            if "$$exec" in macro:
+                macro = macro.get("$$exec")
+            elif "$$execs" in macro:
+                macro = macro.get("$$execs")
+        bot.macros[macro_name] = macro
+
+    for action_name, action in bot_data.get("actions", {}).items():
+        action = evaluate(action, context({"bot": bot}))
+        if isinstance(action, dict):
+            if "$$exec" in action:
+                action = action.get("$$exec")
+            elif "$$execs" in action:
+                action = action.get("$$execs")
+            elif "$$macro" in action:
+                action = evaluate_macro(action, bot)
+        bot.add_action(action_name, action)
+    return bot
@@ -0,0 +1,48 @@
+import gc
+import time
+import argparse
+import tracemalloc
+
+from app import bots, create_bot_from_data
+
+
+def measure(definition: dict, count: int):
+    create_bot_from_data(definition)
+    gc.collect()
+
+    tracemalloc.start()
+    start, _ = tracemalloc.get_traced_memory()
+    started = time.perf_counter()
+    created = [create_bot_from_data(definition) for _ in range(count)]
+    elapsed = time.perf_counter() - started
+    gc.collect()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    del created
+    return (current - start) / count, elapsed / count
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Memory per bot created from the LoggerBot definition."
+    )
+    parser.add_argument("--count", type=int, default=100_000)
+    parser.add_argument(
+        "--compilers", nargs="+", default=["closures", "python"]
+    )
+    options = parser.parse_args(argv)
+
+    definition = {
+        key: value for key, value in bots["LoggerBot"].definition.items()
+        if key != "name"
+    }
+
+    print(f"{'compiler':<12}{'bots':>10}{'bytes/bot':>12}{'usec/bot':>12}")
+    for compiler in options.compilers:
+        per_bot, seconds = measure({**definition, "compiler": compiler}, options.count)
+        print(f"{compiler:<12}{options.count:>10}{per_bot:>12.0f}{seconds * 1e6:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
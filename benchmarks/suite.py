@@ -0,0 +1,192 @@
+import io
+import sys
+import json
+import timeit
+import asyncio
+import argparse
+import platform
+import contextlib
+import statistics
+import typing as t
+
+from app import bots, create_bot_from_data
+from tasker.bots import Bot
+from tasker.scope import Scope
+from tasker.templates import COMPILERS, templates
+from benchmarks.allocations import nested_value
+
+# Times are stored relative to a fixed loop of plain Python (``calibration``)
+# timed alongside each case, so the baseline carries over between machines as
+# long as the hot paths and the loop speed up or slow down together. A different
+# Python version still shifts the ratios; regenerate the baseline after an
+# intended change or an interpreter upgrade with
+#
+#     python -m benchmarks.suite --save benchmarks/baseline.json
+#
+# and commit it with the change.
+BASELINE = "benchmarks/baseline.json"
+
+
+def wide_value(width: int) -> dict:
+    return {
+        f"key_{index}": [
+            "$$bot.data.name",
+            {"$$?": "$$args.x", "$$:": index},
+            {"$$join": ["item ", {"$$cast": "string", "target": index}]},
+        ]
+        for index in range(width)
+    }
+
+
+def logger_definition() -> dict:
+    return {
+        key: value for key, value in bots["LoggerBot"].definition.items()
+        if key != "name"
+    }
+
+
+def sync_bot(definition: dict) -> Bot:
+    # The same bot the app builds, without the asynchronous execution.
+    return templates.get(definition).create(
+        definition.get("data", {}), definition.get("config"), Bot, "LoggerBot"
+    )
+
+
+def listening_bot(listeners: int) -> Bot:
+    bot = Bot()
+    for _ in range(listeners):
+        bot.on("tick", lambda *args, **kwargs: None)
+    return bot
+
+
+def calibration() -> int:
+    # Dict reads, attribute lookups and calls, the mix the hot paths are made of.
+    values = {"x": 1, "y": 2}
+    total = 0
+    for index in range(1000):
+        total += values.get("x") + values["y"] + index.bit_length()
+    return total
+
+
+def cases():
+    definition = logger_definition()
+    bot = sync_bot(definition)
+    async_bot = create_bot_from_data(definition)
+    loop = asyncio.new_event_loop()
+    scope = Scope({"bot": bot, "args": {"x": 1}})
+
+    # Values compiled the way templates compile actions, by both backends.
+    for label, value in (("deep (64)", nested_value(64)), ("wide (256)", wide_value(256))):
+        for compiler_name, compile_node in COMPILERS.items():
+            node = compile_node(value)
+            yield f"evaluate {label} {compiler_name}", lambda: node(scope)
+    yield "create_bot_from_data", lambda: create_bot_from_data(definition)
+
+    for count in (0, 10, 1000):
+        listening = listening_bot(count)
+        yield f"dispatch ({count} listeners)", lambda: listening.dispatch("tick", 1, x=2)
+
+    yield "execute_action", lambda: bot.execute_action("calculate")
+    yield "execute_action context", lambda: bot.execute_action(
+        "calculate", {"x_arg": 3, "y_arg": 4}
+    )
+    yield "execute LoggerBot", lambda: bot.execute()
+    yield "execute LoggerBot (async)", lambda: loop.run_until_complete(
+        async_bot.execute()
+    )
+
+
+def measure(func, repeat: int) -> t.Tuple[float, float]:
+    """
+    Return the best time of ``func`` in seconds and its median ratio to
+    ``calibration``. The two are timed in alternation, so a machine that
+    speeds up or slows down during the run moves both.
+    """
+
+    timer, reference = timeit.Timer(func), timeit.Timer(calibration)
+    number, _ = timer.autorange()
+    units, _ = reference.autorange()
+    times, ratios = [], []
+    for _ in range(repeat):
+        elapsed = timer.timeit(number) / number
+        times.append(elapsed)
+        ratios.append(elapsed / (reference.timeit(units) / units))
+    return min(times), statistics.median(ratios)
+
+
+def run(repeat: int, only=None) -> dict:
+    results = {}
+    # LoggerBot prints its log action; keep that out of the report.
+    with contextlib.redirect_stdout(io.StringIO()):
+        for name, func in cases():
+            if only and not any(part in name for part in only):
+                continue
+            seconds, ratio = measure(func, repeat)
+            results[name] = (round(seconds * 1e6, 3), float(f"{ratio:.4g}"))
+    return results
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> bool:
+    """
+    Print each case's ``(usec, ratio)`` against the baseline ratios and
+    return False when one is more than ``tolerance`` slower.
+    """
+
+    print(f"{'case':<30}{'usec':>10}{'ratio':>10}{'baseline':>10}{'change':>9}")
+    passed = True
+    for name, (usec, ratio) in results.items():
+        previous = baseline.get(name)
+        if previous is None:
+            print(f"{name:<30}{usec:>10.2f}{ratio:>10.4g}{'-':>10}{'new':>9}")
+            continue
+        change = ratio / previous - 1
+        slower = change > tolerance
+        passed = passed and not slower
+        print(
+            f"{name:<30}{usec:>10.2f}{ratio:>10.4g}{previous:>10.4g}{change:>+9.0%}"
+            f"{'  SLOWER' if slower else ''}"
+        )
+    return passed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Time the evaluation, dispatch and execution hot paths."
+    )
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--cases", nargs="+", help="run the cases named like these")
+    parser.add_argument("--baseline", default=BASELINE)
+    parser.add_argument(
+        "--save", metavar="PATH",
+        help="write the results as JSON; save over the baseline to refresh it",
+    )
+    parser.add_argument(
+        "--tolerance", type=float, default=0.25,
+        help="fail when a case is this much slower than the baseline",
+    )
+    options = parser.parse_args(argv)
+
+    results = run(options.repeat, options.cases)
+
+    if options.save:
+        with open(options.save, "w") as file:
+            json.dump({
+                "python": platform.python_version(),
+                "machine": platform.machine(),
+                "ratios": {name: ratio for name, (_, ratio) in results.items()},
+                "usec": {name: usec for name, (usec, _) in results.items()},
+            }, file, indent=2)
+            file.write("\n")
+
+    try:
+        with open(options.baseline) as file:
+            baseline = json.load(file)
+    except FileNotFoundError:
+        baseline = {}
+
+    if not compare(results, baseline.get("ratios", {}), options.tolerance):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
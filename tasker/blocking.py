@@ -0,0 +1,64 @@
+import asyncio
+import typing as t
+
+from functools import partial
+from inspect import iscoroutinefunction
+from threading import Lock
+from contextvars import ContextVar, copy_context
+from concurrent.futures import ThreadPoolExecutor
+
+# Threads shared by every event loop for the blocking calls of async bots.
+MAX_THREADS = 64
+
+# Set while an async bot runs an action. Synchronous calls that may block
+# (driver methods, and actions or macros that user code passed in) then go
+# to a worker thread, so the event loop keeps serving other bots and the
+# concurrent paths (parallel actions, batch rows) really overlap.
+active: ContextVar[bool] = ContextVar("blocking", default=False)
+
+# Handles built from DSL definitions. They only compute values and hand
+# their driver calls to the thread pool, so they run on the loop.
+HANDLE_MODULES = frozenset(("tasker.compiler", "tasker.codegen"))
+
+_executor: t.Optional[ThreadPoolExecutor] = None
+_lock = Lock()
+
+
+def executor() -> ThreadPoolExecutor:
+    global _executor
+
+    if _executor is None:
+        with _lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=MAX_THREADS, thread_name_prefix="tasker-blocking"
+                )
+    return _executor
+
+
+def _run(func: t.Callable, args: t.Tuple, kwargs: t.Mapping) -> t.Any:
+    # On the worker the call is synchronous again, down to its driver calls.
+    active.set(False)
+    return func(*args, **kwargs)
+
+
+def run(func: t.Callable, *args, **kwargs) -> asyncio.Future:
+    """Runs ``func`` on a worker thread, with the caller's context."""
+    return asyncio.get_running_loop().run_in_executor(
+        executor(), partial(copy_context().run, _run, func, args, kwargs)
+    )
+
+
+def blocks(func: t.Callable) -> bool:
+    return not (
+        iscoroutinefunction(func)
+        or getattr(func, "__module__", None) in HANDLE_MODULES
+    )
+
+
+def call(func: t.Callable, *args, **kwargs) -> t.Any:
+    # Calls an action or macro; from an async bot, one that may block
+    # returns a future instead.
+    if active.get() and blocks(func):
+        return run(func, *args, **kwargs)
+    return func(*args, **kwargs)
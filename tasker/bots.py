@@ -1,22 +1,81 @@
-import re
 import json
+import time
+import asyncio
 import inspect
 import importlib
 import typing as t
 
+from . import blocking, metrics, profiler
 from .command import Command
+from .data import BotData, DataOverlay
+from .engine import DependencyGraph
+from .execution import ExecutionContext
+from .metrics import action_seconds, dispatch_seconds
+from .router import EventRouter
 from .drivers import BaseDriver
 from .triggers import BaseTrigger
 from .scheduler import BaseScheduler
 
+from types import MappingProxyType
 from contextlib import contextmanager
+from contextvars import ContextVar, copy_context
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+# Data overlays active in the current thread or task, keyed by bot.
+_overlays: ContextVar[t.Optional[t.Mapping]] = ContextVar("overlays", default=None)
+
+# Events held back while an action runs on a worker thread, so they can be
+# dispatched in action order once it finishes.
+_deferred: ContextVar[t.Optional[t.List]] = ContextVar("deferred", default=None)
+
+# Shared by every bot until it needs its own: most bots have no triggers or
+# listeners. Config, drivers and macros are allocated on first use instead
+# (see ``_lazy_dict``) because callers write into them.
+_EMPTY: t.Mapping = MappingProxyType({})
+_NO_TRIGGERS: t.Tuple[BaseTrigger, ...] = ()
+
+
+def _lazy_dict(slot: str) -> property:
+    # A dict attribute kept as None in ``slot`` until it is first used.
+    def get(self):
+        value = getattr(self, slot)
+        if value is None:
+            value = {}
+            setattr(self, slot, value)
+        return value
+
+    def set(self, value):
+        setattr(self, slot, value)
+
+    return property(get, set)
+
+
+def _option(bot, key: str):
+    # Reads ``bot.config`` without allocating it.
+    config = bot._config
+    return config.get(key, False) if config is not None else False
+
+
+def _timed(bot, action_name: str, status: str, started: float, execution) -> None:
+    # Records an action's duration in the metrics and the caller's run.
+    elapsed = time.perf_counter() - started
+    if metrics.enabled:
+        action_seconds.observe((bot.name, action_name, status), elapsed)
+    if execution is not None:
+        execution.timing(action_name, elapsed)
 
 
 class Bot:
-    actions: t.Mapping[str, t.Union[t.Callable, Command]]
+    actions: t.Dict[str, t.Union[t.Callable, Command]]
     triggers: t.Sequence[BaseTrigger]
     event_listeners: t.Mapping[str, t.Sequence[t.Callable]]
 
+    __slots__ = (
+        "name", "__data", "_actions", "_config", "_drivers", "_macros",
+        "scheduler", "default_driver", "triggers", "_router",
+        "dependencies", "definition", "__runs", "__weakref__",
+    )
+
     def __init__(
         self: t.Self,
         config: t.Optional[t.Mapping] = None,
@@ -24,18 +83,67 @@ class Bot:
         drivers: t.Mapping[str, BaseDriver] = None,
         scheduler: t.Optional[BaseScheduler] = None,
         default_driver: t.Optional[t.LiteralString] = None,
+        name: t.Optional[str] = None,
     ):
-        self.data = dict()
-        self.actions = dict()
-        self.config = config or dict()
-        self.drivers = drivers or dict()
-        self.macros = macros or dict()
+        self.name = name
+        self.__data = BotData()
+        self._actions: t.Optional[t.Dict] = None
+        self._config = config
+        self._drivers = drivers
+        self._macros = macros
 
         self.scheduler = scheduler
         self.default_driver = default_driver
 
-        self.triggers = []
-        self.event_listeners = {}
+        self.triggers = _NO_TRIGGERS
+        self._router: t.Optional[EventRouter] = None
+
+        self.dependencies: t.Optional[DependencyGraph] = None
+        self.definition: t.Optional[t.Mapping] = None
+        self.__runs: t.Optional[t.Dict] = None
+
+    actions = _lazy_dict("_actions")
+    config = _lazy_dict("_config")
+    drivers = _lazy_dict("_drivers")
+    macros = _lazy_dict("_macros")
+
+    @property
+    def router(self: t.Self) -> EventRouter:
+        # Created with the first listener; dispatching to a bot without one
+        # stops at the ``None`` check.
+        if self._router is None:
+            self._router = EventRouter()
+        return self._router
+
+    @property
+    def event_listeners(self: t.Self) -> t.Mapping[str, t.Sequence[t.Callable]]:
+        return self._router.listeners if self._router is not None else _EMPTY
+
+    @property
+    def data(self: t.Self) -> t.MutableMapping:
+        overlays = _overlays.get()
+        if overlays and self in overlays:
+            return overlays[self]
+        return self.__data
+
+    @data.setter
+    def data(self: t.Self, data: t.Mapping) -> None:
+        # Overlays and incremental runs read the stamps BotData keeps.
+        self.__data = data if isinstance(data, BotData) else BotData(data)
+
+    @contextmanager
+    def overlay(self: t.Self, context: t.Optional[t.Mapping] = None):
+        """
+        Route ``bot.data`` through a :class:`DataOverlay` for the current
+        thread or task. Writes are dropped unless the overlay is committed.
+        """
+
+        overlay = DataOverlay(self.data, context)
+        token = _overlays.set({**(_overlays.get() or {}), self: overlay})
+        try:
+            yield overlay
+        finally:
+            _overlays.reset(token)
 
     @staticmethod
     def fromJSON(self, data):
@@ -48,6 +156,11 @@ class Bot:
         *args,
         **kwargs,
     ):
+        if self.__runs:
+            self.__runs.pop(action_name, None)
+        if self.dependencies and action_name in self.dependencies:
+            self.dependencies = self.dependencies.without(action_name)
+
         with self.dispatch_event("action.add", action=action_name):
             if isinstance(action_class_or_function, type) and issubclass(
                 action_class_or_function, Command
@@ -112,32 +225,35 @@ class Bot:
         self: t.Self, event_type: str, listener_func: t.Optional[t.Callable] = None
     ) -> t.Callable:
         def decorator(listener_func: t.Callable):
-            self.event_listeners.setdefault(event_type.replace("*", "(.*)"), []).append(
-                listener_func
-            )
-            return listener_func
+            return self.router.on(event_type, listener_func)
 
         return decorator(listener_func) if listener_func else decorator
 
     def off(self: t.Self, event_type: str, listener_func: t.Callable) -> t.Callable:
-        self.event_listeners.setdefault(event_type.replace("*", "(.*)"), []).remove(
-            listener_func
-        )
-
-        return listener_func
+        return self.router.off(event_type, listener_func)
 
     def dispatch(self: t.Self, event: str, *args, **kwargs):
-        for event_name in self.event_listeners:
-            if not (event == event_name or re.fullmatch(event, event_name)):
-                continue
-
-            for cb in self.event_listeners[event_name]:
-                try:
-                    cb(*args, **kwargs)
-                except BaseException as e:
-                    raise RuntimeError(
-                        f"Error dispatching event: '{event}' reason: {repr(e)}"
-                    ) from None
+        if self._router is None:
+            return
+        listeners = self._router.resolve(event)
+        if not listeners:
+            return
+
+        deferred = _deferred.get()
+        if deferred is not None:
+            deferred.append((self, event, args, kwargs))
+            return
+
+        started = time.perf_counter() if metrics.enabled else None
+        for cb in listeners:
+            try:
+                cb(*args, **kwargs)
+            except BaseException as e:
+                raise RuntimeError(
+                    f"Error dispatching event: '{event}' reason: {repr(e)}"
+                ) from None
+        if started is not None:
+            dispatch_seconds.observe((self.name, event), time.perf_counter() - started)
 
     @contextmanager
     def dispatch_event(
@@ -164,15 +280,193 @@ class Bot:
             f"{event_name}", *args.get("after", []), *a, **kwargs.get("after", {}), **kw
         )
 
-    def execute(self: t.Self, context: t.Optional[t.Mapping] = None) -> None:
+    def execute(
+        self: t.Self,
+        context: t.Optional[t.Mapping] = None,
+        incremental: t.Optional[bool] = None,
+        parallel: t.Optional[t.Union[bool, int]] = None,
+        execution: t.Optional[ExecutionContext] = None,
+    ) -> ExecutionContext:
+        """
+        Run every action in order. Values, errors and timings are collected
+        in ``execution`` (a new one if not given), which is returned; when
+        an action fails the ``RuntimeError`` is raised instead, so pass one
+        in to read the results of a failed run.
+        """
+
+        if execution is None:
+            execution = ExecutionContext()
+        if incremental is None:
+            incremental = _option(self, "incremental")
+        if parallel is None:
+            parallel = _option(self, "parallel")
+
+        if parallel and len(self.actions) > 1:
+            max_workers = parallel if type(parallel) is int else None
+            self.execute_parallel(context, incremental, max_workers, execution)
+            return execution
+
         for action_name in self.actions:
-            self.execute_action(action_name, context)
+            if incremental and not context:
+                self.execute_incremental(action_name, execution)
+            else:
+                self.execute_action(action_name, context, execution=execution)
+        return execution
+
+    def execute_parallel(
+        self: t.Self,
+        context: t.Optional[t.Mapping] = None,
+        incremental: bool = False,
+        max_workers: t.Optional[int] = None,
+        execution: t.Optional[ExecutionContext] = None,
+    ) -> None:
+        """
+        Run independent actions concurrently on a thread pool.
+
+        An action starts once every earlier action it conflicts with (by the
+        ``bot.data`` keys they read and write) has finished; actions the
+        analysis cannot see wait for everything before them. Events are held
+        back per action and dispatched in action order, so listeners see the
+        same sequence as in a sequential run. After a failure no new action
+        is started and the first error in action order is raised.
+        """
+
+        action_names = list(self.actions)
+        graph = self.dependencies or DependencyGraph({})
+        upstream = graph.schedule(action_names)
+
+        def run(action_name: str) -> t.Tuple:
+            events = []
+            results = ExecutionContext()
+            _deferred.set(events)
+            try:
+                if incremental and not context:
+                    self.execute_incremental(action_name, results)
+                else:
+                    self.execute_action(action_name, context, execution=results)
+            except BaseException as e:
+                return events, results, e
+            return events, results, None
+
+        pending = list(action_names)
+        running = {}
+        finished = {}
+        flushed = 0
+        failed = False
+
+        with ThreadPoolExecutor(
+            max_workers=max_workers or min(32, len(action_names))
+        ) as executor:
+            while pending or running:
+                if not failed:
+                    for action_name in [
+                        name for name in pending if upstream[name] <= finished.keys()
+                    ]:
+                        pending.remove(action_name)
+                        future = executor.submit(copy_context().run, run, action_name)
+                        running[future] = action_name
+
+                if not running:
+                    break
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    result = future.result()
+                    finished[running.pop(future)] = result
+                    failed = failed or result[2] is not None
+
+                while flushed < len(action_names) and action_names[flushed] in finished:
+                    self.__replay(finished[action_names[flushed]], execution)
+                    flushed += 1
+
+        for action_name in action_names[flushed:]:
+            if action_name in finished:
+                self.__replay(finished[action_name], execution)
+
+        for action_name in action_names:
+            error = finished.get(action_name, (None, None, None))[2]
+            if error is not None:
+                raise error
+
+    @staticmethod
+    def __replay(
+        finished: t.Tuple, execution: t.Optional[ExecutionContext]
+    ) -> None:
+        events, results, _ = finished
+        if execution is not None:
+            execution.merge(results)
+        for bot, event, args, kwargs in events:
+            bot.dispatch(event, *args, **kwargs)
+
+    def execute_incremental(
+        self: t.Self,
+        action_name: str,
+        execution: t.Optional[ExecutionContext] = None,
+    ) -> t.Any:
+        """
+        Run an action only if a ``bot.data`` key it reads, or one it wrote
+        last time, changed since its last successful run. Skipped actions are
+        reported through ``action.execute:cached`` and replay their value.
+        """
+
+        stamps = self._run_stamps(action_name)
+        if stamps is None:
+            return self.execute_action(action_name, execution=execution)
+
+        run = self._cached_run(action_name, stamps)
+        if run:
+            if execution is not None and run[2]:
+                execution.value(action_name, run[2])
+            for event, kwargs in self._cached_events(action_name, run[2]):
+                self.dispatch(event, **kwargs)
+            return run[2]
+
+        return_value = self.execute_action(action_name, execution=execution)
+        self._record_run(action_name, stamps, return_value)
+        return return_value
+
+    def _run_stamps(self: t.Self, action_name: str) -> t.Optional[t.Tuple]:
+        dependency = self.dependencies.get(action_name) if self.dependencies else None
+        if not dependency or not dependency.known:
+            return None
+        return self.data.stamps(dependency.reads), self.data.stamps(dependency.writes)
+
+    def _cached_run(
+        self: t.Self, action_name: str, stamps: t.Tuple
+    ) -> t.Optional[t.Tuple]:
+        run = self.__runs.get(action_name) if self.__runs else None
+        if run and run[:2] == stamps:
+            return run
+        return None
+
+    def _record_run(
+        self: t.Self, action_name: str, stamps: t.Tuple, return_value: t.Any
+    ) -> None:
+        writes = self.dependencies.get(action_name).writes
+        if self.__runs is None:
+            self.__runs = {}
+        self.__runs[action_name] = (stamps[0], self.data.stamps(writes), return_value)
+
+    @staticmethod
+    def _cached_events(
+        action_name: str, return_value: t.Any
+    ) -> t.List[t.Tuple[str, t.Dict]]:
+        events = [("action.execute:cached", {"action": action_name})]
+        if return_value:
+            events.append((
+                "action.execute:value",
+                {"action": action_name, "return_value": return_value},
+            ))
+        events.append(("action.execute", {"action": action_name, "success": True}))
+        return events
 
     def execute_action(
         self: t.Self, action_name: str,
         context: t.Optional[t.Mapping] = None,
-        *args, **kwargs
-    ) -> None:
+        *args,
+        execution: t.Optional[ExecutionContext] = None,
+        **kwargs
+    ) -> t.Any:
         if action_name in self.actions:
             action = self.actions[action_name]
 
@@ -186,14 +480,32 @@ class Bot:
             self.dispatch("action.execute:before", action=action_name, function=func)
 
             success = True
-            data_copy = None
+            error = None
+            timed = metrics.enabled or execution is not None
+            started = time.perf_counter() if timed else None
+            label = None
+            if profiler.active:
+                label = profiler.push(self, f"action:{action_name}")
 
             try:
                 if context and isinstance(context, dict):
-                    data_copy = self.data.copy()
-                    self.data.update(**context)
+                    # The context is only visible while the action runs;
+                    # writes made by the action are kept if it succeeds.
+                    with self.overlay(context) as overlay:
+                        try:
+                            return_value = func(*args, **kwargs)
+                        except BaseException:
+                            overlay.discard()
+                            raise
+                        overlay.commit()
+                else:
+                    return_value = func(*args, **kwargs)
+
+                if timed:
+                    _timed(self, action_name, "success", started, execution)
+                if execution is not None and return_value:
+                    execution.value(action_name, return_value)
 
-                return_value = func(*args, **kwargs)
                 if return_value:
                     self.dispatch(
                         "action.execute:value",
@@ -202,24 +514,63 @@ class Bot:
                     )
             except BaseException as e:
                 success = False
+                error = e
                 print(repr(e))
+                if timed:
+                    _timed(self, action_name, "error", started, execution)
+                if execution is not None:
+                    execution.error(action_name, e)
                 self.dispatch("action.execute:error", action=action_name, exception=e)
             finally:
-                if data_copy:
-                    self.data = data_copy
+                if label:
+                    profiler.pop(label)
 
             self.dispatch("action.execute", action=action_name, success=success)
 
             if not success:
-                raise RuntimeError(f"Execution of action {action_name} failed")
+                raise RuntimeError(
+                    f"Execution of action {action_name} failed"
+                ) from error
+            return return_value
         else:
             raise ValueError(f"Action '{action_name}' not found.")
 
+    def execute_row(self: t.Self, context: t.Optional[t.Mapping] = None) -> t.Dict:
+        execution = ExecutionContext()
+
+        with self.overlay(context):
+            for action_name in self.actions:
+                try:
+                    self.execute_action(action_name, execution=execution)
+                except RuntimeError:
+                    break
+
+        return execution.result()
+
+    def execute_batch(
+        self: t.Self,
+        contexts: t.Iterable[t.Optional[t.Mapping]],
+        max_workers: t.Optional[int] = None,
+    ) -> t.List[t.Dict]:
+        """
+        Run every action once per context, each against its own data
+        overlay, and return one result row per context. Writes made by the
+        rows are discarded, so rows never see each other.
+        """
+
+        if not max_workers or max_workers <= 1:
+            return [self.execute_row(context) for context in contexts]
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            return list(executor.map(self.execute_row, contexts))
+
     def add_trigger(self: t.Self, trigger: BaseTrigger) -> None:
         with self.dispatch_event("trigger.setup", trigger=trigger):
             trigger.setup(self)
 
         with self.dispatch_event("trigger.add", trigger=trigger):
+            if self.triggers is _NO_TRIGGERS:
+                self.triggers = []
             self.triggers.append(trigger)
 
         return
@@ -255,40 +606,278 @@ class Bot:
 
 
 class AsyncBotMixin:
-    async def execute(self):
+    """
+    Async engine for :class:`Bot`.
+
+    Actions, ``$$exec`` handles, drivers, macros and event listeners may
+    return awaitables, which are awaited in place; synchronous ones run as
+    they do on :class:`Bot`. Context overlays follow the running task.
+    """
+
+    __slots__ = ()
+
+    async def dispatch_async(self, event: str, *args, **kwargs):
+        if self._router is None:
+            return
+        listeners = self._router.resolve(event)
+        if not listeners:
+            return
+
+        deferred = _deferred.get()
+        if deferred is not None:
+            deferred.append((self, event, args, kwargs))
+            return
+
+        started = time.perf_counter() if metrics.enabled else None
+        for cb in listeners:
+            try:
+                result = cb(*args, **kwargs)
+                if inspect.isawaitable(result):
+                    await result
+            except BaseException as e:
+                raise RuntimeError(
+                    f"Error dispatching event: '{event}' reason: {repr(e)}"
+                ) from None
+        if started is not None:
+            dispatch_seconds.observe((self.name, event), time.perf_counter() - started)
+
+    async def execute(
+        self,
+        context: t.Optional[t.Mapping] = None,
+        incremental: t.Optional[bool] = None,
+        parallel: t.Optional[t.Union[bool, int]] = None,
+        execution: t.Optional[ExecutionContext] = None,
+    ) -> ExecutionContext:
+        if execution is None:
+            execution = ExecutionContext()
+        if incremental is None:
+            incremental = _option(self, "incremental")
+        if parallel is None:
+            parallel = _option(self, "parallel")
+
+        if parallel and len(self.actions) > 1:
+            max_workers = parallel if type(parallel) is int else None
+            await self.execute_parallel(context, incremental, max_workers, execution)
+            return execution
+
         for action_name in self.actions:
-            await self.execute_action(action_name)
+            if incremental and not context:
+                await self.execute_incremental(action_name, execution)
+            else:
+                await self.execute_action(action_name, context, execution=execution)
+        return execution
+
+    async def execute_parallel(
+        self,
+        context: t.Optional[t.Mapping] = None,
+        incremental: bool = False,
+        max_workers: t.Optional[int] = None,
+        execution: t.Optional[ExecutionContext] = None,
+    ) -> None:
+        """
+        Run independent actions as concurrent tasks, with the same ordering
+        and event guarantees as :meth:`Bot.execute_parallel`.
+        """
+
+        action_names = list(self.actions)
+        graph = self.dependencies or DependencyGraph({})
+        upstream = graph.schedule(action_names)
+        semaphore = asyncio.Semaphore(max_workers) if max_workers else None
+        tasks = {}
+        failed = False
+
+        async def run(action_name: str):
+            nonlocal failed
+
+            if upstream[action_name]:
+                await asyncio.wait([tasks[other] for other in upstream[action_name]])
+            if failed:
+                return None
+
+            events = []
+            results = ExecutionContext()
+            _deferred.set(events)
+            try:
+                if semaphore:
+                    async with semaphore:
+                        await self.__run(action_name, context, incremental, results)
+                else:
+                    await self.__run(action_name, context, incremental, results)
+            except BaseException as e:
+                failed = True
+                return events, results, e
+            return events, results, None
 
-    async def execute_action(self, action_name: str, *args, **kwargs):
+        for action_name in action_names:
+            tasks[action_name] = asyncio.ensure_future(run(action_name))
+
+        errors = []
+        for action_name in action_names:
+            finished = await tasks[action_name]
+            if not finished:
+                continue
+
+            events, results, error = finished
+            if execution is not None:
+                execution.merge(results)
+            for bot, event, args, kwargs in events:
+                if isinstance(bot, AsyncBotMixin):
+                    await bot.dispatch_async(event, *args, **kwargs)
+                else:
+                    bot.dispatch(event, *args, **kwargs)
+            if error is not None:
+                errors.append(error)
+
+        if errors:
+            raise errors[0]
+
+    async def __run(
+        self,
+        action_name: str,
+        context: t.Optional[t.Mapping],
+        incremental: bool,
+        execution: ExecutionContext,
+    ) -> t.Any:
+        if incremental and not context:
+            return await self.execute_incremental(action_name, execution)
+        return await self.execute_action(action_name, context, execution=execution)
+
+    async def execute_incremental(
+        self,
+        action_name: str,
+        execution: t.Optional[ExecutionContext] = None,
+    ) -> t.Any:
+        stamps = self._run_stamps(action_name)
+        if stamps is None:
+            return await self.execute_action(action_name, execution=execution)
+
+        run = self._cached_run(action_name, stamps)
+        if run:
+            if execution is not None and run[2]:
+                execution.value(action_name, run[2])
+            for event, kwargs in self._cached_events(action_name, run[2]):
+                await self.dispatch_async(event, **kwargs)
+            return run[2]
+
+        return_value = await self.execute_action(action_name, execution=execution)
+        self._record_run(action_name, stamps, return_value)
+        return return_value
+
+    async def execute_action(
+        self,
+        action_name: str,
+        context: t.Optional[t.Mapping] = None,
+        *args,
+        execution: t.Optional[ExecutionContext] = None,
+        **kwargs
+    ) -> t.Any:
         if action_name in self.actions:
             action = self.actions[action_name]
 
             if isinstance(action, Command):
                 func = action.execute
             elif callable(action):
-
-                def func():
-                    return action(self)
-
+                func = action
             else:
                 raise ValueError(f"Invalid action: {action_name}")
 
-            self.dispatch("action.execute:before", action=action_name, function=func)
+            await self.dispatch_async(
+                "action.execute:before", action=action_name, function=func
+            )
 
             success = True
-
+            error = None
+            timed = metrics.enabled or execution is not None
+            started = time.perf_counter() if timed else None
+            label = None
+            if profiler.active:
+                label = profiler.push(self, f"action:{action_name}")
+
+            # Blocking calls made by the action run on worker threads.
+            offloading = blocking.active.set(True)
             try:
-                if inspect.iscoroutinefunction(func):
-                    await func(*args, **kwargs)
+                if context and isinstance(context, dict):
+                    with self.overlay(context) as overlay:
+                        try:
+                            return_value = blocking.call(func, *args, **kwargs)
+                            if inspect.isawaitable(return_value):
+                                return_value = await return_value
+                        except BaseException:
+                            overlay.discard()
+                            raise
+                        overlay.commit()
                 else:
-                    func(*args, **kwargs)
+                    return_value = blocking.call(func, *args, **kwargs)
+                    if inspect.isawaitable(return_value):
+                        return_value = await return_value
+
+                if timed:
+                    _timed(self, action_name, "success", started, execution)
+                if execution is not None and return_value:
+                    execution.value(action_name, return_value)
+
+                if return_value:
+                    await self.dispatch_async(
+                        "action.execute:value",
+                        action=action_name,
+                        return_value=return_value,
+                    )
             except BaseException as e:
                 success = False
-                self.dispatch("action.execute:error", action=action_name, exception=e)
+                error = e
+                print(repr(e))
+                if timed:
+                    _timed(self, action_name, "error", started, execution)
+                if execution is not None:
+                    execution.error(action_name, e)
+                await self.dispatch_async(
+                    "action.execute:error", action=action_name, exception=e
+                )
+            finally:
+                blocking.active.reset(offloading)
+                if label:
+                    profiler.pop(label)
 
-            self.dispatch("action.execute", action=action_name, success=success)
+            await self.dispatch_async(
+                "action.execute", action=action_name, success=success
+            )
 
             if not success:
-                raise RuntimeError(f"Execution of action {action_name} failed")
+                raise RuntimeError(
+                    f"Execution of action {action_name} failed"
+                ) from error
+            return return_value
         else:
             raise ValueError(f"Action '{action_name}' not found.")
+
+    async def execute_row(self, context: t.Optional[t.Mapping] = None) -> t.Dict:
+        execution = ExecutionContext()
+
+        with self.overlay(context):
+            for action_name in self.actions:
+                try:
+                    await self.execute_action(action_name, execution=execution)
+                except RuntimeError:
+                    break
+
+        return execution.result()
+
+    async def execute_batch(
+        self,
+        contexts: t.Iterable[t.Optional[t.Mapping]],
+        max_workers: t.Optional[int] = None,
+    ) -> t.List[t.Dict]:
+        if not max_workers or max_workers <= 1:
+            return [await self.execute_row(context) for context in contexts]
+
+        semaphore = asyncio.Semaphore(max_workers)
+
+        async def row(context):
+            async with semaphore:
+                return await self.execute_row(context)
+
+        return list(await asyncio.gather(*map(row, contexts)))
+
+
+class AsyncBot(AsyncBotMixin, Bot):
+    __slots__ = ()
@@ -0,0 +1,149 @@
+import json
+import time
+import typing as t
+
+from threading import Lock
+from collections import OrderedDict
+
+from .metrics import registry, sample
+
+MISSING = object()
+
+# Metric name, stats() field, type and help of the /metrics cache series.
+CACHE_METRICS = (
+    ("tasker_result_cache_entries", "size", "gauge",
+     "Results held by an $$exec cache."),
+    ("tasker_result_cache_hits_total", "hits", "counter",
+     "Calls answered from an $$exec cache."),
+    ("tasker_result_cache_misses_total", "misses", "counter",
+     "Calls an $$exec cache could not answer."),
+    ("tasker_result_cache_evictions_total", "evictions", "counter",
+     "Results dropped to keep an $$exec cache under its maxsize."),
+)
+
+
+class ResultCache:
+    """
+    LRU cache of ``$$exec`` call results with an optional time to live.
+
+    Entries are keyed by the bot's name and the evaluated ``args``, so a
+    bot rebuilt under the same name finds its results and an evicted one is
+    not kept alive. Unnamed bots and arguments that cannot be serialized to
+    JSON are never cached.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = 128,
+        ttl: t.Optional[float] = None,
+        clock: t.Callable[[], float] = time.monotonic,
+    ):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.clock = clock
+        self.entries: t.OrderedDict[t.Hashable, t.Tuple[float, t.Any]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.__lock = Lock()
+
+    def __len__(self):
+        return len(self.entries)
+
+    @classmethod
+    def from_spec(cls, spec: t.Any) -> "ResultCache":
+        # ``"cache": true``, ``"cache": <ttl seconds>`` or
+        # ``"cache": {"ttl": ..., "maxsize": ...}``.
+        if isinstance(spec, dict):
+            return cls(maxsize=spec.get("maxsize", 128), ttl=spec.get("ttl"))
+        if isinstance(spec, (int, float)) and not isinstance(spec, bool):
+            return cls(ttl=spec)
+        return cls()
+
+    def key(self, bot: t.Any, arguments: t.Mapping) -> t.Optional[t.Hashable]:
+        name = getattr(bot, "name", None)
+        if name is None:
+            return None
+        try:
+            return name, json.dumps(arguments, sort_keys=True, separators=(",", ":"))
+        except (TypeError, ValueError):
+            return None
+
+    def get(self, key: t.Hashable, default: t.Any = None) -> t.Any:
+        with self.__lock:
+            entry = self.entries.get(key)
+            if entry is None or (entry[0] and entry[0] <= self.clock()):
+                if entry is not None:
+                    del self.entries[key]
+                self.misses += 1
+                return default
+            self.hits += 1
+            self.entries.move_to_end(key)
+            return entry[1]
+
+    def put(self, key: t.Hashable, value: t.Any) -> None:
+        expires = self.clock() + self.ttl if self.ttl else 0
+
+        with self.__lock:
+            self.entries[key] = (expires, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self.__lock:
+            self.entries.clear()
+            self.hits = self.misses = self.evictions = 0
+
+
+class CacheRegistry:
+    """
+    One :class:`ResultCache` per ``$$exec`` spec, shared by every handle
+    built from the same spec (the interpreter, both compilers and every
+    bot created from a shared template).
+    """
+
+    def __init__(self):
+        self.caches: t.Dict[str, ResultCache] = {}
+        self.__lock = Lock()
+
+    def get(self, spec: t.Mapping) -> ResultCache:
+        try:
+            key = json.dumps(spec)
+        except (TypeError, ValueError):
+            return ResultCache.from_spec(spec.get("cache"))
+
+        with self.__lock:
+            cache = self.caches.get(key)
+            if cache is None:
+                cache = self.caches[key] = ResultCache.from_spec(spec.get("cache"))
+            return cache
+
+    def stats(self) -> t.List[t.Dict[str, t.Any]]:
+        return [
+            {
+                "spec": json.loads(key),
+                "size": len(cache),
+                "hits": cache.hits,
+                "misses": cache.misses,
+                "evictions": cache.evictions,
+            }
+            for key, cache in list(self.caches.items())
+        ]
+
+    def render(self) -> t.Iterator[str]:
+        stats = self.stats()
+        for name, field, kind, documentation in CACHE_METRICS:
+            yield f"# HELP {name} {documentation}"
+            yield f"# TYPE {name} {kind}"
+            for entry in stats:
+                yield sample(name, {"spec": json.dumps(entry["spec"])}, entry[field])
+
+    def clear(self) -> None:
+        with self.__lock:
+            self.caches.clear()
+
+
+caches = CacheRegistry()
+registry.collector(caches.render)
@@ -0,0 +1,486 @@
+import ast
+import json
+import typing as t
+
+from copy import deepcopy
+from inspect import isawaitable
+from threading import Lock
+from time import perf_counter
+
+from . import blocking, metrics, profiler
+from .scope import Scope
+from .cache import MISSING, caches
+from .compiler import Node, casts, resume_execs
+from .drivers import call_driver
+from .metrics import driver_seconds
+from .paths import accessor, setter
+
+_DYNAMIC = object()
+
+
+def _assert(value: t.Any, message: t.Callable[[], t.Any]) -> None:
+    assert value, message() or ""
+
+
+def _execs(funcs: t.Sequence[t.Callable], context: Scope) -> t.Callable:
+    def execs(*_, **kwargs):
+        remaining = iter(funcs)
+        for func in remaining:
+            result = func(**{**context, **kwargs})
+            if isawaitable(result):
+                return resume_execs(result, remaining, context, kwargs)
+
+    return execs
+
+
+def _substitute(source: str, **names: ast.expr) -> t.List[ast.stmt]:
+    # Parse a statement template and splice generated expressions in place of
+    # the placeholder names.
+    class Splice(ast.NodeTransformer):
+        def visit_Name(self, node):
+            if node.id in names:
+                return names[node.id]
+            return node
+
+    return [Splice().visit(stmt) for stmt in ast.parse(source).body]
+
+
+class Generator:
+    """
+    Translates a DSL definition into a Python module with the same semantics
+    as :func:`tasker.compiler.compile_node`.
+
+    The module defines ``__build__(constants)``, which returns the node
+    function. Objects that cannot be written as literals (accessors, setters,
+    shared empty containers) are passed in through ``constants``, so the code
+    object can be cached and rebuilt without recompiling.
+    """
+
+    def __init__(self):
+        self.constants: t.List[t.Any] = []
+        self.functions: t.List[ast.stmt] = []
+
+    def constant(self, value: t.Any) -> ast.Name:
+        for index, existing in enumerate(self.constants):
+            if existing is value:
+                break
+        else:
+            index = len(self.constants)
+            self.constants.append(value)
+        return ast.Name(f"_k{index}", ast.Load())
+
+    def literal(self, value: t.Any) -> ast.expr:
+        if isinstance(value, (str, int, float, bool)) or value is None:
+            return ast.Constant(value)
+        if isinstance(value, list) and value:
+            return ast.List([self.literal(item) for item in value], ast.Load())
+        if isinstance(value, dict) and value:
+            return ast.Dict(
+                [ast.Constant(key) for key in value],
+                [self.literal(item) for item in value.values()],
+            )
+        return self.constant(value)
+
+    def call(self, func: ast.expr, *args: ast.expr) -> ast.Call:
+        return ast.Call(func, list(args), [])
+
+    def expression(self, data: t.Any, context: str) -> t.Tuple[ast.expr, t.Any]:
+        """Return the expression for ``data`` and its static value, if any."""
+
+        if not data:
+            return self.literal(data), data
+
+        if isinstance(data, str):
+            if data.startswith("$$"):
+                name = ast.Name(context, ast.Load())
+                return self.call(self.constant(accessor(data)), name), _DYNAMIC
+            return ast.Constant(data), data
+        elif isinstance(data, list):
+            return self.sequence(data, context)
+        elif isinstance(data, dict):
+            return self.mapping(data, context)
+        return self.literal(data), data
+
+    def sequence(self, data: t.Sequence, context: str):
+        items = [self.expression(item, context) for item in data]
+        node = ast.List([item for item, _ in items], ast.Load())
+
+        if all(value is not _DYNAMIC for _, value in items):
+            return node, [value for _, value in items]
+        return node, _DYNAMIC
+
+    def mapping(self, data: t.Mapping, context: str):
+        fields = []
+        result = None
+
+        for key, value in data.items():
+            if key == "$$exec" and isinstance(value, dict):
+                fields.append((key, (self.exec(value, context), _DYNAMIC)))
+            elif key == "$$execs" and isinstance(value, list):
+                items, _ = self.sequence(value, context)
+                node = self.call(
+                    self.constant(_execs), items, ast.Name(context, ast.Load())
+                )
+                fields.append((key, (node, _DYNAMIC)))
+            elif key == "$$join" and isinstance(value, list):
+                result = self.join(value, context)
+            elif key == "$$cast" and isinstance(value, str):
+                result = self.cast(data, context)
+            elif key == "$$assert":
+                result = self.assertion(data, context)
+            elif key == "$$if" and "$$then" in data:
+                result = self.condition(data, context)
+            elif key == "$$?" and "$$:" in data:
+                result = self.shorthand(data, context)
+            else:
+                fields.append((key, self.expression(value, context)))
+
+            if result:
+                break
+
+        if result:
+            prefix = [node for _, (node, value) in fields if value is _DYNAMIC]
+            if not prefix:
+                return result
+
+            node = ast.Subscript(
+                ast.Tuple([*prefix, result[0]], ast.Load()),
+                ast.UnaryOp(ast.USub(), ast.Constant(1)),
+                ast.Load(),
+            )
+            return node, _DYNAMIC
+
+        node = ast.Dict(
+            [ast.Constant(key) for key, _ in fields],
+            [node for _, (node, _) in fields],
+        )
+        if all(value is not _DYNAMIC for _, (_, value) in fields):
+            return node, {key: value for key, (_, value) in fields}
+        return node, _DYNAMIC
+
+    def join(self, data: t.Sequence, context: str):
+        items = []
+
+        for item in data:
+            node, value = self.expression(item, context)
+            if (
+                items
+                and isinstance(value, str)
+                and isinstance(items[-1][1], str)
+            ):
+                merged = items[-1][1] + value
+                items[-1] = (ast.Constant(merged), merged)
+            else:
+                items.append((node, value))
+
+        if all(value is not _DYNAMIC for _, value in items):
+            try:
+                joined = "".join(value for _, value in items)
+            except Exception:
+                pass
+            else:
+                return ast.Constant(joined), joined
+
+        node = self.call(
+            ast.Attribute(ast.Constant(""), "join", ast.Load()),
+            ast.Tuple([node for node, _ in items], ast.Load()),
+        )
+        return node, _DYNAMIC
+
+    def cast(self, data: t.Mapping, context: str):
+        target, target_value = self.expression(data.get("target"), context)
+        cast, cast_value = self.expression(data.get("$$cast"), context)
+
+        if cast_value is not _DYNAMIC and cast_value in casts:
+            func = casts[cast_value]
+
+            if target_value is not _DYNAMIC:
+                try:
+                    value = func(target_value)
+                except Exception:
+                    pass
+                else:
+                    return self.literal(value), value
+
+            return self.call(self.constant(func), target), _DYNAMIC
+
+        lookup = self.call(
+            ast.Attribute(self.constant(casts), "get", ast.Load()), cast
+        )
+        return self.call(lookup, target), _DYNAMIC
+
+    def assertion(self, data: t.Mapping, context: str):
+        condition, value = self.expression(data.get("$$assert"), context)
+        message, _ = self.expression(data.get("$$message"), context)
+
+        if value is not _DYNAMIC and value:
+            return ast.Constant(None), None
+
+        thunk = ast.Lambda(
+            ast.arguments(
+                posonlyargs=[], args=[], kwonlyargs=[], kw_defaults=[], defaults=[]
+            ),
+            message,
+        )
+        return self.call(self.constant(_assert), condition, thunk), _DYNAMIC
+
+    def condition(self, data: t.Mapping, context: str):
+        condition, value = self.expression(data.get("$$if"), context)
+        then = self.expression(data.get("$$then"), context)
+        otherwise = self.expression(data.get("$$else"), context)
+
+        if value is not _DYNAMIC:
+            return then if value else otherwise
+
+        return ast.IfExp(condition, then[0], otherwise[0]), _DYNAMIC
+
+    def shorthand(self, data: t.Mapping, context: str):
+        condition, value = self.expression(data.get("$$?"), context)
+        otherwise = self.expression(data.get("$$:"), context)
+
+        if value is not _DYNAMIC:
+            return (condition, value) if value else otherwise
+
+        return ast.BoolOp(ast.Or(), [condition, otherwise[0]]), _DYNAMIC
+
+    def exec(self, spec: t.Mapping, context: str) -> ast.expr:
+        name = f"_exec{len(self.functions)}"
+        self.functions.append(None)
+
+        action = spec.get("action")
+        macro = spec.get("macro")
+        body = []
+        tail = []
+
+        awaitable = self.constant(isawaitable)
+        resume = ast.Name(f"{name}_resume", ast.Load())
+
+        cache = None
+        key = ast.Constant(None)
+        if spec.get("cache") and (action or macro):
+            cache = self.constant(caches.get(spec))
+            key = ast.Name("key", ast.Load())
+
+        if not action and not macro:
+            node, _ = self.expression(spec, "local")
+            body += _substitute("return_value = BODY", BODY=node)
+
+        if spec.get("args"):
+            node, _ = self.expression(spec.get("args"), "local")
+            body += _substitute("arguments = ARGS", ARGS=node)
+        else:
+            body += _substitute("arguments = {}")
+        calls = len(body)
+
+        if action and "driver" in spec:
+            if spec.get("driver") == True:
+                body += _substitute("bot = context['bot']\nname = bot.default_driver")
+            else:
+                body += _substitute(
+                    "bot = context['bot']\nname = DRIVER",
+                    DRIVER=self.literal(spec.get("driver")),
+                )
+            body += _substitute(
+                "driver = bot.drivers.get(name)\n"
+                "func = getattr(driver, ACTION)\n"
+                "if func:\n"
+                "    started = CLOCK() if METRICS.enabled else None\n"
+                "    if PROFILER.active:\n"
+                "        return_value = CALL_DRIVER(\n"
+                "            driver, func, arguments,\n"
+                "            bot, f'driver:{name}.{ACTION}'\n"
+                "        )\n"
+                "    else:\n"
+                "        return_value = CALL_DRIVER(driver, func, arguments)\n"
+                "    if AWAITABLE(return_value):\n"
+                "        if started is not None:\n"
+                "            return_value = TIMER.observe_awaitable(\n"
+                "                (bot.name, name, ACTION), return_value, started\n"
+                "            )\n"
+                "        return RESUME(context, return_value, arguments, True, KEY)\n"
+                "    if started is not None:\n"
+                "        TIMER.observe((bot.name, name, ACTION), CLOCK() - started)",
+                ACTION=self.literal(action),
+                METRICS=self.constant(metrics),
+                CLOCK=self.constant(perf_counter),
+                TIMER=self.constant(driver_seconds),
+                PROFILER=self.constant(profiler),
+                CALL_DRIVER=self.constant(call_driver),
+                AWAITABLE=awaitable,
+                RESUME=resume,
+                KEY=key,
+            )
+        elif action:
+            body += _substitute(
+                "func = context['bot'].actions.get(ACTION)\n"
+                "if func:\n"
+                "    return_value = CALL(func, **arguments)\n"
+                "    if AWAITABLE(return_value):\n"
+                "        return RESUME(context, return_value, arguments, True, KEY)",
+                ACTION=self.literal(action),
+                CALL=self.constant(blocking.call),
+                AWAITABLE=awaitable,
+                RESUME=resume,
+                KEY=key,
+            )
+
+        if macro:
+            body += _substitute(
+                "func = context['bot'].macros.get(MACRO)\n"
+                "if func:\n"
+                "    if PROFILER.active:\n"
+                "        return_value = PROFILER.call(\n"
+                "            context['bot'], LABEL, func, arguments\n"
+                "        )\n"
+                "    else:\n"
+                "        return_value = CALL(func, **arguments)\n"
+                "    if AWAITABLE(return_value):\n"
+                "        return RESUME(context, return_value, arguments, False, KEY)",
+                MACRO=self.literal(macro),
+                CALL=self.constant(blocking.call),
+                LABEL=ast.Constant(f"macro:{macro}"),
+                PROFILER=self.constant(profiler),
+                AWAITABLE=awaitable,
+                RESUME=resume,
+                KEY=key,
+            )
+
+        if spec.get("store"):
+            tail += _substitute(
+                "STORE(context, return_value)",
+                STORE=self.constant(setter(spec["store"])),
+            )
+
+        if spec.get("returns"):
+            node, _ = self.expression(spec.get("returns"), "context")
+            tail += _substitute("return RETURNS", RETURNS=node)
+
+        if cache:
+            # A cached result skips the calls and goes straight to the tail.
+            lookup = _substitute(
+                "key = CACHE.key(context['bot'], arguments)\n"
+                "cached = CACHE.get(key, MISSING) if key is not None else MISSING\n"
+                "if cached is not MISSING:\n"
+                "    return_value = cached",
+                CACHE=cache,
+                MISSING=self.constant(MISSING),
+            )
+            lookup[-1].body += deepcopy(tail) + _substitute("return None")
+            body[calls:calls] = lookup
+            body += _substitute(
+                "if key is not None:\n"
+                "    CACHE.put(key, return_value)",
+                CACHE=cache,
+            )
+
+        function = _substitute(
+            f"def {name}(context):\n"
+            f"    def exec_handle(*__, **kwargs):\n"
+            f"        local = SCOPE({{'args': kwargs}}, context)\n"
+            f"        return_value = None\n"
+            f"        BODY\n"
+            f"    return exec_handle",
+            SCOPE=self.constant(Scope),
+        )[0]
+        function.body[0].body[2:] = body + tail
+        self.functions[int(name[5:])] = function
+
+        # Finishes the handle once an async driver, action or macro resolves.
+        continuation = _substitute(
+            f"async def {name}_resume(\n"
+            f"    context, return_value, arguments, before_macro, key\n"
+            f"):\n"
+            f"    return_value = await return_value",
+        )[0]
+        if macro:
+            continuation.body += _substitute(
+                "if before_macro:\n"
+                "    func = context['bot'].macros.get(MACRO)\n"
+                "    if func:\n"
+                "        return_value = CALL(func, **arguments)\n"
+                "        if AWAITABLE(return_value):\n"
+                "            return_value = await return_value",
+                MACRO=self.literal(macro),
+                CALL=self.constant(blocking.call),
+                AWAITABLE=awaitable,
+            )
+        if cache:
+            continuation.body += _substitute(
+                "if key is not None:\n"
+                "    CACHE.put(key, return_value)",
+                CACHE=cache,
+            )
+        continuation.body += deepcopy(tail)
+        if action or macro:
+            self.functions.append(continuation)
+
+        return self.call(ast.Name(name, ast.Load()), ast.Name(context, ast.Load()))
+
+    def module(self, data: t.Any) -> ast.Module:
+        node, _ = self.expression(data, "context")
+
+        build = _substitute(
+            "def __build__(_k):\n"
+            "    def node(context):\n"
+            "        return NODE\n"
+            "    return node",
+            NODE=node,
+        )[0]
+
+        unpack = []
+        if self.constants:
+            targets = [
+                ast.Name(f"_k{index}", ast.Store())
+                for index in range(len(self.constants))
+            ]
+            unpack = _substitute(
+                "TARGETS = _k", TARGETS=ast.Tuple(targets, ast.Store())
+            )
+
+        build.body = [*unpack, *self.functions, *build.body]
+        return ast.fix_missing_locations(ast.Module([build], []))
+
+
+class CodeCache:
+    def __init__(self, maxsize: int = 1024):
+        self.maxsize = maxsize
+        self.entries: t.Dict[str, t.Tuple[t.Any, t.Tuple]] = {}
+        self.__lock = Lock()
+
+    def get(self, data: t.Any) -> t.Tuple[t.Any, t.Tuple]:
+        try:
+            key = json.dumps(data)
+        except (TypeError, ValueError):
+            key = None
+
+        entry = self.entries.get(key) if key else None
+        if entry:
+            return entry
+
+        generator = Generator()
+        module = generator.module(data)
+        code = compile(module, "<tasker.codegen>", "exec")
+        entry = (code, tuple(generator.constants))
+
+        if key:
+            with self.__lock:
+                if len(self.entries) >= self.maxsize:
+                    self.entries.pop(next(iter(self.entries)))
+                self.entries[key] = entry
+        return entry
+
+
+code_cache = CodeCache()
+
+
+def source(data: t.Any) -> str:
+    return ast.unparse(Generator().module(data))
+
+
+def compile_node(data: t.Any) -> Node:
+    code, constants = code_cache.get(data)
+
+    # Handles report this module, so blocking.call keeps them on the loop.
+    namespace = {"__name__": __name__}
+    exec(code, namespace)
+    return namespace["__build__"](constants)
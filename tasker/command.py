@@ -1,5 +1,7 @@
 
 class Command:
+    __slots__ = ("bot",)
+
     def setup(self, bot):
         self.bot = bot
 
@@ -0,0 +1,461 @@
+import typing as t
+
+from inspect import isawaitable
+from time import perf_counter
+
+from . import blocking, metrics, profiler
+from .scope import Scope
+from .cache import MISSING, caches
+from .drivers import call_driver
+from .memo import Memoized
+from .metrics import driver_seconds
+from .paths import accessor, setter
+from .dependencies import data_reads, has_effects
+
+casts = {
+    "string": lambda i: str(i),
+    "number": lambda i: int(i),
+    "decimal": lambda i: float(i),
+    "boolean": lambda i: bool(i),
+}
+
+Node = t.Callable[[Scope], t.Any]
+
+
+class Constant:
+    __slots__ = ("value",)
+
+    def __init__(self, value: t.Any):
+        self.value = value
+
+    def __call__(self, context: Scope) -> t.Any:
+        return self.value
+
+
+class Literal(Constant):
+    # A static list or dict. The interpreter builds a fresh container on every
+    # evaluation, so hand out a copy rather than the shared template.
+    __slots__ = ("flat",)
+
+    def __init__(self, value: t.Union[t.List, t.Dict]):
+        super().__init__(value)
+        items = value.values() if isinstance(value, dict) else value
+        self.flat = not any(
+            isinstance(item, (list, dict)) and item for item in items
+        )
+
+    def __call__(self, context: Scope) -> t.Any:
+        if self.flat:
+            return self.value.copy()
+        return rebuild(self.value)
+
+
+def rebuild(value: t.Any) -> t.Any:
+    if not value:
+        return value
+    if isinstance(value, list):
+        return [rebuild(item) for item in value]
+    if isinstance(value, dict):
+        return {key: rebuild(item) for key, item in value.items()}
+    return value
+
+
+def is_static(node: Node) -> bool:
+    return isinstance(node, Constant)
+
+
+def fold(func: t.Callable, *nodes: Constant) -> t.Optional[Constant]:
+    # Evaluate an operator over static operands at compile time. Anything
+    # that fails is left to fail at run time, where the interpreter would.
+    try:
+        return Constant(func(*(node.value for node in nodes)))
+    except Exception:
+        return None
+
+
+def compile_list(data: t.Sequence) -> Node:
+    items = [compile_node(item) for item in data]
+
+    if all(map(is_static, items)):
+        return Literal([item.value for item in items])
+
+    def sequence(context):
+        return [item(context) for item in items]
+
+    return sequence
+
+
+def compile_exec(spec: t.Mapping) -> Node:
+    action = spec.get("action")
+    macro = spec.get("macro")
+    store = setter(spec["store"]) if spec.get("store") else None
+    has_driver = "driver" in spec
+    driver_name = spec.get("driver")
+
+    body = compile_node(spec) if not action and not macro else None
+    args = compile_node(spec.get("args")) if spec.get("args") else None
+    returns = compile_node(spec.get("returns")) if spec.get("returns") else None
+    macro_label = f"macro:{macro}"
+    cache = caches.get(spec) if spec.get("cache") and (action or macro) else None
+
+    async def resume(context, return_value, arguments, before_macro, key):
+        # An async driver, action or macro returned an awaitable: finish the
+        # remaining steps once it resolves.
+        return_value = await return_value
+
+        if macro and before_macro:
+            func = context["bot"].macros.get(macro)
+            if func:
+                return_value = blocking.call(func, **arguments)
+                if isawaitable(return_value):
+                    return_value = await return_value
+
+        if key is not None:
+            cache.put(key, return_value)
+
+        if store:
+            store(context, return_value)
+
+        if returns:
+            return returns(context)
+
+    def exec_node(context):
+        def exec_handle(*__, **kwargs):
+            local = Scope({"args": kwargs}, context)
+            return_value = None
+
+            if body:
+                return_value = body(local)
+
+            arguments = args(local) if args else {}
+
+            key = None
+            if cache is not None:
+                key = cache.key(context["bot"], arguments)
+                cached = cache.get(key, MISSING) if key is not None else MISSING
+                if cached is not MISSING:
+                    if store:
+                        store(context, cached)
+                    if returns:
+                        return returns(context)
+                    return None
+
+            if action:
+                bot = context["bot"]
+                if has_driver:
+                    name = bot.default_driver if driver_name == True else driver_name
+                    driver = bot.drivers.get(name)
+                    func = getattr(driver, action)
+
+                    if func:
+                        started = perf_counter() if metrics.enabled else None
+                        if profiler.active:
+                            return_value = call_driver(
+                                driver, func, arguments,
+                                bot, f"driver:{name}.{action}"
+                            )
+                        else:
+                            return_value = call_driver(driver, func, arguments)
+                        if isawaitable(return_value):
+                            if started is not None:
+                                return_value = driver_seconds.observe_awaitable(
+                                    (bot.name, name, action), return_value, started
+                                )
+                            return resume(context, return_value, arguments, True, key)
+                        if started is not None:
+                            driver_seconds.observe(
+                                (bot.name, name, action), perf_counter() - started
+                            )
+                else:
+                    func = bot.actions.get(action)
+                    if func:
+                        return_value = blocking.call(func, **arguments)
+                        if isawaitable(return_value):
+                            return resume(context, return_value, arguments, True, key)
+
+            if macro:
+                func = context["bot"].macros.get(macro)
+                if func:
+                    if profiler.active:
+                        return_value = profiler.call(
+                            context["bot"], macro_label, func, arguments
+                        )
+                    else:
+                        return_value = blocking.call(func, **arguments)
+                    if isawaitable(return_value):
+                        return resume(context, return_value, arguments, False, key)
+
+            if key is not None:
+                cache.put(key, return_value)
+
+            if store:
+                store(context, return_value)
+
+            if returns:
+                return returns(context)
+
+        return exec_handle
+
+    return exec_node
+
+
+async def resume_execs(
+    pending: t.Awaitable,
+    funcs: t.Iterator[t.Callable],
+    context: Scope,
+    kwargs: t.Mapping,
+) -> None:
+    await pending
+    for func in funcs:
+        result = func(**{**context, **kwargs})
+        if isawaitable(result):
+            await result
+
+
+def compile_execs(data: t.Sequence) -> Node:
+    items = compile_list(data)
+
+    def execs_node(context):
+        funcs = items(context)
+
+        def execs(*_, **kwargs):
+            remaining = iter(funcs)
+            for func in remaining:
+                result = func(**{**context, **kwargs})
+                if isawaitable(result):
+                    return resume_execs(result, remaining, context, kwargs)
+
+        return execs
+
+    return execs_node
+
+
+def compile_join(data: t.Sequence) -> Node:
+    items = []
+
+    # Merge runs of static strings so that only the dynamic pieces are left
+    # for run time.
+    for item in map(compile_node, data):
+        if (
+            items
+            and is_static(item) and isinstance(item.value, str)
+            and is_static(items[-1]) and isinstance(items[-1].value, str)
+        ):
+            items[-1] = Constant(items[-1].value + item.value)
+        else:
+            items.append(item)
+
+    if all(map(is_static, items)):
+        folded = fold(lambda *values: "".join(values), *items)
+        if folded:
+            return folded
+
+    if len(items) == 1:
+        item = items[0]
+
+        def join_one(context):
+            return "".join((item(context),))
+
+        return join_one
+
+    def join(context):
+        return "".join(item(context) for item in items)
+
+    return join
+
+
+def compile_cast(data: t.Mapping) -> Node:
+    target = compile_node(data.get("target"))
+    cast = compile_node(data.get("$$cast"))
+
+    if is_static(cast) and cast.value in casts:
+        func = casts[cast.value]
+
+        if is_static(target):
+            folded = fold(func, target)
+            if folded:
+                return folded
+
+        def static_cast(context):
+            return func(target(context))
+
+        return static_cast
+
+    def cast_node(context):
+        return casts.get(cast(context))(target(context))
+
+    return cast_node
+
+
+def compile_assert(data: t.Mapping) -> Node:
+    condition = compile_node(data.get("$$assert"))
+    message = compile_node(data.get("$$message"))
+
+    if is_static(condition) and condition.value:
+        return Constant(None)
+
+    def assert_node(context):
+        assert condition(context), message(context) or ""
+
+    return assert_node
+
+
+def compile_if(data: t.Mapping) -> Node:
+    condition = compile_node(data.get("$$if"))
+    then = compile_node(data.get("$$then"))
+    otherwise = compile_node(data.get("$$else"))
+
+    if is_static(condition):
+        return then if condition.value else otherwise
+
+    def if_node(context):
+        if condition(context):
+            return then(context)
+        return otherwise(context)
+
+    return if_node
+
+
+def compile_if_shorthand(data: t.Mapping) -> Node:
+    condition = compile_node(data.get("$$?"))
+    otherwise = compile_node(data.get("$$:"))
+
+    if is_static(condition):
+        return condition if condition.value else otherwise
+
+    def if_shorthand(context):
+        return condition(context) or otherwise(context)
+
+    return if_shorthand
+
+
+def shares_result(data: t.Any) -> bool:
+    # Whether every result ``data`` can produce is a scalar or an object read
+    # from the bot, rather than a container built fresh on each evaluation.
+    if isinstance(data, dict):
+        if "$$join" in data or "$$cast" in data:
+            return True
+        if "$$if" in data and "$$then" in data:
+            return shares_result(data.get("$$then")) and shares_result(
+                data.get("$$else")
+            )
+        if "$$?" in data and "$$:" in data:
+            return shares_result(data.get("$$?")) and shares_result(data.get("$$:"))
+        return not data
+    if isinstance(data, list):
+        return not data
+    return True
+
+
+def memoize(node: Node, data: t.Mapping) -> Node:
+    if is_static(node) or has_effects(data) or not shares_result(data):
+        return node
+
+    # Stamps only change when a top-level key is written, so reads that
+    # reach inside a value would miss in-place changes to it.
+    keys = data_reads(data, nested=False)
+    if not keys:
+        return node
+    return Memoized(node, keys)
+
+
+def compile_mapping(data: t.Mapping) -> Node:
+    fields = []
+    result = None
+
+    for key, value in data.items():
+        if key == "$$exec" and isinstance(value, dict):
+            fields.append((key, compile_exec(value)))
+        elif key == "$$execs" and isinstance(value, list):
+            fields.append((key, compile_execs(value)))
+        elif key == "$$join" and isinstance(value, list):
+            result = compile_join(value)
+        elif key == "$$cast" and isinstance(value, str):
+            result = compile_cast(data)
+        elif key == "$$assert":
+            result = compile_assert(data)
+        elif key == "$$if" and "$$then" in data:
+            result = compile_if(data)
+        elif key == "$$?" and "$$:" in data:
+            result = compile_if_shorthand(data)
+        else:
+            fields.append((key, compile_node(value)))
+
+        if result:
+            break
+
+    if result:
+        if all(is_static(field) for _, field in fields):
+            return memoize(result, data)
+
+        # Keys before the operator are still evaluated, as the interpreter
+        # does, so that nested assertions keep firing.
+        def operator(context):
+            for _, field in fields:
+                field(context)
+            return result(context)
+
+        return operator
+
+    if all(is_static(field) for _, field in fields):
+        return Literal({key: field.value for key, field in fields})
+
+    def mapping(context):
+        return {key: field(context) for key, field in fields}
+
+    return mapping
+
+
+def compile_node(data: t.Any) -> Node:
+    if not data:
+        return Constant(data)
+
+    if isinstance(data, str):
+        if data.startswith("$$"):
+            return accessor(data)
+        return Constant(data)
+    elif isinstance(data, list):
+        return compile_list(data)
+    elif isinstance(data, dict):
+        return compile_mapping(data)
+    return Constant(data)
+
+
+def bind_macro(node: Node, bot) -> t.Any:
+    macro = node(Scope({"bot": bot}))
+
+    if isinstance(macro, dict):
+        if "$$exec" in macro:
+            macro = macro.get("$$exec")
+        elif "$$execs" in macro:
+            macro = macro.get("$$execs")
+    return macro
+
+
+def bind_action(node: Node, bot) -> t.Any:
+    action = node(Scope({"bot": bot}))
+
+    if isinstance(action, dict):
+        if "$$exec" in action:
+            action = action.get("$$exec")
+        elif "$$execs" in action:
+            action = action.get("$$execs")
+        elif "$$macro" in action:
+            action = bind_macro_call(action.get("$$macro"), bot)
+    return action
+
+
+def bind_macro_call(macro: t.Mapping, bot) -> t.Callable:
+    target = bot.macros.get(macro.get("target"))
+    args = compile_node(macro.get("args")) if macro.get("args") else None
+    label = f"macro:{macro.get('target')}"
+
+    def macro_handle(**kwargs):
+        arguments = args(Scope({"bot": bot, "args": kwargs})) if args else {}
+
+        if target:
+            if profiler.active:
+                return profiler.call(bot, label, target, arguments)
+            return blocking.call(target, **arguments)
+
+    return macro_handle
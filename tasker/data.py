@@ -0,0 +1,212 @@
+import typing as t
+
+from copy import deepcopy
+from itertools import count
+from collections.abc import MutableMapping
+
+# Every write takes the next value from one process-wide clock, so a stamp
+# identifies a single write no matter which bot or copy it happened in.
+_clock = count(1)
+
+_SCALARS = (str, int, float, bool, type(None))
+
+
+def _unchanged(old: t.Any, value: t.Any) -> bool:
+    if old is value:
+        return True
+    return type(old) is type(value) and isinstance(value, _SCALARS) and old == value
+
+
+class BotData(dict):
+    """
+    ``dict`` that stamps each top-level key when it is written.
+
+    Keys that were never written or have been removed have no stamp, which
+    matches how reads treat them (as ``None``). Nested values mutated in
+    place are not seen; call :meth:`touch` after changing them.
+    """
+
+    __slots__ = ("_stamps",)
+
+    def __init__(self, *args, **kwargs):
+        super().__init__()
+        self._stamps = {}
+        self.update(*args, **kwargs)
+
+    def __setitem__(self, key: str, value: t.Any) -> None:
+        # Re-storing an equal scalar (a periodic ``store`` of the same result)
+        # keeps the stamp, so nothing that read the key is invalidated.
+        if key not in self._stamps or not _unchanged(self.get(key), value):
+            self._stamps[key] = next(_clock)
+        super().__setitem__(key, value)
+
+    def __delitem__(self, key: str) -> None:
+        super().__delitem__(key)
+        self._stamps.pop(key, None)
+
+    def update(self, *args, **kwargs) -> None:
+        for key, value in dict(*args, **kwargs).items():
+            self[key] = value
+
+    def __ior__(self, other: t.Mapping) -> "BotData":
+        self.update(other)
+        return self
+
+    def setdefault(self, key: str, default: t.Any = None) -> t.Any:
+        if key not in self:
+            self[key] = default
+        return self[key]
+
+    def pop(self, key: str, *default: t.Any) -> t.Any:
+        self._stamps.pop(key, None)
+        return super().pop(key, *default)
+
+    def popitem(self) -> t.Tuple[str, t.Any]:
+        key, value = super().popitem()
+        self._stamps.pop(key, None)
+        return key, value
+
+    def clear(self) -> None:
+        super().clear()
+        self._stamps.clear()
+
+    def copy(self) -> "BotData":
+        data = BotData()
+        dict.update(data, self)
+        data._stamps.update(self._stamps)
+        return data
+
+    def touch(self, key: str) -> None:
+        if key in self:
+            self._stamps[key] = next(_clock)
+
+    def stamp(self, key: str) -> t.Optional[int]:
+        return self._stamps.get(key)
+
+    def stamps(self, keys: t.Iterable[str]) -> t.Tuple[t.Optional[int], ...]:
+        return tuple(map(self._stamps.get, keys))
+
+
+class DataOverlay(MutableMapping):
+    """
+    Copy-free view of a bot's data for one execution.
+
+    Reads fall through the written keys, then the ``layer`` (usually the
+    request context), then ``base``. Writes stay in the overlay until
+    :meth:`commit` applies them to ``base``; the layer itself is never
+    committed.
+    """
+
+    __slots__ = ("base", "layer", "writes", "removed", "_stamps")
+
+    def __init__(self, base: t.Mapping, layer: t.Optional[t.Mapping] = None):
+        self.base = base
+        self.layer = dict(layer or {})
+        self.writes = {}
+        self.removed = set()
+        self._stamps = {}
+
+        for key, value in self.layer.items():
+            if key in base and _unchanged(base[key], value):
+                self._stamps[key] = base.stamp(key)
+            else:
+                self._stamps[key] = next(_clock)
+
+    def __repr__(self):
+        return f"DataOverlay({self.flatten()!r})"
+
+    def get(self, key: str, default: t.Any = None) -> t.Any:
+        if key in self.writes:
+            return self.writes[key]
+        if key in self.removed:
+            return default
+        if key in self.layer:
+            return self.layer[key]
+        return self.base.get(key, default)
+
+    def __getitem__(self, key: str) -> t.Any:
+        if key in self.writes:
+            return self.writes[key]
+        if key in self.removed:
+            raise KeyError(key)
+        if key in self.layer:
+            return self.layer[key]
+        return self.base[key]
+
+    def __contains__(self, key: object) -> bool:
+        if key in self.writes:
+            return True
+        if key in self.removed:
+            return False
+        return key in self.layer or key in self.base
+
+    def __setitem__(self, key: str, value: t.Any) -> None:
+        if key not in self._stamps or not _unchanged(self.get(key), value):
+            self._stamps[key] = next(_clock)
+        self.writes[key] = value
+        self.removed.discard(key)
+
+    def __delitem__(self, key: str) -> None:
+        if key not in self:
+            raise KeyError(key)
+        self.writes.pop(key, None)
+        self._stamps.pop(key, None)
+        self.removed.add(key)
+
+    def __iter__(self) -> t.Iterator[str]:
+        seen = set()
+        for mapping in (self.writes, self.layer, self.base):
+            for key in mapping:
+                if key not in seen and key not in self.removed:
+                    seen.add(key)
+                    yield key
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def __bool__(self) -> bool:
+        # Truth tests are common (``not data`` in lookups); stop at the
+        # first key instead of counting them all.
+        for _ in self:
+            return True
+        return False
+
+    def flatten(self) -> t.Dict[str, t.Any]:
+        return {key: self[key] for key in self}
+
+    def copy(self) -> BotData:
+        data = BotData()
+        dict.update(data, self.flatten())
+        data._stamps.update({key: self.stamp(key) for key in data})
+        return data
+
+    def own(self, key: str) -> t.Any:
+        # Copy a value into the overlay before it is changed in place, so that
+        # nested writes do not leak into ``base`` before a commit.
+        if key not in self.writes and key in self:
+            self.writes[key] = deepcopy(self[key])
+        return self.writes.get(key)
+
+    def touch(self, key: str) -> None:
+        if key in self:
+            self._stamps[key] = next(_clock)
+
+    def stamp(self, key: str) -> t.Optional[int]:
+        if key in self.removed:
+            return None
+        if key in self._stamps:
+            return self._stamps[key]
+        return self.base.stamp(key)
+
+    def stamps(self, keys: t.Iterable[str]) -> t.Tuple[t.Optional[int], ...]:
+        return tuple(map(self.stamp, keys))
+
+    def commit(self) -> None:
+        for key in self.removed:
+            self.base.pop(key, None)
+        self.base.update(self.writes)
+        self.discard()
+
+    def discard(self) -> None:
+        self.writes.clear()
+        self.removed.clear()
@@ -0,0 +1,47 @@
+import typing as t
+
+from .paths import accessor, DataAccessor
+
+
+def references(data: t.Any) -> t.Iterator[str]:
+    """Yield every ``$$`` reference found anywhere in a definition."""
+
+    if not data:
+        return
+    if isinstance(data, str):
+        if data.startswith("$$"):
+            yield data
+    elif isinstance(data, list):
+        for item in data:
+            yield from references(item)
+    elif isinstance(data, dict):
+        for value in data.values():
+            yield from references(value)
+
+
+def has_effects(data: t.Any) -> bool:
+    """Whether evaluating ``data`` can do more than compute a value."""
+
+    if isinstance(data, list):
+        return any(has_effects(item) for item in data)
+    if isinstance(data, dict):
+        if "$$exec" in data or "$$execs" in data or "$$assert" in data:
+            return True
+        return any(has_effects(value) for value in data.values())
+    return False
+
+
+def data_reads(data: t.Any, nested: bool = True) -> t.Optional[t.FrozenSet[str]]:
+    """
+    The top-level ``bot.data`` keys ``data`` reads, or ``None`` when it also
+    depends on something else (``$$args``, bare names, the bot itself) or,
+    with ``nested=False``, reads below a key (``$$bot.data.user.name``).
+    """
+
+    keys = set()
+    for reference in references(data):
+        path = accessor(reference)
+        if not isinstance(path, DataAccessor) or (path.rest and not nested):
+            return None
+        keys.add(path.key)
+    return frozenset(keys)
@@ -1,8 +1,542 @@
+import json
+import time
+import asyncio
 import typing as t
+
+from collections import deque
+from functools import partial
+from inspect import isawaitable, iscoroutinefunction
+from threading import Event, Lock
 from types import NoneType
 
+from . import blocking, profiler
+from .metrics import limiter_in_flight, limiter_queue_depth, limiter_wait_seconds
+
+# Keys of drivers[].config read by the limiter instead of the driver.
+LIMIT_OPTIONS = {"rate_limit": "rate", "burst": "burst", "max_concurrency": "concurrency"}
+
+
+def service_key(driver_type: str, config: t.Optional[t.Mapping] = None) -> str:
+    # Drivers of one type with the same config talk to the same service.
+    if not config:
+        return driver_type
+    try:
+        return f"{driver_type}:{json.dumps(config, sort_keys=True)}"
+    except (TypeError, ValueError):
+        return driver_type
+
+
+# Exceptions of a driver call that count against its circuit: the service
+# or the connection to it failed. Drivers extend them with ``failures``.
+SERVICE_ERRORS: t.Tuple[t.Type[BaseException], ...] = (OSError, TimeoutError)
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of calling a driver while its circuit is open."""
+
+    def __init__(self, driver: str, retry_after: float):
+        super().__init__(
+            f"Circuit of driver '{driver}' is open", driver, round(retry_after, 3)
+        )
+        self.driver = driver
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """
+    Tracks the failures of calls to a driver over a time window.
+
+    The circuit opens once at least ``minimum_calls`` calls were made in the
+    current ``window`` seconds and at least ``failure_rate`` of them failed;
+    calls then raise :class:`CircuitOpenError` without reaching the driver.
+    After ``reset_timeout`` seconds up to ``half_open_calls`` probes are let
+    through: the circuit closes when they all succeed and opens again as
+    soon as one fails.
+
+    Only exceptions in ``failures`` (the driver's transport and service
+    errors) count as failures; any other exception, such as a TypeError
+    for bad arguments, is the caller's and leaves the circuit alone.
+
+    While the circuit is closed a successful call only bumps a counter,
+    without the lock or the clock; failures take the lock and start a new
+    window once the current one is over.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half-open"
+
+    def __init__(
+        self,
+        name: str,
+        failure_rate: float = 0.5,
+        minimum_calls: int = 5,
+        window: float = 30.0,
+        reset_timeout: float = 10.0,
+        half_open_calls: int = 1,
+        clock: t.Callable[[], float] = time.monotonic,
+        failures: t.Tuple[t.Type[BaseException], ...] = SERVICE_ERRORS,
+    ):
+        self.name = name
+        self.failure_rate = failure_rate
+        self.minimum_calls = minimum_calls
+        self.window = window
+        self.reset_timeout = reset_timeout
+        self.half_open_calls = half_open_calls
+        self.clock = clock
+        self.errors = failures
+        self.state = self.CLOSED
+        # Successes and failures in the window starting at ``started``.
+        # Concurrent successes may occasionally lose an increment.
+        self.successes = 0
+        self.failures = 0
+        self.started = clock()
+        self.opened_at = 0.0
+        self.probes = 0
+        self.passed = 0
+        self.rejected = 0
+        self.__lock = Lock()
+
+    @property
+    def calls(self) -> int:
+        return self.successes + self.failures
+
+    def allow(self) -> bool:
+        # Returns whether the call is a half-open probe.
+        if self.state is self.CLOSED:
+            return False
+
+        with self.__lock:
+            if self.state == self.OPEN:
+                elapsed = self.clock() - self.opened_at
+                if elapsed < self.reset_timeout:
+                    self.rejected += 1
+                    raise CircuitOpenError(self.name, self.reset_timeout - elapsed)
+                self.state = self.HALF_OPEN
+                self.probes = self.passed = 0
+
+            if self.state == self.HALF_OPEN:
+                if self.probes >= self.half_open_calls:
+                    self.rejected += 1
+                    raise CircuitOpenError(self.name, 0.0)
+                self.probes += 1
+                return True
+            return False
+
+    def record(self, failed: bool, probe: bool = False) -> None:
+        if not probe and not failed:
+            if self.state is self.CLOSED:
+                self.successes += 1
+            return
+
+        now = self.clock()
+        with self.__lock:
+            if probe:
+                if self.state != self.HALF_OPEN:
+                    return
+                if failed:
+                    self.__open(now)
+                else:
+                    self.passed += 1
+                    if self.passed >= self.half_open_calls:
+                        self.state = self.CLOSED
+                        self.__reset(now)
+                return
+
+            # Calls let through before the circuit opened finish unrecorded.
+            if self.state != self.CLOSED:
+                return
+
+            if now - self.started >= self.window:
+                self.__reset(now)
+            self.failures += 1
+
+            calls = self.calls
+            if calls >= self.minimum_calls and self.failures >= self.failure_rate * calls:
+                self.__open(now)
+
+    def release(self, probe: bool) -> None:
+        # A probe ended without an outcome (e.g. it was cancelled).
+        if probe:
+            with self.__lock:
+                if self.state == self.HALF_OPEN and self.probes:
+                    self.probes -= 1
+
+    def __reset(self, now: float) -> None:
+        self.successes = self.failures = 0
+        self.started = now
+
+    def __open(self, now: float) -> None:
+        self.state = self.OPEN
+        self.opened_at = now
+        self.__reset(now)
+
+    def call(self, func: t.Callable, *args, **kwargs) -> t.Any:
+        probe = self.allow()
+        try:
+            result = func(*args, **kwargs)
+        except BaseException as e:
+            self.__failed(e, probe)
+            raise
+
+        if isawaitable(result):
+            return self.__settle(result, probe)
+        self.record(False, probe)
+        return result
+
+    async def __settle(self, awaitable: t.Awaitable, probe: bool) -> t.Any:
+        try:
+            result = await awaitable
+        except BaseException as e:
+            self.__failed(e, probe)
+            raise
+        self.record(False, probe)
+        return result
+
+    def __failed(self, exception: BaseException, probe: bool) -> None:
+        if isinstance(exception, self.errors):
+            self.record(True, probe)
+        else:
+            self.release(probe)
+
+
+class BreakerRegistry:
+    """
+    Process-wide circuit breakers, one per downstream service.
+
+    A service is identified by the driver type and its config, so every bot
+    that talks to it trips and recovers the same circuit. Options only
+    apply when the breaker is created.
+    """
+
+    def __init__(self):
+        self.breakers: t.Dict[str, CircuitBreaker] = {}
+        self.__lock = Lock()
+
+    def get(
+        self,
+        key: str,
+        options: t.Optional[t.Mapping] = None,
+        failures: t.Tuple[t.Type[BaseException], ...] = SERVICE_ERRORS,
+    ) -> CircuitBreaker:
+        breaker = self.breakers.get(key)
+        if breaker is None:
+            with self.__lock:
+                breaker = self.breakers.get(key)
+                if breaker is None:
+                    breaker = self.breakers[key] = CircuitBreaker(
+                        key, failures=failures, **(options or {})
+                    )
+        return breaker
+
+    def stats(self) -> t.List[t.Dict[str, t.Any]]:
+        return [
+            {
+                "driver": key,
+                "state": breaker.state,
+                "calls": breaker.calls,
+                "failures": breaker.failures,
+                "rejected": breaker.rejected,
+            }
+            for key, breaker in list(self.breakers.items())
+        ]
+
+    def clear(self) -> None:
+        with self.__lock:
+            self.breakers.clear()
+
+
+breakers = BreakerRegistry()
+
+
+def circuit(driver: t.Any) -> CircuitBreaker:
+    # The breaker set by the template, or the shared one of the driver type.
+    breaker = getattr(driver, "breaker", None)
+    if breaker is None:
+        driver_type = getattr(driver, "name", type(driver).__name__)
+        breaker = breakers.get(
+            service_key(driver_type, getattr(driver, "data", None)),
+            failures=getattr(driver, "failures", SERVICE_ERRORS),
+        )
+        try:
+            driver.breaker = breaker
+        except AttributeError:
+            pass
+    return breaker
+
+
+class DriverLimiter:
+    """
+    Token bucket and concurrency cap shared by every call to a service.
+
+    ``rate`` calls per second are allowed with bursts of up to ``burst``
+    calls, and at most ``concurrency`` calls run at once. Callers wait for
+    exactly as long as needed instead of retrying: sync drivers block their
+    thread, async drivers await. Waiting callers get slots in arrival order,
+    whichever thread or event loop they come from.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        rate: t.Optional[float] = None,
+        burst: t.Optional[float] = None,
+        concurrency: t.Optional[int] = None,
+        clock: t.Callable[[], float] = time.monotonic,
+    ):
+        self.name = name
+        self.rate = rate
+        self.burst = burst or max(1.0, rate or 0)
+        self.concurrency = concurrency
+        self.clock = clock
+        self.tokens = self.burst
+        self.updated = clock()
+        self.in_flight = 0
+        self.waiters: t.Deque = deque()
+        self.labels = (name,)
+        self.__lock = Lock()
+
+    def __reserve(self) -> float:
+        # Takes a token, going into debt if needed, and returns how long
+        # the caller has to wait for it.
+        if not self.rate:
+            return 0.0
+
+        with self.__lock:
+            now = self.clock()
+            self.tokens = min(
+                self.burst, self.tokens + (now - self.updated) * self.rate
+            )
+            self.updated = now
+            self.tokens -= 1
+            return max(0.0, -self.tokens / self.rate)
+
+    def __refund(self) -> None:
+        if self.rate:
+            with self.__lock:
+                self.tokens = min(self.burst, self.tokens + 1)
+
+    def __take_slot(self, waiter: t.Any) -> bool:
+        with self.__lock:
+            if self.in_flight < self.concurrency and not self.waiters:
+                self.in_flight += 1
+                limiter_in_flight.inc(self.labels)
+                return True
+            self.waiters.append(waiter)
+            return False
+
+    def release(self) -> None:
+        if not self.concurrency:
+            return
+
+        with self.__lock:
+            # The slot goes straight to the longest waiting caller.
+            if not self.waiters:
+                self.in_flight -= 1
+                limiter_in_flight.dec(self.labels)
+                return
+            waiter = self.waiters.popleft()
+
+        if isinstance(waiter, Event):
+            waiter.set()
+        else:
+            loop, future = waiter
+            loop.call_soon_threadsafe(self.__grant, future)
+
+    def __grant(self, future: asyncio.Future) -> None:
+        if future.done():
+            # Cancelled after the slot was handed over: pass it on.
+            self.release()
+        else:
+            future.set_result(None)
+
+    def acquire(self) -> None:
+        started = self.clock()
+        waited = False
+
+        if self.concurrency:
+            event = Event()
+            if not self.__take_slot(event):
+                waited = True
+                limiter_queue_depth.inc(self.labels)
+                try:
+                    event.wait()
+                finally:
+                    limiter_queue_depth.dec(self.labels)
+
+        delay = self.__reserve()
+        if delay:
+            waited = True
+            limiter_queue_depth.inc(self.labels)
+            try:
+                time.sleep(delay)
+            except BaseException:
+                self.__refund()
+                self.release()
+                raise
+            finally:
+                limiter_queue_depth.dec(self.labels)
+
+        limiter_wait_seconds.observe(
+            self.labels, self.clock() - started if waited else 0.0
+        )
+
+    async def acquire_async(self) -> None:
+        started = self.clock()
+        waited = False
+
+        if self.concurrency:
+            loop = asyncio.get_running_loop()
+            waiter = (loop, loop.create_future())
+            if not self.__take_slot(waiter):
+                waited = True
+                limiter_queue_depth.inc(self.labels)
+                try:
+                    await waiter[1]
+                except asyncio.CancelledError:
+                    with self.__lock:
+                        queued = waiter in self.waiters
+                        if queued:
+                            self.waiters.remove(waiter)
+                    if not queued and not waiter[1].cancelled():
+                        # The slot was granted just before the cancellation.
+                        self.release()
+                    raise
+                finally:
+                    limiter_queue_depth.dec(self.labels)
+
+        delay = self.__reserve()
+        if delay:
+            waited = True
+            limiter_queue_depth.inc(self.labels)
+            try:
+                await asyncio.sleep(delay)
+            except asyncio.CancelledError:
+                self.__refund()
+                self.release()
+                raise
+            finally:
+                limiter_queue_depth.dec(self.labels)
+
+        limiter_wait_seconds.observe(
+            self.labels, self.clock() - started if waited else 0.0
+        )
+
+    def call(self, func: t.Callable[[], t.Any], asynchronous: bool = False) -> t.Any:
+        if asynchronous:
+            return self.__call_async(func)
+
+        self.acquire()
+        try:
+            result = func()
+        except BaseException:
+            self.release()
+            raise
+
+        if isawaitable(result):
+            return self.__finish(result)
+        self.release()
+        return result
+
+    async def __call_async(self, func: t.Callable[[], t.Awaitable]) -> t.Any:
+        await self.acquire_async()
+        try:
+            return await func()
+        finally:
+            self.release()
+
+    async def __finish(self, awaitable: t.Awaitable) -> t.Any:
+        try:
+            return await awaitable
+        finally:
+            self.release()
+
+
+class LimiterRegistry:
+    """Process-wide driver limiters, keyed like :class:`BreakerRegistry`."""
+
+    def __init__(self):
+        self.limiters: t.Dict[str, DriverLimiter] = {}
+        self.__lock = Lock()
+
+    def get(self, key: str, options: t.Mapping) -> DriverLimiter:
+        limiter = self.limiters.get(key)
+        if limiter is None:
+            with self.__lock:
+                limiter = self.limiters.get(key)
+                if limiter is None:
+                    limiter = self.limiters[key] = DriverLimiter(key, **options)
+        return limiter
+
+    def stats(self) -> t.List[t.Dict[str, t.Any]]:
+        return [
+            {
+                "driver": key,
+                "rate": limiter.rate,
+                "concurrency": limiter.concurrency,
+                "in_flight": limiter.in_flight,
+                "waiting": len(limiter.waiters),
+            }
+            for key, limiter in list(self.limiters.items())
+        ]
+
+    def clear(self) -> None:
+        with self.__lock:
+            self.limiters.clear()
+
+
+limiters = LimiterRegistry()
+
+
+def split_limits(config: t.Mapping) -> t.Tuple[t.Dict, t.Dict]:
+    # Separates the limiter options of drivers[].config from the driver's.
+    limits = {
+        option: config[key] for key, option in LIMIT_OPTIONS.items() if key in config
+    }
+    return {key: value for key, value in config.items() if key not in LIMIT_OPTIONS}, limits
+
+
+def call_driver(
+    driver: t.Any,
+    func: t.Callable,
+    arguments: t.Mapping,
+    bot: t.Any = None,
+    label: t.Optional[str] = None,
+) -> t.Any:
+    # Calls a driver method through the driver's circuit breaker and
+    # limiter; ``label`` names the call for a running profiler. For an async
+    # bot a synchronous method runs on a worker thread, and the caller gets
+    # a future instead of blocking the event loop.
+    if (
+        blocking.active.get()
+        and getattr(driver, "blocking", True)
+        and not iscoroutinefunction(func)
+    ):
+        return blocking.run(call_driver, driver, func, arguments, bot, label)
+
+    limiter = getattr(driver, "limiter", None)
+    if label is None and limiter is None:
+        return circuit(driver).call(func, **arguments)
+
+    if label is None:
+        invoke = partial(func, **arguments)
+    else:
+        invoke = partial(profiler.call, bot, label, func, arguments)
+    if limiter is None:
+        return circuit(driver).call(invoke)
+    return circuit(driver).call(limiter.call, invoke, iscoroutinefunction(func))
+
 
 class BaseDriver:
+    # ``breaker`` and ``limiter`` are set by the template; until then they
+    # read as None.
+    __slots__ = ("data", "bot", "breaker", "limiter")
+    # Whether the synchronous methods wait on I/O; async bots run those on
+    # worker threads.
+    blocking = True
+    # Exceptions that mean the service failed and count against the circuit.
+    failures = SERVICE_ERRORS
+
     def __init__(self, data: t.Optional[t.Mapping | NoneType] = None):
         self.data = data or dict()
 
@@ -10,6 +544,7 @@ class BaseDriver:
         self.bot = bot
 
 class MultiDriverAdapter(BaseDriver):
+    __slots__ = ("__drivers",)
     name = "multidriver"
 
     def __init__(
@@ -38,6 +573,7 @@ class MultiDriverAdapter(BaseDriver):
 
 
 class ScrapyDriver(BaseDriver):
+    __slots__ = ()
     name = "scrapy"
 
     def __init__(self, *args, **kwargs):
@@ -45,6 +581,7 @@ class ScrapyDriver(BaseDriver):
 
 
 class PlaywrightDriver(BaseDriver):
+    __slots__ = ()
     name = "playwright"
 
     def __init__(self, *args, **kwargs):
@@ -52,7 +589,9 @@ class PlaywrightDriver(BaseDriver):
 
 
 class NotificationDriver(BaseDriver):
+    __slots__ = ()
     name = "notify"
+    blocking = False
 
     def __init__(self, *args, **kwargs):
         pass
@@ -0,0 +1,174 @@
+import typing as t
+
+from .paths import accessor, DataAccessor
+
+
+class ActionDependencies:
+    """
+    The top-level ``bot.data`` keys an action reads and writes.
+
+    ``reads`` is ``None`` when the action depends on something the analysis
+    cannot see, such as the whole ``bot.data`` mapping or a ``store`` target
+    outside of it. Such actions are always treated as changed.
+    """
+
+    __slots__ = ("reads", "writes")
+
+    def __init__(
+        self,
+        reads: t.Optional[t.FrozenSet[str]],
+        writes: t.FrozenSet[str] = frozenset(),
+    ):
+        self.reads = reads
+        self.writes = writes
+
+    def __repr__(self):
+        return f"ActionDependencies(reads={self.reads!r}, writes={self.writes!r})"
+
+    @property
+    def known(self) -> bool:
+        return self.reads is not None
+
+
+class _Collector:
+    def __init__(self, bot_data: t.Mapping):
+        self.macros = bot_data.get("macros", {})
+        self.actions = bot_data.get("actions", {})
+        self.reads = set()
+        self.writes = set()
+        self.known = True
+        self.seen = set()
+
+    def reference(self, reference: str) -> None:
+        path = accessor(reference)
+
+        if isinstance(path, DataAccessor):
+            self.reads.add(path.key)
+        elif path.name == "args":
+            # Macro arguments are read by whoever builds them.
+            pass
+        elif path.name == "bot":
+            if path.splits[:1] == ("data",):
+                self.known = False
+        else:
+            # Bare names fall back to ``bot.data`` when the scope lacks them.
+            self.reads.add(path.name)
+
+    def store(self, store: str) -> None:
+        splits = store.split(".")
+
+        if len(splits) > 2 and splits[0] == "bot" and splits[1] == "data":
+            self.writes.add(splits[2])
+        elif len(splits) > 1:
+            self.known = False
+
+    def include(self, kind: str, name: t.Any, definitions: t.Mapping) -> None:
+        if (kind, name) in self.seen or name not in definitions:
+            return
+        self.seen.add((kind, name))
+        self.visit(definitions[name])
+
+    def exec(self, spec: t.Mapping) -> None:
+        if spec.get("store"):
+            self.store(spec["store"])
+        if spec.get("macro"):
+            self.include("macro", spec["macro"], self.macros)
+        if spec.get("action") and "driver" not in spec:
+            self.include("action", spec["action"], self.actions)
+
+    def visit(self, data: t.Any) -> None:
+        if not data:
+            return
+
+        if isinstance(data, str):
+            if data.startswith("$$"):
+                self.reference(data)
+        elif isinstance(data, list):
+            for item in data:
+                self.visit(item)
+        elif isinstance(data, dict):
+            if isinstance(data.get("$$exec"), dict):
+                self.exec(data["$$exec"])
+            if isinstance(data.get("$$macro"), dict):
+                self.include("macro", data["$$macro"].get("target"), self.macros)
+            for value in data.values():
+                self.visit(value)
+
+
+def analyze_action(bot_data: t.Mapping, action_name: str) -> ActionDependencies:
+    collector = _Collector(bot_data)
+    collector.include("action", action_name, collector.actions)
+
+    if not collector.known:
+        return ActionDependencies(None, frozenset(collector.writes))
+    return ActionDependencies(frozenset(collector.reads), frozenset(collector.writes))
+
+
+def analyze(bot_data: t.Mapping) -> t.Dict[str, ActionDependencies]:
+    return {
+        action_name: analyze_action(bot_data, action_name)
+        for action_name in bot_data.get("actions", {})
+    }
+
+
+def conflicts(
+    first: t.Optional[ActionDependencies], second: t.Optional[ActionDependencies]
+) -> bool:
+    """
+    Whether two actions must keep their relative order: one reads a key the
+    other writes, both write the same key, or either is not fully known.
+    """
+
+    if not (first and first.known and second and second.known):
+        return True
+    return bool(
+        first.writes & second.reads
+        or first.reads & second.writes
+        or first.writes & second.writes
+    )
+
+
+class DependencyGraph:
+    """
+    Read/write graph between the actions of a bot, in execution order.
+
+    An action depends on every earlier action it conflicts with (see
+    :func:`conflicts`). Actions with unknown reads depend on every earlier
+    action, and every later action depends on them.
+    """
+
+    def __init__(self, dependencies: t.Mapping[str, ActionDependencies]):
+        self.dependencies = dict(dependencies)
+        self.upstream = self.schedule(self.dependencies)
+
+    def __contains__(self, action_name: str) -> bool:
+        return action_name in self.dependencies
+
+    def get(self, action_name: str) -> t.Optional[ActionDependencies]:
+        return self.dependencies.get(action_name)
+
+    def schedule(
+        self, action_names: t.Iterable[str]
+    ) -> t.Dict[str, t.FrozenSet[str]]:
+        """
+        Map each action to the earlier ones it has to wait for. Actions
+        missing from the graph (added outside the template) are unknown.
+        """
+
+        upstream = {}
+        earlier = []
+        for action_name in action_names:
+            dependency = self.dependencies.get(action_name)
+            upstream[action_name] = frozenset(
+                other for other in earlier
+                if conflicts(self.dependencies.get(other), dependency)
+            )
+            earlier.append(action_name)
+        return upstream
+
+    def without(self, action_name: str) -> "DependencyGraph":
+        return DependencyGraph({
+            name: dependency
+            for name, dependency in self.dependencies.items()
+            if name != action_name
+        })
@@ -0,0 +1,47 @@
+import typing as t
+
+
+class ExecutionContext:
+    """
+    Values, errors and timings of a single run, collected by the bot as it
+    executes actions. Unlike event listeners it is private to the caller
+    that passed it, so concurrent runs never see each other's results.
+    """
+
+    __slots__ = ("values", "errors", "timings")
+
+    def __init__(self):
+        self.values: t.List[t.Dict] = []
+        self.errors: t.List[t.Dict] = []
+        self.timings: t.Dict[str, float] = {}
+
+    def __repr__(self):
+        return (
+            f"ExecutionContext(values={self.values!r}, errors={self.errors!r}, "
+            f"timings={self.timings!r})"
+        )
+
+    @property
+    def success(self) -> bool:
+        return not self.errors
+
+    def value(self, action_name: str, return_value: t.Any) -> None:
+        self.values.append({"action": action_name, "value": return_value})
+
+    def error(self, action_name: str, exception: BaseException) -> None:
+        self.errors.append({
+            "action": action_name,
+            "error": exception.__class__.__name__,
+            "args": exception.args,
+        })
+
+    def timing(self, action_name: str, seconds: float) -> None:
+        self.timings[action_name] = seconds
+
+    def merge(self, other: "ExecutionContext") -> None:
+        self.values.extend(other.values)
+        self.errors.extend(other.errors)
+        self.timings.update(other.timings)
+
+    def result(self) -> t.Dict[str, t.Any]:
+        return {"success": self.success, "values": self.values, "errors": self.errors}
@@ -0,0 +1,549 @@
+import os
+import json
+import random
+import string
+import asyncio
+import hashlib
+import importlib
+import itertools
+import typing as t
+
+from bisect import bisect
+from threading import Thread
+from multiprocessing import Pipe
+from urllib.parse import parse_qs
+
+from .utils import process
+
+# ASGI scope keys sent to a worker; app state and server extensions stay in
+# the front end.
+SCOPE_KEYS = (
+    "type", "asgi", "http_version", "method", "scheme", "path", "raw_path",
+    "root_path", "query_string", "headers", "client", "server", "subprotocols",
+)
+
+
+def _hash(key: str) -> int:
+    return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), "big")
+
+
+class HashRing:
+    """
+    Consistent hash ring with ``replicas`` virtual points per node.
+
+    Adding a node only takes over the keys that fall just before its points,
+    about ``1 / len(nodes)`` of them; removing one hands its keys to the
+    next points on the ring. All other keys keep their owner.
+    """
+
+    def __init__(self, nodes: t.Iterable[str] = (), replicas: int = 64):
+        self.replicas = replicas
+        self.nodes: t.List[str] = []
+        self.points: t.List[int] = []
+        self.owners: t.List[str] = []
+        for node in nodes:
+            self.add(node)
+
+    def __contains__(self, node: str) -> bool:
+        return node in self.nodes
+
+    def __build(self) -> None:
+        ring = sorted(
+            (_hash(f"{node}#{replica}"), node)
+            for node in self.nodes
+            for replica in range(self.replicas)
+        )
+        self.points = [point for point, _ in ring]
+        self.owners = [node for _, node in ring]
+
+    def add(self, node: str) -> None:
+        if node not in self.nodes:
+            self.nodes.append(node)
+            self.__build()
+
+    def remove(self, node: str) -> None:
+        self.nodes.remove(node)
+        self.__build()
+
+    def get(self, key: str) -> str:
+        if not self.points:
+            raise LookupError("The ring has no nodes.")
+        return self.owners[bisect(self.points, _hash(key)) % len(self.points)]
+
+    def copy(self) -> "HashRing":
+        return HashRing(self.nodes, self.replicas)
+
+
+class _Worker:
+    """
+    The worker process side: runs ``module.app`` for the requests relayed
+    to it and keeps the bots of its partition in ``module.bots``.
+    """
+
+    def __init__(self, module, conn):
+        self.module = module
+        self.conn = conn
+        self.streams: t.Dict[int, asyncio.Queue] = {}
+        self.tasks: t.Set[asyncio.Task] = set()
+
+    async def serve(self) -> None:
+        self.loop = asyncio.get_running_loop()
+        closed = self.loop.create_future()
+        Thread(target=self.__read, args=(closed,), daemon=True).start()
+        await closed
+
+    def __read(self, closed: asyncio.Future) -> None:
+        while True:
+            try:
+                message = self.conn.recv()
+            except (EOFError, OSError):
+                break
+            self.loop.call_soon_threadsafe(self.dispatch, message)
+        self.loop.call_soon_threadsafe(closed.set_result, None)
+
+    def __spawn(self, coroutine: t.Coroutine) -> None:
+        task = asyncio.ensure_future(coroutine)
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+
+    def dispatch(self, message: t.Tuple) -> None:
+        kind, stream, payload = message
+
+        if kind == "open":
+            self.streams[stream] = asyncio.Queue()
+            self.__spawn(self.__asgi(stream, payload))
+        elif kind == "event":
+            queue = self.streams.get(stream)
+            if queue is not None:
+                queue.put_nowait(payload)
+        elif kind == "call":
+            self.__spawn(self.__call(stream, *payload))
+
+    async def __asgi(self, stream: int, scope: t.Dict) -> None:
+        async def send(event):
+            self.conn.send(("event", stream, event))
+
+        try:
+            await self.module.app(scope, self.streams[stream].get, send)
+        except Exception as e:
+            self.conn.send(("error", stream, f"{e.__class__.__name__}: {e}"))
+        finally:
+            del self.streams[stream]
+            self.conn.send(("close", stream, None))
+
+    async def __call(self, stream: int, operation: str, args: t.Tuple) -> None:
+        try:
+            result = await getattr(self, f"_op_{operation}")(*args)
+        except Exception as e:
+            self.conn.send(("error", stream, f"{e.__class__.__name__}: {e}"))
+        else:
+            self.conn.send(("result", stream, result))
+
+    async def _op_keys(self) -> t.List[str]:
+        return list(self.module.bots)
+
+    async def _op_index(self) -> t.Dict[str, t.Dict]:
+        bots = self.module.bots
+        index = {}
+        for bot_id in list(bots):
+            if hasattr(bots, "peek"):
+                data, actions = bots.peek(bot_id)
+            else:
+                data, actions = bots[bot_id].data, list(bots[bot_id].actions.keys())
+            index[bot_id] = {"data": dict(data), "actions": actions}
+        return index
+
+    async def _op_export(self, bot_id: str) -> t.Dict[str, t.Any]:
+        bot = self.module.bots[bot_id]
+        gateway = getattr(self.module, "gateway", None)
+
+        if gateway is not None:
+            # Let the executions already queued for the bot finish first.
+            async with gateway.lock(bot):
+                self.module.bots.pop(bot_id, None)
+        else:
+            self.module.bots.pop(bot_id, None)
+
+        return {"definition": bot.definition, "data": dict(bot.data)}
+
+    async def _op_load(self, bot_id: str, state: t.Mapping) -> None:
+        bot = self.module.create_bot_from_data(
+            {**state["definition"], "data": state["data"]}
+        )
+        bot.name = bot_id
+        self.module.bots[bot_id] = bot
+
+
+def _serve(module_name: str, conn, name: str) -> None:
+    if os.environ.get("TASKER_SNAPSHOT"):
+        # Each worker saves and restores the bots of its own partition.
+        os.environ["TASKER_SNAPSHOT"] += f".{name}"
+    worker = _Worker(importlib.import_module(module_name), conn)
+    asyncio.run(worker.serve())
+
+
+serve_worker = process(_serve)
+
+
+class WorkerHandle:
+    """
+    The front end's end of the pipe to a worker process. Requests and calls
+    are multiplexed over the pipe by stream id; a reader thread hands the
+    worker's messages back to the event loop.
+    """
+
+    def __init__(self, name: str, module: str, loop: asyncio.AbstractEventLoop):
+        self.name = name
+        self.loop = loop
+        self.streams: t.Dict[int, asyncio.Queue] = {}
+        self.ids = itertools.count()
+
+        self.conn, child = Pipe()
+        self.process = serve_worker(module, child, name)
+        child.close()
+
+        self.__reader = Thread(
+            target=self.__read, name=f"tasker-fleet-{name}", daemon=True
+        )
+        self.__reader.start()
+
+    def __read(self) -> None:
+        while True:
+            try:
+                message = self.conn.recv()
+            except (EOFError, OSError):
+                break
+            self.loop.call_soon_threadsafe(self.__deliver, message)
+        self.loop.call_soon_threadsafe(self.__exited)
+
+    def __deliver(self, message: t.Tuple) -> None:
+        kind, stream, payload = message
+        queue = self.streams.get(stream)
+        if queue is not None:
+            queue.put_nowait((kind, payload))
+
+    def __exited(self) -> None:
+        for queue in self.streams.values():
+            queue.put_nowait(("error", f"Worker {self.name} exited."))
+            queue.put_nowait(("close", None))
+
+    def __open(self) -> t.Tuple[int, asyncio.Queue]:
+        stream = next(self.ids)
+        queue = self.streams[stream] = asyncio.Queue()
+        return stream, queue
+
+    async def call(self, operation: str, *args) -> t.Any:
+        stream, queue = self.__open()
+        try:
+            self.conn.send(("call", stream, (operation, args)))
+            kind, payload = await queue.get()
+        finally:
+            self.streams.pop(stream, None)
+
+        if kind == "error":
+            raise RuntimeError(f"{self.name}: {payload}")
+        return payload
+
+    async def relay(
+        self, scope: t.Mapping, receive: t.Callable, send: t.Callable,
+        body: t.Optional[bytes] = None,
+    ) -> None:
+        """Runs an ASGI request or websocket on the worker."""
+        stream, queue = self.__open()
+        self.conn.send((
+            "open", stream, {key: scope[key] for key in SCOPE_KEYS if key in scope}
+        ))
+
+        async def forward():
+            if body is not None:
+                self.conn.send((
+                    "event", stream,
+                    {"type": "http.request", "body": body, "more_body": False},
+                ))
+            while True:
+                event = await receive()
+                self.conn.send(("event", stream, event))
+                if event["type"] in ("http.disconnect", "websocket.disconnect"):
+                    break
+
+        forwarding = asyncio.ensure_future(forward())
+        started = False
+        error = None
+        try:
+            while True:
+                kind, payload = await queue.get()
+                if kind == "close":
+                    break
+                if kind == "error":
+                    error = payload
+                    continue
+                if payload["type"] in ("http.response.start", "websocket.accept"):
+                    started = True
+                await send(payload)
+        finally:
+            forwarding.cancel()
+            self.streams.pop(stream, None)
+
+        if error and not started and scope["type"] == "http":
+            await _json_response(send, {"error": "WorkerError", "args": [error]}, 500)
+
+    def close(self) -> None:
+        self.process.terminate()
+        self.process.join()
+        self.conn.close()
+
+
+async def _json_response(send: t.Callable, payload: t.Any, status: int = 200) -> None:
+    body = json.dumps(payload).encode()
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+async def _read_body(receive: t.Callable) -> bytes:
+    body = b""
+    while True:
+        event = await receive()
+        if event["type"] != "http.request":
+            return body
+        body += event.get("body", b"")
+        if not event.get("more_body"):
+            return body
+
+
+class Fleet:
+    """
+    Bots sharded across ``workers`` processes by consistent hashing of the
+    bot id. Each worker imports ``module`` and serves its ``app`` with its
+    own ``bots``; the module must also provide ``create_bot_from_data``.
+
+    Adding or removing a worker moves only the bots whose owner changes,
+    one at a time: a bot is exported from its worker, loaded on the new
+    one, and only then routed there. Requests wait while a rebalance is in
+    progress. If a move fails the bots already moved are loaded back, the
+    old ring stays and a worker being added is terminated.
+    """
+
+    def __init__(self, module: str = "app", workers: t.Optional[int] = None, replicas: int = 64):
+        self.module = module
+        self.size = workers or os.cpu_count() or 1
+        self.workers: t.Dict[str, WorkerHandle] = {}
+        self.ring = HashRing(replicas=replicas)
+        # Bots living elsewhere than their owner on the ring: moved during a
+        # rebalance, or left behind by a rollback that could not load them.
+        self.routes: t.Dict[str, str] = {}
+        self.names = itertools.count()
+        self.ready: t.Optional[asyncio.Event] = None
+        self.rebalancing: t.Optional[asyncio.Lock] = None
+
+    def __spawn(self) -> WorkerHandle:
+        name = f"worker-{next(self.names)}"
+        worker = WorkerHandle(name, self.module, asyncio.get_running_loop())
+        self.workers[name] = worker
+        return worker
+
+    async def start(self) -> None:
+        self.ready = asyncio.Event()
+        self.rebalancing = asyncio.Lock()
+        for _ in range(self.size):
+            self.ring.add(self.__spawn().name)
+        self.ready.set()
+
+    async def stop(self) -> None:
+        for worker in self.workers.values():
+            worker.close()
+        self.workers.clear()
+
+    def __route(self, bot_id: str) -> str:
+        return self.routes.get(bot_id) or self.ring.get(bot_id)
+
+    async def owner(self, bot_id: str) -> WorkerHandle:
+        await self.ready.wait()
+        return self.workers[self.__route(bot_id)]
+
+    async def add_worker(self) -> str:
+        async with self.rebalancing:
+            worker = self.__spawn()
+            ring = self.ring.copy()
+            ring.add(worker.name)
+            try:
+                await self.__rebalance(ring)
+            except BaseException:
+                self.workers.pop(worker.name).close()
+                self.routes = {
+                    bot_id: name for bot_id, name in self.routes.items()
+                    if name != worker.name
+                }
+                raise
+            return worker.name
+
+    async def remove_worker(self, name: str) -> None:
+        async with self.rebalancing:
+            ring = self.ring.copy()
+            ring.remove(name)
+            await self.__rebalance(ring)
+            self.workers.pop(name).close()
+
+    async def __move(self, bot_id: str, source: str, target: str) -> t.Dict:
+        state = await self.workers[source].call("export", bot_id)
+        try:
+            await self.workers[target].call("load", bot_id, state)
+        except BaseException:
+            # Put the bot back where it was before giving up.
+            await self.workers[source].call("load", bot_id, state)
+            raise
+        self.routes[bot_id] = target
+        return state
+
+    async def __rollback(self, moved: t.List[t.Tuple[str, str, str, t.Dict]]) -> None:
+        # Requests waited during the rebalance, so the exported states are
+        # still current.
+        for bot_id, source, target, state in reversed(moved):
+            try:
+                await self.workers[source].call("load", bot_id, state)
+            except Exception:
+                continue
+            self.routes[bot_id] = source
+            try:
+                await self.workers[target].call("export", bot_id)
+            except Exception:
+                pass
+
+    async def __rebalance(self, ring: HashRing) -> int:
+        self.ready.clear()
+        moved = []
+        try:
+            for name, worker in list(self.workers.items()):
+                if name not in self.ring:
+                    continue
+                for bot_id in await worker.call("keys"):
+                    target = ring.get(bot_id)
+                    # Copies a worker keeps of bots it does not own (such as
+                    # the ones its module creates on import) stay put.
+                    if target == name or self.__route(bot_id) != name:
+                        continue
+                    state = await self.__move(bot_id, name, target)
+                    moved.append((bot_id, name, target, state))
+            self.ring = ring
+        except BaseException:
+            await self.__rollback(moved)
+            raise
+        finally:
+            self.routes = {
+                bot_id: name for bot_id, name in self.routes.items()
+                if name != self.ring.get(bot_id)
+            }
+            self.ready.set()
+        return len(moved)
+
+    async def index(self) -> t.Dict[str, t.Dict]:
+        await self.ready.wait()
+        bots = {}
+        for name, worker in list(self.workers.items()):
+            for bot_id, bot in (await worker.call("index")).items():
+                if self.__route(bot_id) == name:
+                    bots[bot_id] = bot
+        return bots
+
+
+class FleetApp:
+    """
+    ASGI front end of a :class:`Fleet`.
+
+    ``/bots/{bot_id}/...`` requests and websockets are relayed to the
+    worker owning the bot; ``/bots/create`` is routed by the bot name,
+    which is generated here when missing. ``/`` lists the bots of every
+    worker and ``/fleet`` the workers, where ``POST /fleet/workers`` adds
+    one. Other paths go to the worker picked by the ``worker`` query
+    parameter (an index, default 0), e.g. ``/metrics?worker=1``.
+    """
+
+    def __init__(self, fleet: Fleet):
+        self.fleet = fleet
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] == "lifespan":
+            return await self.__lifespan(receive, send)
+
+        path = scope["path"]
+        parts = path.strip("/").split("/")
+
+        if parts[0] == "bots" and len(parts) > 1:
+            body = None
+            if parts[1] == "create" and scope["type"] == "http":
+                body, bot_id = await self.__create(receive)
+                scope = {
+                    **scope,
+                    "headers": [
+                        (key, value) for key, value in scope["headers"]
+                        if key != b"content-length"
+                    ] + [(b"content-length", str(len(body)).encode())],
+                }
+            else:
+                bot_id = parts[1]
+            worker = await self.fleet.owner(bot_id)
+            return await worker.relay(scope, receive, send, body)
+
+        if scope["type"] == "http":
+            if path == "/":
+                return await _json_response(send, {"bots": await self.fleet.index()})
+            if path.rstrip("/") == "/fleet":
+                return await _json_response(send, self.__workers())
+            if path.rstrip("/") == "/fleet/workers" and scope["method"] == "POST":
+                await _read_body(receive)
+                name = await self.fleet.add_worker()
+                return await _json_response(send, {"success": True, "worker": name})
+
+        query = parse_qs(scope.get("query_string", b"").decode())
+        workers = list(self.fleet.workers.values())
+        try:
+            worker = workers[int(query.get("worker", ["0"])[0])]
+        except (ValueError, IndexError):
+            return await _json_response(
+                send, {"error": "ValueError", "args": ["Invalid 'worker'."]}
+            )
+        await worker.relay(scope, receive, send)
+
+    async def __create(self, receive: t.Callable) -> t.Tuple[bytes, str]:
+        body = await _read_body(receive)
+        try:
+            bot_data = json.loads(body)
+        except ValueError:
+            return body, ""
+        if not isinstance(bot_data, dict):
+            return body, ""
+
+        if not bot_data.get("name"):
+            bot_data["name"] = "bot_" + "".join(random.choices(string.digits, k=5))
+            body = json.dumps(bot_data).encode()
+        return body, bot_data["name"]
+
+    def __workers(self) -> t.Dict[str, t.Any]:
+        return {
+            "workers": [
+                {"name": name, "pid": worker.process.pid}
+                for name, worker in self.fleet.workers.items()
+            ]
+        }
+
+    async def __lifespan(self, receive, send) -> None:
+        while True:
+            event = await receive()
+            if event["type"] == "lifespan.startup":
+                await self.fleet.start()
+                await send({"type": "lifespan.startup.complete"})
+            elif event["type"] == "lifespan.shutdown":
+                await self.fleet.stop()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+
+def create_app(module: str = "app", workers: t.Optional[int] = None) -> FleetApp:
+    """Factory for ``uvicorn --factory tasker.fleet:create_app``."""
+    return FleetApp(Fleet(module, workers))
@@ -0,0 +1,54 @@
+import asyncio
+import inspect
+import typing as t
+
+from functools import partial
+from weakref import WeakKeyDictionary
+from concurrent.futures import ThreadPoolExecutor
+
+
+class ExecutionGateway:
+    """
+    Runs bot executions without blocking the event loop.
+
+    Coroutine functions (async bots) are awaited on the caller's loop, where
+    their blocking calls already go to worker threads; synchronous ones run
+    on a bounded thread pool. Executions of the same bot are queued behind
+    each other in arrival order; different bots run concurrently.
+    """
+
+    def __init__(self, max_workers: t.Optional[int] = None):
+        self.executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="tasker-gateway"
+        )
+        self.locks: t.MutableMapping[t.Any, asyncio.Lock] = WeakKeyDictionary()
+
+    def lock(self, bot) -> asyncio.Lock:
+        lock = self.locks.get(bot)
+        if lock is None:
+            lock = self.locks[bot] = asyncio.Lock()
+        return lock
+
+    def busy(self, bot) -> bool:
+        # Whether an execution of the bot is running or queued.
+        lock = self.locks.get(bot)
+        return lock is not None and lock.locked()
+
+    async def call(self, func: t.Callable, *args, **kwargs) -> t.Any:
+        # Runs ``func`` for a caller already holding the bot's lock.
+        if inspect.iscoroutinefunction(func):
+            return await func(*args, **kwargs)
+
+        result = await asyncio.get_running_loop().run_in_executor(
+            self.executor, partial(func, *args, **kwargs)
+        )
+        if inspect.isawaitable(result):
+            return await result
+        return result
+
+    async def run(self, bot, func: t.Callable, *args, **kwargs) -> t.Any:
+        async with self.lock(bot):
+            return await self.call(func, *args, **kwargs)
+
+    def shutdown(self, wait: bool = True) -> None:
+        self.executor.shutdown(wait=wait)
@@ -0,0 +1,82 @@
+import typing as t
+
+from threading import Lock
+from collections import OrderedDict
+
+from .data import _SCALARS, BotData, DataOverlay
+
+_MISSING = object()
+
+
+class Memo:
+    def __init__(self, maxsize: int = 4096):
+        self.maxsize = maxsize
+        self.entries: t.OrderedDict[t.Hashable, t.Any] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.__lock = Lock()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, key: t.Hashable, default: t.Any = None) -> t.Any:
+        with self.__lock:
+            value = self.entries.get(key, _MISSING)
+            if value is _MISSING:
+                self.misses += 1
+                return default
+            self.hits += 1
+            self.entries.move_to_end(key)
+            return value
+
+    def put(self, key: t.Hashable, value: t.Any) -> None:
+        with self.__lock:
+            self.entries[key] = value
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self.__lock:
+            self.entries.clear()
+            self.hits = self.misses = 0
+
+
+memo = Memo()
+
+
+class Memoized:
+    """
+    Caches a pure node by the stamps of the ``bot.data`` keys it reads.
+
+    Stamps come from a process-wide clock, so entries stay valid across
+    bots sharing a template and are invalidated by any write to one of the
+    keys: ``store``, the data endpoint, or an execution context overlay.
+    Only scalar values are covered by their stamp; when a key holds a list,
+    dict or object, which can change in place, the node is evaluated.
+    """
+
+    __slots__ = ("node", "keys", "memo")
+
+    def __init__(self, node: t.Callable, keys: t.Iterable[str], memo: Memo = memo):
+        self.node = node
+        self.keys = tuple(sorted(keys))
+        self.memo = memo
+
+    def __call__(self, context) -> t.Any:
+        data = getattr(context.get("bot"), "data", None)
+
+        if not data or not isinstance(data, (BotData, DataOverlay)):
+            return self.node(context)
+
+        for key in self.keys:
+            if not isinstance(data.get(key), _SCALARS):
+                return self.node(context)
+
+        key = (self, data.stamps(self.keys))
+        value = self.memo.get(key, _MISSING)
+
+        if value is _MISSING:
+            value = self.node(context)
+            self.memo.put(key, value)
+        return value
@@ -0,0 +1,252 @@
+import os
+import typing as t
+
+from bisect import bisect_left
+from threading import Lock, local
+from time import perf_counter
+
+# Instrumented code checks this before reading the clock or building label
+# tuples; with TASKER_METRICS=0 the hot paths skip their metrics entirely.
+enabled = os.environ.get("TASKER_METRICS", "1") != "0"
+
+DEFAULT_BUCKETS = (
+    0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025,
+    0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+
+
+def _escape(value: t.Any) -> str:
+    if value is None:
+        return ""
+    return (
+        str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+    )
+
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def sample(name: str, labels: t.Mapping[str, t.Any], value: float) -> str:
+    # One line of the exposition format, for collectors rendering their own.
+    pairs = ",".join(f'{key}="{_escape(label)}"' for key, label in labels.items())
+    return f"{name}{{{pairs}}} {_number(value)}" if pairs else f"{name} {_number(value)}"
+
+
+class Histogram:
+    """
+    Latency histogram with one series per label tuple.
+
+    Each series keeps a count per bucket and the sum of observations.
+    Observations go to a shard owned by the observing thread, so observing
+    is a bisect and two additions without a lock; the shards are merged
+    when the histogram is rendered.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: t.Sequence[str],
+        buckets: t.Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self.shards: t.List[t.Dict[t.Tuple, t.List]] = []
+        self.__local = local()
+        self.__lock = Lock()
+
+    def __shard(self) -> t.Dict[t.Tuple, t.List]:
+        # A thread's shard outlives the thread, keeping its observations.
+        shard = self.__local.series = {}
+        with self.__lock:
+            self.shards.append(shard)
+        return shard
+
+    def observe(self, labels: t.Tuple, value: float) -> None:
+        try:
+            shard = self.__local.series
+        except AttributeError:
+            shard = self.__shard()
+
+        series = shard.get(labels)
+        if series is None:
+            # Bucket counts, then the sum.
+            series = shard[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+        series[bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    async def observe_awaitable(
+        self, labels: t.Tuple, awaitable: t.Awaitable, started: float
+    ) -> t.Any:
+        # Times an async driver call through to its result.
+        try:
+            return await awaitable
+        finally:
+            self.observe(labels, perf_counter() - started)
+
+    def clear(self) -> None:
+        with self.__lock:
+            for shard in self.shards:
+                shard.clear()
+
+    @property
+    def series(self) -> t.Dict[t.Tuple, t.Tuple[t.List[int], int, float]]:
+        # Bucket counts, total count and sum per label tuple, over all shards.
+        with self.__lock:
+            shards = list(self.shards)
+
+        merged = {}
+        for shard in shards:
+            for labels, series in list(shard.items()):
+                counts = merged.get(labels)
+                if counts is None:
+                    counts = merged[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+                for index, value in enumerate(series):
+                    counts[index] += value
+        return {
+            labels: (counts[:-1], sum(counts[:-1]), counts[-1])
+            for labels, counts in merged.items()
+        }
+
+    def render(self) -> t.Iterator[str]:
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} histogram"
+
+        for labels, (counts, count, total) in self.series.items():
+            pairs = [
+                f'{name}="{_escape(value)}"'
+                for name, value in zip(self.labelnames, labels)
+            ]
+
+            cumulative = 0
+            for bound, bucket in zip((*self.buckets, float("inf")), counts):
+                cumulative += bucket
+                le = ",".join([*pairs, f'le="{_number(bound)}"'])
+                yield f"{self.name}_bucket{{{le}}} {cumulative}"
+
+            label_text = "{" + ",".join(pairs) + "}" if pairs else ""
+            yield f"{self.name}_sum{label_text} {_number(total)}"
+            yield f"{self.name}_count{label_text} {count}"
+
+
+class Gauge:
+    """Current value per label tuple, such as the number of waiting calls."""
+
+    def __init__(self, name: str, documentation: str, labelnames: t.Sequence[str]):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.series: t.Dict[t.Tuple, float] = {}
+        self.__lock = Lock()
+
+    def inc(self, labels: t.Tuple, amount: float = 1) -> None:
+        with self.__lock:
+            self.series[labels] = self.series.get(labels, 0) + amount
+
+    def dec(self, labels: t.Tuple, amount: float = 1) -> None:
+        self.inc(labels, -amount)
+
+    def set(self, labels: t.Tuple, value: float) -> None:
+        with self.__lock:
+            self.series[labels] = value
+
+    def clear(self) -> None:
+        with self.__lock:
+            self.series.clear()
+
+    def render(self) -> t.Iterator[str]:
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} gauge"
+
+        with self.__lock:
+            series = list(self.series.items())
+
+        for labels, value in series:
+            pairs = ",".join(
+                f'{name}="{_escape(label)}"'
+                for name, label in zip(self.labelnames, labels)
+            )
+            label_text = "{" + pairs + "}" if pairs else ""
+            yield f"{self.name}{label_text} {_number(value)}"
+
+
+class Registry:
+    def __init__(self):
+        self.metrics: t.Dict[str, t.Union[Histogram, Gauge]] = {}
+        # Called at scrape time for metrics kept elsewhere, such as the
+        # result caches' counters; each returns exposition lines.
+        self.collectors: t.List[t.Callable[[], t.Iterable[str]]] = []
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: t.Sequence[str],
+        buckets: t.Sequence[float] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        if name not in self.metrics:
+            self.metrics[name] = Histogram(name, documentation, labelnames, buckets)
+        return self.metrics[name]
+
+    def gauge(
+        self, name: str, documentation: str, labelnames: t.Sequence[str]
+    ) -> Gauge:
+        if name not in self.metrics:
+            self.metrics[name] = Gauge(name, documentation, labelnames)
+        return self.metrics[name]
+
+    def collector(self, func: t.Callable[[], t.Iterable[str]]) -> t.Callable:
+        self.collectors.append(func)
+        return func
+
+    def render(self) -> str:
+        lines = []
+        for metric in self.metrics.values():
+            lines.extend(metric.render())
+        for collector in self.collectors:
+            lines.extend(collector())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+action_seconds = registry.histogram(
+    "tasker_action_seconds",
+    "Time spent executing an action.",
+    ("bot", "action", "status"),
+)
+driver_seconds = registry.histogram(
+    "tasker_driver_call_seconds",
+    "Time spent in a driver method called by an $$exec handle.",
+    ("bot", "driver", "method"),
+)
+dispatch_seconds = registry.histogram(
+    "tasker_dispatch_seconds",
+    "Time spent running the listeners of an event.",
+    ("bot", "event"),
+)
+create_seconds = registry.histogram(
+    "tasker_bot_create_seconds",
+    "Time spent creating a bot from its definition.",
+    ("compiler",),
+)
+limiter_wait_seconds = registry.histogram(
+    "tasker_driver_limiter_wait_seconds",
+    "Time a driver call waited for its rate and concurrency limits.",
+    ("driver",),
+)
+limiter_queue_depth = registry.gauge(
+    "tasker_driver_limiter_queue_depth",
+    "Driver calls waiting for their rate or concurrency limit.",
+    ("driver",),
+)
+limiter_in_flight = registry.gauge(
+    "tasker_driver_limiter_in_flight",
+    "Driver calls holding a concurrency slot.",
+    ("driver",),
+)
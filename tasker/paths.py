@@ -0,0 +1,198 @@
+import typing as t
+
+from functools import lru_cache
+
+from .scope import Scope
+from .data import DataOverlay
+
+# Mappings walked by key rather than by attribute.
+MAPPINGS = (dict, DataOverlay)
+
+
+def walk(value: t.Any, splits: t.Sequence[str]) -> t.Any:
+    for split in splits:
+        if isinstance(value, MAPPINGS):
+            value = value.get(split)
+        else:
+            value = getattr(value, split, None)
+        if not value:
+            break
+    return value
+
+
+class Accessor:
+    __slots__ = ("path", "name", "splits")
+
+    def __init__(self, path: str):
+        splits = path.lstrip("$$").split(".")
+
+        self.path = path
+        self.name = splits[0]
+        self.splits = tuple(splits[1:])
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}({self.path!r})"
+
+    def root(self, context: t.Mapping) -> t.Any:
+        value = context.get(self.name)
+        if value:
+            return value
+        if "bot" in context:
+            return context["bot"].data.get(self.name)
+        return None
+
+    def __call__(self, context: t.Mapping) -> t.Any:
+        value = self.root(context)
+
+        if not value:
+            return None
+
+        return walk(value, self.splits)
+
+
+class NameAccessor(Accessor):
+    __slots__ = ()
+
+    def __call__(self, context: t.Mapping) -> t.Any:
+        return self.root(context) or None
+
+
+class DictAccessor(Accessor):
+    # Most references walk plain dicts (``$$args.x``, ``$$config.a.b``), so
+    # stay on ``dict.get`` and only fall back to the generic walk when the
+    # chain reaches something else.
+    __slots__ = ()
+
+    def __call__(self, context: t.Mapping) -> t.Any:
+        value = self.root(context)
+
+        if not value:
+            return None
+
+        for index, split in enumerate(self.splits):
+            if type(value) is not dict:
+                return walk(value, self.splits[index:])
+            value = value.get(split)
+            if not value:
+                break
+        return value
+
+
+class DataAccessor(Accessor):
+    # ``$$bot.data.<key>...``: skip the generic walk for the bot and its data.
+    __slots__ = ("key", "rest")
+
+    def __init__(self, path: str):
+        super().__init__(path)
+        self.key = self.splits[1]
+        self.rest = self.splits[2:]
+
+    def __call__(self, context: t.Mapping) -> t.Any:
+        bot = context.get("bot")
+
+        if not bot or isinstance(bot, dict):
+            return Accessor.__call__(self, context)
+
+        data = getattr(bot, "data", None)
+        if not data:
+            return data
+        if not isinstance(data, MAPPINGS):
+            return walk(data, self.splits[1:])
+
+        value = data.get(self.key)
+        if not value or not self.rest:
+            return value
+
+        return walk(value, self.rest)
+
+
+@lru_cache(maxsize=4096)
+def accessor(path: str) -> Accessor:
+    splits = path.lstrip("$$").split(".")
+
+    if len(splits) == 1:
+        return NameAccessor(path)
+    if len(splits) > 2 and splits[0] == "bot" and splits[1] == "data":
+        return DataAccessor(path)
+    return DictAccessor(path)
+
+
+class Setter:
+    __slots__ = ("path", "name", "splits", "key")
+
+    def __init__(self, path: str):
+        splits = path.split(".")
+
+        self.path = path
+        self.name = splits[0]
+        self.splits = tuple(splits[1:-1])
+        self.key = splits[-1]
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}({self.path!r})"
+
+    def target(self, context: t.Mapping) -> t.Any:
+        target = context.get(self.name)
+        for split in self.splits:
+            if isinstance(target, MAPPINGS):
+                target = target.get(split)
+            else:
+                target = getattr(target, split)
+        return target
+
+    def assign(self, target: t.Any, value: t.Any) -> None:
+        if isinstance(target, (*MAPPINGS, Scope)):
+            target[self.key] = value
+        else:
+            setattr(target, self.key, value)
+
+    def __call__(self, context: t.Mapping, value: t.Any) -> None:
+        self.assign(self.target(context), value)
+
+
+class NameSetter(Setter):
+    __slots__ = ()
+
+    def __call__(self, context: t.Mapping, value: t.Any) -> None:
+        self.assign(context, value)
+
+
+class DataSetter(Setter):
+    # ``bot.data.<key>``: the common ``store`` target.
+    __slots__ = ()
+
+    def __call__(self, context: t.Mapping, value: t.Any) -> None:
+        data = getattr(context.get("bot"), "data", None)
+
+        if isinstance(data, MAPPINGS):
+            data[self.key] = value
+        else:
+            Setter.__call__(self, context, value)
+
+
+class NestedDataSetter(Setter):
+    # ``bot.data.<key>.<...>``: the write lands inside a value, so tell the
+    # data store that ``<key>`` changed.
+    __slots__ = ()
+
+    def __call__(self, context: t.Mapping, value: t.Any) -> None:
+        data = getattr(context.get("bot"), "data", None)
+
+        if isinstance(data, DataOverlay):
+            data.own(self.splits[1])
+        Setter.__call__(self, context, value)
+        if isinstance(data, MAPPINGS) and hasattr(data, "touch"):
+            data.touch(self.splits[1])
+
+
+@lru_cache(maxsize=4096)
+def setter(path: str) -> Setter:
+    splits = path.split(".")
+
+    if len(splits) == 1:
+        return NameSetter(path)
+    if len(splits) == 3 and splits[0] == "bot" and splits[1] == "data":
+        return DataSetter(path)
+    if len(splits) > 3 and splits[0] == "bot" and splits[1] == "data":
+        return NestedDataSetter(path)
+    return Setter(path)
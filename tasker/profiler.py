@@ -0,0 +1,120 @@
+import os
+import sys
+import typing as t
+
+from collections import Counter
+from threading import Event, Lock, Thread, get_ident
+
+# Number of running profilers. Instrumented code checks it before pushing
+# labels, so nothing is recorded while no profile is being taken.
+active = 0
+
+# DSL labels per thread, each tied to the frame that pushed it: a sample
+# only shows the labels whose frames are on the sampled stack, which keeps
+# interleaved asyncio tasks on one thread apart.
+_labels: t.Dict[int, t.List[t.Tuple]] = {}
+_lock = Lock()
+
+
+def push(bot, label: str, depth: int = 1) -> t.Tuple:
+    entry = (sys._getframe(depth), label, bot)
+    stack = _labels.get(get_ident())
+    if stack is None:
+        stack = _labels.setdefault(get_ident(), [])
+    stack.append(entry)
+    return entry
+
+
+def pop(entry: t.Tuple) -> None:
+    stack = _labels.get(get_ident())
+    if stack and entry in stack:
+        stack.remove(entry)
+
+
+def call(bot, label: str, func: t.Callable, arguments: t.Mapping) -> t.Any:
+    # Label a DSL call with the frame of the handle that makes it.
+    entry = push(bot, label, 2)
+    try:
+        return func(**arguments)
+    finally:
+        pop(entry)
+
+
+def _frame_name(frame) -> str:
+    code = frame.f_code
+    filename = os.path.basename(code.co_filename)
+    return f"{code.co_name} ({filename}:{code.co_firstlineno})".replace(";", ":")
+
+
+class Profiler:
+    """
+    Samples the stacks of the threads running a bot's executions.
+
+    Every ``interval`` seconds the Python stack of each labelled thread is
+    read; stacks that contain a label of ``bot`` are counted with the DSL
+    labels (``action:...``, ``macro:...``, ``driver:...``) placed after
+    the frame that pushed them. Frames before the first label are left out.
+    """
+
+    def __init__(self, bot, interval: float = 0.005):
+        self.bot = bot
+        self.interval = interval
+        self.samples: t.Counter[str] = Counter()
+        self.__stop = Event()
+        self.__thread: t.Optional[Thread] = None
+
+    def start(self) -> None:
+        global active
+
+        with _lock:
+            active += 1
+        self.__thread = Thread(target=self.__run, name="tasker-profiler", daemon=True)
+        self.__thread.start()
+
+    def stop(self) -> None:
+        global active
+
+        self.__stop.set()
+        if self.__thread:
+            self.__thread.join()
+        with _lock:
+            active -= 1
+
+    def __run(self) -> None:
+        while not self.__stop.wait(self.interval):
+            self.sample()
+
+    def sample(self) -> None:
+        frames = sys._current_frames()
+
+        for ident, entries in list(_labels.items()):
+            frame = frames.get(ident)
+            if frame is None or not entries:
+                continue
+
+            labels = {}
+            for label_frame, label, bot in list(entries):
+                labels.setdefault(id(label_frame), []).append((label, bot))
+
+            chain = []
+            while frame is not None:
+                chain.append(frame)
+                frame = frame.f_back
+
+            stack = []
+            owned = False
+            for frame in reversed(chain):
+                frame_labels = labels.get(id(frame))
+                if stack or frame_labels:
+                    stack.append(_frame_name(frame))
+                for label, bot in frame_labels or ():
+                    stack.append(label.replace(";", ":"))
+                    owned = owned or bot is self.bot
+
+            if owned:
+                self.samples[";".join(stack)] += 1
+
+    def collapsed(self) -> str:
+        return "".join(
+            f"{stack} {count}\n" for stack, count in self.samples.most_common()
+        )
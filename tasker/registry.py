@@ -0,0 +1,262 @@
+import json
+import time
+import typing as t
+
+from collections import OrderedDict
+from contextlib import contextmanager
+from threading import Lock, RLock
+
+from .bots import Bot
+from .snapshot import (
+    Snapshot, SnapshotError, SnapshotWriter, encode_data, encode_definition
+)
+
+
+def _busy(bot: Bot) -> bool:
+    # Listeners and triggers hold on to the bot object itself.
+    return bool(bot.triggers) or any(bot.event_listeners.values())
+
+
+class BotRegistry(t.MutableMapping[str, Bot]):
+    """
+    The bots of a server by id, of which only the ones in use are built.
+
+    Bots restored from a snapshot stay undecoded in the mapped file, and
+    evicted bots are parked as their encoded definition and data;
+    ``factory`` creates them again when they are first looked up.
+
+    Built bots are kept in least recently used order. Past ``max_bots`` of
+    them, or after ``idle_seconds`` without a lookup, the oldest are
+    evicted, except bots with listeners or triggers, bots ``in_use``
+    reports as busy and bots pinned by :meth:`pin`.
+
+    Bots whose snapshot record is corrupt are moved to ``failed`` on first
+    lookup and are then missing, so one bad record does not break the
+    others.
+    """
+
+    def __init__(
+        self,
+        factory: t.Callable[[t.Mapping], Bot],
+        max_bots: t.Optional[int] = None,
+        idle_seconds: t.Optional[float] = None,
+        in_use: t.Optional[t.Callable[[Bot], bool]] = None,
+        clock: t.Callable[[], float] = time.monotonic,
+    ):
+        self.factory = factory
+        self.max_bots = max_bots
+        self.idle_seconds = idle_seconds
+        self.in_use = in_use
+        self.clock = clock
+        self.live: t.OrderedDict[str, Bot] = OrderedDict()
+        self.accessed: t.Dict[str, float] = {}
+        self.parked: t.Dict[str, t.Tuple[bytes, bytes]] = {}
+        self.cold: t.Set[str] = set()
+        self.failed: t.Set[str] = set()
+        self.pins: t.Dict[str, int] = {}
+        self.snapshot: t.Optional[Snapshot] = None
+        self.evictions = 0
+        self.__lock = RLock()
+        self.__saving = Lock()
+
+    def __getitem__(self, bot_id: str) -> Bot:
+        with self.__lock:
+            bot = self.live.get(bot_id)
+            if bot is None:
+                bot = self.__materialize(bot_id)
+                self.live[bot_id] = bot
+                self.__shrink(bot_id)
+            else:
+                self.live.move_to_end(bot_id)
+            self.accessed[bot_id] = self.clock()
+            return bot
+
+    def __setitem__(self, bot_id: str, bot: Bot) -> None:
+        with self.__lock:
+            self.live[bot_id] = bot
+            self.live.move_to_end(bot_id)
+            self.accessed[bot_id] = self.clock()
+            self.parked.pop(bot_id, None)
+            self.cold.discard(bot_id)
+            self.failed.discard(bot_id)
+            self.__shrink(bot_id)
+
+    def __delitem__(self, bot_id: str) -> None:
+        with self.__lock:
+            if bot_id in self.live:
+                del self.live[bot_id]
+                self.accessed.pop(bot_id, None)
+            elif bot_id in self.parked:
+                del self.parked[bot_id]
+            elif bot_id in self.cold:
+                self.cold.discard(bot_id)
+            else:
+                raise KeyError(bot_id)
+
+    def __contains__(self, bot_id: object) -> bool:
+        return bot_id in self.live or bot_id in self.parked or bot_id in self.cold
+
+    def __iter__(self) -> t.Iterator[str]:
+        with self.__lock:
+            bot_ids = [*self.live, *self.parked, *self.cold]
+        seen = set()
+        for bot_id in bot_ids:
+            if bot_id not in seen:
+                seen.add(bot_id)
+                yield bot_id
+
+    def __len__(self) -> int:
+        return len(self.live) + len(self.parked) + len(self.cold)
+
+    def __read_cold(self, bot_id: str) -> t.Tuple[t.Mapping, t.Mapping]:
+        try:
+            return self.snapshot[bot_id]
+        except SnapshotError as e:
+            print(f"Bot '{bot_id}' not loaded: {e!r}")
+            self.cold.discard(bot_id)
+            self.failed.add(bot_id)
+            raise KeyError(bot_id) from e
+
+    def __materialize(self, bot_id: str) -> Bot:
+        # The bot stays parked or cold until the factory has built it, so a
+        # failed build can be retried.
+        if bot_id in self.parked:
+            definition, data = map(json.loads, self.parked[bot_id])
+        elif bot_id in self.cold:
+            definition, data = self.__read_cold(bot_id)
+        else:
+            raise KeyError(bot_id)
+
+        bot = self.factory({**definition, "name": bot_id, "data": data})
+        bot.name = bot_id
+        self.parked.pop(bot_id, None)
+        self.cold.discard(bot_id)
+        return bot
+
+    def __evict(self, bot_id: str) -> bool:
+        bot = self.live[bot_id]
+        definition = getattr(bot, "definition", None)
+        if (
+            definition is None or bot_id in self.pins or _busy(bot)
+            or (self.in_use and self.in_use(bot))
+        ):
+            return False
+        try:
+            parked = (encode_definition(definition), encode_data(bot.data))
+        except (TypeError, ValueError):
+            return False
+
+        del self.live[bot_id]
+        self.accessed.pop(bot_id, None)
+        self.parked[bot_id] = parked
+        self.evictions += 1
+        return True
+
+    def __shrink(self, keep: str) -> None:
+        if self.max_bots is None:
+            return
+
+        excess = len(self.live) - self.max_bots
+        for bot_id in list(self.live):
+            if excess <= 0:
+                break
+            if bot_id != keep and self.__evict(bot_id):
+                excess -= 1
+
+    def evict_idle(self) -> int:
+        """Evicts the bots not looked up for ``idle_seconds``."""
+        if self.idle_seconds is None:
+            return 0
+
+        evicted = 0
+        with self.__lock:
+            cutoff = self.clock() - self.idle_seconds
+            for bot_id in list(self.live):
+                # Oldest first: stop at the first bot used since the cutoff.
+                if self.accessed.get(bot_id, cutoff) > cutoff:
+                    break
+                evicted += self.__evict(bot_id)
+        return evicted
+
+    @contextmanager
+    def pin(self, bot_id: str) -> t.Iterator[None]:
+        """
+        Keeps ``bot_id`` built while the block runs, so every lookup in it
+        returns the same instance and writes to it are not lost to an
+        eviction. Pins nest; the bot may be created inside the block.
+        """
+        with self.__lock:
+            self.pins[bot_id] = self.pins.get(bot_id, 0) + 1
+        try:
+            yield
+        finally:
+            with self.__lock:
+                count = self.pins.pop(bot_id) - 1
+                if count:
+                    self.pins[bot_id] = count
+
+    def peek(self, bot_id: str) -> t.Tuple[t.Mapping, t.List[str]]:
+        """The data and action names of a bot, without building it."""
+        with self.__lock:
+            bot = self.live.get(bot_id)
+            if bot is not None:
+                return bot.data, list(bot.actions.keys())
+            if bot_id in self.parked:
+                definition, data = map(json.loads, self.parked[bot_id])
+            elif bot_id in self.cold:
+                definition, data = self.__read_cold(bot_id)
+            else:
+                raise KeyError(bot_id)
+        return data, list(definition.get("actions", {}).keys())
+
+    def load(self, snapshot: Snapshot) -> None:
+        # Bots in the snapshot replace the ones created before it was read.
+        with self.__lock:
+            self.snapshot = snapshot
+            for bot_id in snapshot:
+                self.live.pop(bot_id, None)
+                self.accessed.pop(bot_id, None)
+                self.parked.pop(bot_id, None)
+            self.cold = set(snapshot)
+            self.failed = set()
+
+    def save(self, path: str) -> int:
+        """Writes every bot to a snapshot at ``path``; returns the count."""
+        with self.__saving:
+            records: t.Dict[str, t.Tuple[bytes, bytes]] = {}
+            encoded: t.Dict[int, bytes] = {}
+
+            with self.__lock:
+                cold = list(self.cold)
+                parked = list(self.parked.items())
+                live = list(self.live.items())
+
+            definitions: t.Dict[int, bytes] = {}
+            for bot_id in cold:
+                try:
+                    index, data = self.snapshot.raw(bot_id)
+                    if index not in definitions:
+                        definitions[index] = bytes(self.snapshot.definition_bytes(index))
+                except SnapshotError as e:
+                    print(f"Bot '{bot_id}' not saved: {e!r}")
+                    continue
+                records[bot_id] = (definitions[index], bytes(data))
+
+            records.update(parked)
+
+            for bot_id, bot in live:
+                definition = getattr(bot, "definition", None)
+                if definition is None:
+                    continue
+                if id(definition) not in encoded:
+                    encoded[id(definition)] = encode_definition(definition)
+                try:
+                    records[bot_id] = (encoded[id(definition)], encode_data(bot.data))
+                except (TypeError, ValueError) as e:
+                    print(f"Bot '{bot_id}' not saved: {e!r}")
+
+            writer = SnapshotWriter(path)
+            for bot_id, (definition, data) in records.items():
+                writer.add(bot_id, definition, data)
+            writer.close()
+            return len(records)
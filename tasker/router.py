@@ -0,0 +1,89 @@
+import re
+import typing as t
+
+from threading import Lock
+
+_EMPTY: t.Tuple[t.Callable, ...] = ()
+
+
+def is_pattern(event_type: str) -> bool:
+    return "*" in event_type
+
+
+def compile_pattern(event_type: str) -> t.Pattern:
+    return re.compile(".*".join(map(re.escape, event_type.split("*"))))
+
+
+class EventRouter:
+    """
+    Maps event names to listeners.
+
+    Listeners are registered under an event type, either an exact name or a
+    pattern where ``*`` matches any run of characters. The listeners for an
+    event name are resolved once, in registration order, and cached until
+    the next :meth:`on` or :meth:`off`.
+    """
+
+    __slots__ = ("listeners", "exact", "patterns", "resolved", "__lock")
+
+    def __init__(self):
+        self.listeners: t.Dict[str, t.List[t.Callable]] = {}
+        self.exact: t.Dict[str, t.Tuple[t.Callable, ...]] = {}
+        self.patterns: t.Dict[str, t.Pattern] = {}
+        self.resolved: t.Dict[str, t.Tuple[t.Callable, ...]] = {}
+        self.__lock = Lock()
+
+    def __bool__(self) -> bool:
+        return bool(self.listeners)
+
+    def on(self, event_type: str, listener_func: t.Callable) -> t.Callable:
+        with self.__lock:
+            self.listeners.setdefault(event_type, []).append(listener_func)
+            self.__reindex(event_type)
+        return listener_func
+
+    def off(self, event_type: str, listener_func: t.Callable) -> t.Callable:
+        with self.__lock:
+            listeners = self.listeners.get(event_type, [])
+            listeners.remove(listener_func)
+            if not listeners:
+                self.listeners.pop(event_type, None)
+            self.__reindex(event_type)
+        return listener_func
+
+    def __reindex(self, event_type: str) -> None:
+        listeners = self.listeners.get(event_type)
+
+        if is_pattern(event_type):
+            if listeners:
+                self.patterns.setdefault(event_type, compile_pattern(event_type))
+            else:
+                self.patterns.pop(event_type, None)
+        elif listeners:
+            self.exact[event_type] = tuple(listeners)
+        else:
+            self.exact.pop(event_type, None)
+
+        self.resolved = {}
+
+    def resolve(self, event_name: str) -> t.Tuple[t.Callable, ...]:
+        listeners = self.resolved.get(event_name)
+        if listeners is not None:
+            return listeners
+
+        if not self.patterns:
+            return self.exact.get(event_name, _EMPTY)
+
+        with self.__lock:
+            matched = []
+            for event_type, callbacks in self.listeners.items():
+                pattern = self.patterns.get(event_type)
+                if pattern is None:
+                    if event_type == event_name:
+                        matched.extend(callbacks)
+                elif pattern.fullmatch(event_name):
+                    matched.extend(callbacks)
+
+            listeners = tuple(matched) or _EMPTY
+            self.resolved[event_name] = listeners
+        return listeners
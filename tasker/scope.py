@@ -0,0 +1,89 @@
+import typing as t
+
+
+class Scope:
+    """
+    Evaluation context made of parent-linked frames.
+
+    Lookups walk from the innermost frame outwards, writes land in the
+    innermost frame, and opening a child scope never copies its parents.
+    """
+
+    __slots__ = ("vars", "parent")
+
+    def __init__(
+        self,
+        vars: t.Optional[t.MutableMapping] = None,
+        parent: t.Optional["Scope"] = None,
+    ):
+        self.vars = {} if vars is None else vars
+        self.parent = parent
+
+    def __repr__(self):
+        return f"Scope({self.vars!r}, parent={self.parent!r})"
+
+    def child(self, vars: t.Optional[t.MutableMapping] = None) -> "Scope":
+        return Scope(vars, self)
+
+    def get(self, key: str, default: t.Any = None) -> t.Any:
+        vars = self.vars
+        if key in vars:
+            return vars[key]
+
+        scope = self.parent
+        while scope is not None:
+            vars = scope.vars
+            if key in vars:
+                return vars[key]
+            scope = scope.parent
+        return default
+
+    def __getitem__(self, key: str) -> t.Any:
+        vars = self.vars
+        if key in vars:
+            return vars[key]
+
+        scope = self.parent
+        while scope is not None:
+            vars = scope.vars
+            if key in vars:
+                return vars[key]
+            scope = scope.parent
+        raise KeyError(key)
+
+    def __setitem__(self, key: str, value: t.Any) -> None:
+        self.vars[key] = value
+
+    def __contains__(self, key: str) -> bool:
+        vars = self.vars
+        if key in vars:
+            return True
+
+        scope = self.parent
+        while scope is not None:
+            vars = scope.vars
+            if key in vars:
+                return True
+            scope = scope.parent
+        return False
+
+    def keys(self) -> t.KeysView:
+        return self.flatten().keys()
+
+    def __iter__(self) -> t.Iterator[str]:
+        return iter(self.flatten())
+
+    def __len__(self) -> int:
+        return len(self.flatten())
+
+    def flatten(self) -> t.Dict[str, t.Any]:
+        frames = []
+        scope = self
+        while scope is not None:
+            frames.append(scope.vars)
+            scope = scope.parent
+
+        flat = {}
+        for frame in reversed(frames):
+            flat.update(frame)
+        return flat
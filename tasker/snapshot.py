@@ -0,0 +1,234 @@
+import os
+import json
+import mmap
+import struct
+import typing as t
+
+from threading import Lock
+
+# Layout, little endian:
+#
+#   MAGIC
+#   definitions   u32 length + JSON, one per distinct bot definition
+#   records       u32 length + (u16 id length, id, u32 definition, data JSON)
+#   index         u64 offset per definition, then per bot:
+#                 u16 id length, id, u64 record offset
+#   footer        u64 index offset, u32 definitions, u32 records, MAGIC
+#
+# Opening a snapshot only reads the footer and the index; definitions and
+# records are decoded when a bot is first asked for. Any malformed input
+# raises SnapshotError: the index when the snapshot is opened, a record or
+# definition when it is decoded.
+MAGIC = b"TSKSNAP1"
+_LENGTH = struct.Struct("<I")
+_ID = struct.Struct("<H")
+_OFFSET = struct.Struct("<Q")
+_RECORD = struct.Struct("<HI")
+_FOOTER = struct.Struct("<QII8s")
+
+
+class SnapshotError(ValueError):
+    pass
+
+
+class SnapshotWriter:
+    """
+    Writes a snapshot to ``path`` atomically: records go to a temporary
+    file that replaces ``path`` once it is complete.
+
+    Definitions are stored once however many bots share them; pass the
+    same encoded bytes (see :func:`encode_definition`) to deduplicate.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.temporary = f"{path}.tmp"
+        self.definitions: t.Dict[bytes, int] = {}
+        self.definition_bytes: t.List[bytes] = []
+        self.records: t.List[t.Tuple[bytes, int, bytes]] = []
+
+    def add(self, bot_id: str, definition: bytes, data: bytes) -> None:
+        index = self.definitions.get(definition)
+        if index is None:
+            index = self.definitions[definition] = len(self.definition_bytes)
+            self.definition_bytes.append(bytes(definition))
+        self.records.append((bot_id.encode(), index, bytes(data)))
+
+    def close(self) -> None:
+        definition_offsets = []
+        record_offsets = []
+
+        with open(self.temporary, "wb") as file:
+            file.write(MAGIC)
+            offset = len(MAGIC)
+
+            for definition in self.definition_bytes:
+                definition_offsets.append(offset)
+                file.write(_LENGTH.pack(len(definition)))
+                file.write(definition)
+                offset += _LENGTH.size + len(definition)
+
+            for bot_id, index, data in self.records:
+                record_offsets.append(offset)
+                length = _RECORD.size + len(bot_id) + len(data)
+                file.write(_LENGTH.pack(length))
+                file.write(_RECORD.pack(len(bot_id), index))
+                file.write(bot_id)
+                file.write(data)
+                offset += _LENGTH.size + length
+
+            index_offset = offset
+            file.write(b"".join(_OFFSET.pack(value) for value in definition_offsets))
+            file.write(b"".join(
+                _ID.pack(len(bot_id)) + bot_id + _OFFSET.pack(record_offset)
+                for (bot_id, _, _), record_offset in zip(self.records, record_offsets)
+            ))
+            file.write(_FOOTER.pack(
+                index_offset, len(self.definition_bytes), len(self.records), MAGIC
+            ))
+            file.flush()
+            os.fsync(file.fileno())
+
+        os.replace(self.temporary, self.path)
+
+
+class Snapshot(t.Mapping[str, t.Tuple[t.Dict, t.Dict]]):
+    """
+    A snapshot file mapped into memory, as a mapping of bot ids to their
+    ``(definition, data)``.
+
+    Decoded definitions are cached, so bots that share one also share the
+    decoded object (and the template it compiles to).
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.__file = open(path, "rb")
+        try:
+            self.buffer = mmap.mmap(self.__file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self.__file.close()
+            raise SnapshotError(f"Empty snapshot: '{path}'")
+
+        try:
+            self.__read_index()
+        except SnapshotError:
+            self.close()
+            raise
+        except (struct.error, UnicodeDecodeError) as e:
+            self.close()
+            raise SnapshotError(f"Corrupt snapshot index: '{path}' ({e})") from None
+
+        self.__definitions: t.Dict[int, t.Dict] = {}
+        self.__lock = Lock()
+
+    def __read_index(self) -> None:
+        size = len(self.buffer)
+        if size < len(MAGIC) + _FOOTER.size or self.buffer[:len(MAGIC)] != MAGIC:
+            raise SnapshotError(f"Not a snapshot: '{self.path}'")
+
+        end = size - _FOOTER.size
+        index_offset, definitions, records, magic = _FOOTER.unpack_from(self.buffer, end)
+        if magic != MAGIC:
+            raise SnapshotError(f"Truncated snapshot: '{self.path}'")
+        if not len(MAGIC) <= index_offset <= end - definitions * _OFFSET.size:
+            raise SnapshotError(f"Corrupt snapshot index: '{self.path}'")
+
+        # Definitions and records lie between the magic and the index.
+        def checked(offset: int) -> int:
+            if not len(MAGIC) <= offset <= index_offset - _LENGTH.size:
+                raise SnapshotError(f"Corrupt snapshot index: '{self.path}'")
+            return offset
+
+        self.definition_offsets = [
+            checked(offset) for (offset,) in _OFFSET.iter_unpack(
+                self.buffer[index_offset:index_offset + definitions * _OFFSET.size]
+            )
+        ]
+        self.offsets: t.Dict[str, int] = {}
+        position = index_offset + definitions * _OFFSET.size
+        for _ in range(records):
+            (length,) = _ID.unpack_from(self.buffer, position)
+            position += _ID.size
+            if position + length + _OFFSET.size > end:
+                raise SnapshotError(f"Corrupt snapshot index: '{self.path}'")
+            bot_id = self.buffer[position:position + length].decode()
+            position += length
+            (offset,) = _OFFSET.unpack_from(self.buffer, position)
+            self.offsets[bot_id] = checked(offset)
+            position += _OFFSET.size
+        self.records_end = index_offset
+
+    def __len__(self) -> int:
+        return len(self.offsets)
+
+    def __iter__(self) -> t.Iterator[str]:
+        return iter(self.offsets)
+
+    def __contains__(self, bot_id: object) -> bool:
+        return bot_id in self.offsets
+
+    def __getitem__(self, bot_id: str) -> t.Tuple[t.Dict, t.Dict]:
+        index, data = self.raw(bot_id)
+        try:
+            return self.definition(index), json.loads(bytes(data))
+        except ValueError as e:
+            raise SnapshotError(f"Corrupt record '{bot_id}' in '{self.path}' ({e})") from None
+
+    def raw(self, bot_id: str) -> t.Tuple[int, memoryview]:
+        # The definition index and the undecoded data of a record.
+        offset = self.offsets[bot_id]
+        (length,) = _LENGTH.unpack_from(self.buffer, offset)
+        end = offset + _LENGTH.size + length
+        if end > self.records_end or length < _RECORD.size:
+            raise SnapshotError(f"Corrupt record '{bot_id}' in '{self.path}'")
+        id_length, index = _RECORD.unpack_from(self.buffer, offset + _LENGTH.size)
+        start = offset + _LENGTH.size + _RECORD.size + id_length
+        if start > end or index >= len(self.definition_offsets):
+            raise SnapshotError(f"Corrupt record '{bot_id}' in '{self.path}'")
+        return index, memoryview(self.buffer)[start:end]
+
+    def definition_bytes(self, index: int) -> memoryview:
+        offset = self.definition_offsets[index]
+        (length,) = _LENGTH.unpack_from(self.buffer, offset)
+        start = offset + _LENGTH.size
+        if start + length > self.records_end:
+            raise SnapshotError(f"Corrupt definition {index} in '{self.path}'")
+        return memoryview(self.buffer)[start:start + length]
+
+    def definition(self, index: int) -> t.Dict:
+        definition = self.__definitions.get(index)
+        if definition is None:
+            with self.__lock:
+                definition = self.__definitions.get(index)
+                if definition is None:
+                    encoded = bytes(self.definition_bytes(index))
+                    try:
+                        definition = json.loads(encoded)
+                    except ValueError as e:
+                        raise SnapshotError(
+                            f"Corrupt definition {index} in '{self.path}' ({e})"
+                        ) from None
+                    self.__definitions[index] = definition
+        return definition
+
+    def close(self) -> None:
+        try:
+            self.buffer.close()
+        except (AttributeError, BufferError):
+            # Views handed out by raw() keep the mapping alive until they
+            # are released; the file is unmapped with them.
+            pass
+        self.__file.close()
+
+
+def encode_definition(definition: t.Mapping) -> bytes:
+    # The definition without the values that are stored per record.
+    return json.dumps(
+        {key: value for key, value in definition.items() if key not in ("data", "name")},
+        sort_keys=True, separators=(",", ":"),
+    ).encode()
+
+
+def encode_data(data: t.Mapping) -> bytes:
+    return json.dumps(dict(data), separators=(",", ":")).encode()
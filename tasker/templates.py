@@ -0,0 +1,162 @@
+import json
+import hashlib
+import typing as t
+
+from collections import OrderedDict
+from threading import Lock
+
+from .bots import Bot
+from .drivers import (
+    DRIVERS, SERVICE_ERRORS, breakers, limiters, service_key, split_limits
+)
+from . import codegen, compiler
+from .compiler import bind_action, bind_macro
+from .engine import DependencyGraph, analyze
+
+COMPILERS = {
+    "closures": compiler.compile_node,
+    "python": codegen.compile_node,
+}
+
+
+def template_key(bot_data: t.Mapping) -> t.Optional[str]:
+    try:
+        payload = json.dumps(
+            [
+                bot_data.get("compiler", "closures"),
+                bot_data.get("drivers", []),
+                bot_data.get("macros", {}),
+                bot_data.get("actions", {}),
+            ],
+            separators=(",", ":"),
+        )
+    except (TypeError, ValueError):
+        return None
+    return hashlib.blake2b(payload.encode(), digest_size=16).hexdigest()
+
+
+class Template:
+    """
+    A bot definition compiled once and shared by every bot created from it.
+
+    Binding only instantiates the drivers and evaluates the top level of
+    each macro and action against the new bot.
+    """
+
+    __slots__ = ("key", "drivers", "macros", "actions", "dependencies")
+
+    def __init__(self, bot_data: t.Mapping, key: t.Optional[str] = None):
+        compiler_name = bot_data.get("compiler", "closures")
+        if compiler_name not in COMPILERS:
+            raise ValueError(f"Unknown compiler: '{compiler_name}'")
+        compile_node = COMPILERS[compiler_name]
+
+        self.key = key
+        self.drivers = []
+        self.macros = {}
+        self.actions = {}
+        self.dependencies = DependencyGraph(analyze(bot_data))
+
+        for driver_config in bot_data.get("drivers", []):
+            driver_class = DRIVERS.get(driver_config["driver"])
+            if not driver_class:
+                continue
+            config, limits = split_limits(driver_config.get("config", {}))
+            self.drivers.append((
+                driver_config.get("name"),
+                driver_class,
+                config,
+                bool(driver_config.get("default")),
+                service_key(driver_class.name, config),
+                driver_config.get("breaker"),
+                limits,
+            ))
+
+        for macro_name, macro in bot_data.get("macros", {}).items():
+            self.macros[macro_name] = compile_node(macro)
+
+        for action_name, action in bot_data.get("actions", {}).items():
+            self.actions[action_name] = compile_node(action)
+
+    def create(
+        self,
+        data: t.Optional[t.Mapping] = None,
+        config: t.Optional[t.Mapping] = None,
+        bot_class: t.Type[Bot] = Bot,
+        name: t.Optional[str] = None,
+    ) -> Bot:
+        # Empty containers are left to the bot, which shares one for all.
+        bot_config = {
+            "name": name,
+            "config": dict(config) if config else None,
+            "default_driver": None,
+            "drivers": {} if self.drivers else None,
+            "macros": {} if self.macros else None,
+        }
+
+        for (
+            driver_name, driver_class, config, default, key, breaker, limits
+        ) in self.drivers:
+            if default:
+                bot_config["default_driver"] = driver_name
+            driver = driver_class(**config)
+            driver.breaker = breakers.get(
+                key, breaker, getattr(driver_class, "failures", SERVICE_ERRORS)
+            )
+            if limits:
+                driver.limiter = limiters.get(key, limits)
+            bot_config["drivers"][driver_name] = driver
+
+        bot = bot_class(**bot_config)
+        bot.data.update(**(data or {}))
+        return self.bind(bot)
+
+    def bind(self, bot: Bot) -> Bot:
+        for macro_name, macro in self.macros.items():
+            bot.macros[macro_name] = bind_macro(macro, bot)
+
+        for action_name, action in self.actions.items():
+            bot.add_action(action_name, bind_action(action, bot))
+
+        bot.dependencies = self.dependencies
+        return bot
+
+
+class TemplateCache:
+    def __init__(self, maxsize: int = 256):
+        self.maxsize = maxsize
+        self.templates: t.OrderedDict[str, Template] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.__lock = Lock()
+
+    def __len__(self):
+        return len(self.templates)
+
+    def get(self, bot_data: t.Mapping) -> Template:
+        key = template_key(bot_data)
+        if key is None:
+            return Template(bot_data)
+
+        with self.__lock:
+            template = self.templates.get(key)
+            if template:
+                self.hits += 1
+                self.templates.move_to_end(key)
+                return template
+            self.misses += 1
+
+        template = Template(bot_data, key)
+
+        with self.__lock:
+            self.templates[key] = template
+            while len(self.templates) > self.maxsize:
+                self.templates.popitem(last=False)
+        return template
+
+    def clear(self) -> None:
+        with self.__lock:
+            self.templates.clear()
+
+
+templates = TemplateCache()
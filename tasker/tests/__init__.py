@@ -0,0 +1,50 @@
+import time
+import typing as t
+import asyncio
+
+from ..bots import Bot
+from ..drivers import BaseDriver
+from ..templates import templates
+
+
+def create_bot(definition: t.Mapping, bot_class: t.Type[Bot] = Bot) -> Bot:
+    return templates.get(definition).create(
+        definition.get("data", {}), definition.get("config"), bot_class,
+        definition.get("name"),
+    )
+
+
+class SleepDriver(BaseDriver):
+    # Stands in for a driver doing blocking or asynchronous I/O.
+    __slots__ = ()
+    name = "sleep"
+
+    def wait(self, seconds, value=None):
+        time.sleep(seconds)
+        return value
+
+    async def wait_async(self, seconds, value=None):
+        await asyncio.sleep(seconds)
+        return value
+
+
+def sleeping_actions(count: int, seconds: float, method: str = "wait") -> t.Dict:
+    # Independent actions that each spend ``seconds`` in the driver.
+    return {
+        f"action_{index}": {
+            "$$exec": {
+                "action": method,
+                "driver": "slow",
+                "args": {"seconds": seconds, "value": index},
+                "store": f"bot.data.result_{index}",
+            }
+        }
+        for index in range(count)
+    }
+
+
+def sleeping_bot(definition: t.Mapping, bot_class: t.Type[Bot] = Bot) -> Bot:
+    # ``definition`` declares a "slow" driver, replaced by a SleepDriver.
+    bot = create_bot(definition, bot_class)
+    bot.drivers["slow"] = SleepDriver()
+    return bot
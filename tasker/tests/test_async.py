@@ -0,0 +1,46 @@
+import time
+import asyncio
+import unittest
+
+from . import sleeping_actions, sleeping_bot
+from ..bots import AsyncBot
+
+DRIVERS = [{"name": "slow", "default": True, "driver": "notify"}]
+
+
+def timed(awaitable):
+    started = time.perf_counter()
+    result = asyncio.run(awaitable)
+    return result, time.perf_counter() - started
+
+
+class BlockingDriverTest(unittest.TestCase):
+    # SleepDriver.wait blocks; an async bot must still overlap its calls.
+
+    def test_parallel_actions_overlap(self):
+        bot = sleeping_bot({
+            "config": {"parallel": 4},
+            "drivers": DRIVERS,
+            "actions": sleeping_actions(4, 0.2),
+        }, AsyncBot)
+
+        _, elapsed = timed(bot.execute())
+
+        self.assertLess(elapsed, 0.6)
+        self.assertEqual([bot.data[f"result_{index}"] for index in range(1, 4)], [1, 2, 3])
+
+    def test_batch_rows_overlap(self):
+        bot = sleeping_bot({"drivers": DRIVERS, "actions": sleeping_actions(2, 0.1)}, AsyncBot)
+
+        rows, elapsed = timed(bot.execute_batch([{}] * 8, max_workers=8))
+
+        self.assertLess(elapsed, 0.6)
+        self.assertTrue(all(row["success"] for row in rows))
+
+    def test_sync_actions_overlap(self):
+        bot = sleeping_bot({"drivers": DRIVERS}, AsyncBot)
+        bot.add_action("sleep", lambda: time.sleep(0.2))
+
+        _, elapsed = timed(bot.execute_batch([{}] * 4, max_workers=4))
+
+        self.assertLess(elapsed, 0.6)
@@ -0,0 +1,49 @@
+import unittest
+
+from . import create_bot
+
+SCALER = {
+    "data": {"factor": 2},
+    "drivers": [{"name": "calc", "default": True, "driver": "notify"}],
+    "actions": {
+        "scale": {
+            "$$exec": {
+                "action": "add",
+                "driver": True,
+                "args": {"x": "$$bot.data.value", "y": "$$bot.data.factor"},
+                "store": "bot.data.result",
+                "returns": "$$bot.data.result",
+            }
+        },
+        "check": {"$$exec": {"$$assert": "$$bot.data.result", "$$message": "no result"}},
+    },
+}
+
+
+class BatchTest(unittest.TestCase):
+    def setUp(self):
+        self.bot = create_bot(SCALER)
+        self.contexts = [{"value": value} for value in range(1, 9)] + [{"value": "x"}]
+
+    def test_rows_run_against_their_own_context(self):
+        rows = self.bot.execute_batch(self.contexts)
+
+        self.assertEqual(
+            [row["values"] for row in rows[:2]],
+            [[{"action": "scale", "value": 3}], [{"action": "scale", "value": 4}]],
+        )
+        self.assertTrue(all(row["success"] for row in rows[:-1]))
+        # A failing row stops at its first error and leaves the others alone.
+        self.assertFalse(rows[-1]["success"])
+        self.assertEqual([error["action"] for error in rows[-1]["errors"]], ["scale"])
+
+    def test_rows_do_not_write_to_the_bot(self):
+        self.bot.execute_batch(self.contexts, max_workers=4)
+
+        self.assertEqual(dict(self.bot.data), {"factor": 2})
+
+    def test_workers_give_the_same_rows(self):
+        self.assertEqual(
+            self.bot.execute_batch(self.contexts, max_workers=4),
+            self.bot.execute_batch(self.contexts),
+        )
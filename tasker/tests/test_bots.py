@@ -0,0 +1,40 @@
+import unittest
+
+from . import create_bot
+from ..bots import Bot
+
+
+class BotContainersTest(unittest.TestCase):
+    def test_empty_bot_accepts_writes(self):
+        bot = Bot()
+        bot.macros["double"] = lambda x: x * 2
+        bot.config["parallel"] = False
+        bot.drivers["calc"] = None
+        bot.actions["noop"] = lambda: None
+
+        self.assertEqual(bot.macros["double"](2), 4)
+        self.assertEqual(bot.config, {"parallel": False})
+        self.assertEqual(list(bot.drivers), ["calc"])
+        self.assertEqual(list(bot.actions), ["noop"])
+
+    def test_bots_do_not_share_containers(self):
+        first, second = Bot(), Bot()
+        first.config["k"] = "v"
+
+        self.assertEqual(second.config, {})
+        self.assertIsNot(first.macros, second.macros)
+
+    def test_execute_does_not_allocate_config(self):
+        bot = create_bot({"actions": {}})
+        bot.execute()
+
+        self.assertIsNone(bot._config)
+        self.assertEqual(bot.config, {})
+
+    def test_assigned_containers_are_kept(self):
+        config = {"incremental": True}
+        bot = Bot(config=config)
+
+        self.assertIs(bot.config, config)
+        bot.config = {}
+        self.assertEqual(bot.config, {})
@@ -0,0 +1,107 @@
+import asyncio
+import unittest
+
+from . import create_bot
+from ..drivers import CircuitBreaker, CircuitOpenError, breakers
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def fail(exception: BaseException):
+    raise exception
+
+
+class CircuitBreakerTest(unittest.TestCase):
+    def setUp(self):
+        self.clock = Clock()
+        self.breaker = CircuitBreaker(
+            "service", minimum_calls=4, window=10, reset_timeout=5, clock=self.clock
+        )
+
+    def failures(self, count: int, exception: BaseException = OSError("down")):
+        for _ in range(count):
+            with self.assertRaises(type(exception)):
+                self.breaker.call(fail, exception)
+
+    def test_opens_at_failure_rate(self):
+        self.breaker.call(len, "ok")
+        self.failures(2)
+        self.assertEqual(self.breaker.state, CircuitBreaker.CLOSED)
+
+        self.failures(1)
+        self.assertEqual(self.breaker.state, CircuitBreaker.OPEN)
+        with self.assertRaises(CircuitOpenError) as raised:
+            self.breaker.call(len, "ok")
+        self.assertEqual(raised.exception.retry_after, 5)
+
+    def test_caller_errors_do_not_count(self):
+        self.failures(10, TypeError("bad arguments"))
+
+        self.assertEqual(self.breaker.state, CircuitBreaker.CLOSED)
+        self.assertEqual(self.breaker.failures, 0)
+
+    def test_failures_of_a_past_window_are_dropped(self):
+        self.failures(3)
+        self.clock.now = 10
+        self.failures(3)
+
+        self.assertEqual(self.breaker.state, CircuitBreaker.CLOSED)
+        self.assertEqual(self.breaker.calls, 3)
+
+    def test_half_open_probe_closes_or_reopens(self):
+        self.failures(4)
+        self.clock.now = 5
+        self.failures(1)
+        self.assertEqual(self.breaker.state, CircuitBreaker.OPEN)
+
+        self.clock.now = 10
+        self.assertEqual(self.breaker.call(len, "ok"), 2)
+        self.assertEqual(self.breaker.state, CircuitBreaker.CLOSED)
+
+    def test_probe_with_caller_error_is_released(self):
+        self.failures(4)
+        self.clock.now = 5
+        self.failures(1, ValueError("bad"))
+
+        self.assertEqual(self.breaker.state, CircuitBreaker.HALF_OPEN)
+        self.assertEqual(self.breaker.call(len, "ok"), 2)
+        self.assertEqual(self.breaker.state, CircuitBreaker.CLOSED)
+
+    def test_awaitable_outcomes(self):
+        async def down():
+            raise TimeoutError()
+
+        async def main():
+            for _ in range(4):
+                with self.assertRaises(TimeoutError):
+                    await self.breaker.call(down)
+
+        asyncio.run(main())
+
+        self.assertEqual(self.breaker.state, CircuitBreaker.OPEN)
+
+
+class DriverBreakerTest(unittest.TestCase):
+    def setUp(self):
+        breakers.clear()
+
+    def test_bad_arguments_leave_the_shared_circuit_closed(self):
+        bot = create_bot({
+            "drivers": [{
+                "name": "calc", "default": True, "driver": "notify",
+                "breaker": {"minimum_calls": 2},
+            }],
+            "actions": {"add": {"$$exec": {"action": "add", "driver": True, "args": {"x": 1}}}},
+        })
+
+        for _ in range(4):
+            with self.assertRaises(RuntimeError):
+                bot.execute_action("add")
+
+        self.assertEqual([entry["state"] for entry in breakers.stats()], ["closed"])
@@ -0,0 +1,109 @@
+import gc
+import unittest
+import weakref
+
+from . import create_bot
+from ..cache import ResultCache, caches
+from ..metrics import registry
+from ..templates import templates
+
+DEFINITION = {
+    "name": "cached",
+    "actions": {
+        "lookup": {
+            "$$exec": {
+                "action": "fetch",
+                "args": {"key": "$$bot.data.key"},
+                "store": "bot.data.value",
+                "cache": {"ttl": 60},
+            }
+        },
+    },
+}
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class ResultCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.clock = Clock()
+        self.cache = ResultCache(maxsize=2, ttl=10, clock=self.clock)
+
+    def test_entries_expire_after_ttl(self):
+        self.cache.put("a", 1)
+        self.clock.now = 9.9
+        self.assertEqual(self.cache.get("a"), 1)
+
+        self.clock.now = 10
+        self.assertIsNone(self.cache.get("a"))
+        self.assertEqual((self.cache.hits, self.cache.misses, len(self.cache)), (1, 1, 0))
+
+    def test_least_recently_used_is_evicted(self):
+        self.cache.put("a", 1)
+        self.cache.put("b", 2)
+        self.cache.get("a")
+        self.cache.put("c", 3)
+
+        self.assertIsNone(self.cache.get("b"))
+        self.assertEqual(self.cache.get("a"), 1)
+        self.assertEqual(self.cache.evictions, 1)
+
+    def test_from_spec(self):
+        self.assertEqual(ResultCache.from_spec(5).ttl, 5)
+        self.assertEqual(ResultCache.from_spec({"maxsize": 3}).maxsize, 3)
+        self.assertIsNone(ResultCache.from_spec(True).ttl)
+
+
+class ExecCacheTest(unittest.TestCase):
+    def setUp(self):
+        # Compiled handles hold their cache: rebuild them with empty ones.
+        templates.clear()
+        caches.clear()
+        self.calls = []
+
+    def build(self, definition=DEFINITION):
+        bot = create_bot(definition)
+        bot.data["key"] = "k"
+        bot.add_action("fetch", lambda key: self.calls.append(key) or key.upper())
+        return bot
+
+    def test_rebuilt_bot_hits_by_name(self):
+        self.build().execute_action("lookup")
+        bot = self.build()
+        bot.execute_action("lookup")
+
+        self.assertEqual(self.calls, ["k"])
+        self.assertEqual(bot.data["value"], "K")
+
+    def test_unnamed_bots_are_not_cached(self):
+        definition = {key: value for key, value in DEFINITION.items() if key != "name"}
+        for _ in range(2):
+            self.build(definition).execute_action("lookup")
+
+        self.assertEqual(self.calls, ["k", "k"])
+
+    def test_entries_do_not_keep_the_bot_alive(self):
+        bot = self.build()
+        bot.execute_action("lookup")
+        reference = weakref.ref(bot)
+
+        del bot
+        gc.collect()
+
+        self.assertIsNone(reference())
+
+    def test_stats_are_exported(self):
+        self.build().execute_action("lookup")
+        self.build().execute_action("lookup")
+
+        self.assertEqual(
+            [(entry["hits"], entry["misses"], entry["size"]) for entry in caches.stats()],
+            [(1, 1, 1)],
+        )
+        self.assertIn("tasker_result_cache_hits_total{spec=", registry.render())
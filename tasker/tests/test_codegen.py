@@ -0,0 +1,196 @@
+import io
+import copy
+import unittest
+import contextlib
+
+from . import create_bot
+from ..cache import caches
+from ..codegen import code_cache
+from ..templates import Template
+
+DRIVERS = [{"name": "calc", "default": True, "driver": "notify"}]
+
+# One definition per DSL construct, each run by both backends against the
+# same data and contexts.
+CASES = {
+    "exec": {
+        "data": {"x": 3, "y": 4},
+        "drivers": DRIVERS,
+        "actions": {
+            "default_driver": {
+                "$$exec": {"action": "add", "driver": True, "args": {"x": "$$bot.data.x", "y": 1}}
+            },
+            "named_driver": {
+                "$$exec": {"action": "add", "driver": "calc", "args": {"x": "$$bot.data.x", "y": "$$bot.data.y"}}
+            },
+            "missing_driver_action": {"$$exec": {"action": "missing", "driver": "calc"}},
+            "body": {"$$exec": {"value": "$$bot.data.x"}},
+        },
+    },
+    "execs": {
+        "data": {"x": 1},
+        "drivers": DRIVERS,
+        "macros": {
+            "first": {"$$exec": {"action": "add", "driver": "calc", "args": {"x": "$$bot.data.x", "y": 1}, "store": "bot.data.x"}},
+            "second": {"$$exec": {"action": "add", "driver": "calc", "args": {"x": "$$bot.data.x", "y": 10}, "store": "bot.data.x"}},
+        },
+        "actions": {
+            "both": {"$$execs": ["$$bot.macros.first", "$$bot.macros.second"]},
+        },
+    },
+    "join": {
+        "data": {"name": "Thraize", "items": [1, 2]},
+        "actions": {
+            "greeting": {"$$exec": {"returns": {"$$join": ["Hello ", "$$bot.data.name", "!"]}}},
+            "static": {"$$exec": {"returns": {"$$join": ["a", "b"]}}},
+            "bad": {"$$exec": {"returns": {"$$join": ["$$bot.data.items"]}}},
+        },
+    },
+    "cast": {
+        "data": {"number": "12", "bad": "abc", "flag": 0},
+        "actions": {
+            "number": {"$$exec": {"returns": {"$$cast": "number", "target": "$$bot.data.number"}}},
+            "decimal": {"$$exec": {"returns": {"$$cast": "decimal", "target": "$$bot.data.number"}}},
+            "string": {"$$exec": {"returns": {"$$cast": "string", "target": "$$bot.data.flag"}}},
+            "boolean": {"$$exec": {"returns": {"$$cast": "boolean", "target": "$$bot.data.number"}}},
+            "bad": {"$$exec": {"returns": {"$$cast": "number", "target": "$$bot.data.bad"}}},
+        },
+    },
+    "if": {
+        "data": {"flag": True},
+        "actions": {
+            "if": {"$$exec": {"returns": {"$$if": "$$bot.data.flag", "$$then": "on", "$$else": "off"}}},
+            "static": {"$$exec": {"returns": {"$$if": 0, "$$then": "on", "$$else": "$$bot.data.flag"}}},
+            "shorthand": {"$$exec": {"returns": {"$$?": "$$bot.data.missing", "$$:": "fallback"}}},
+            "shorthand_value": {"$$exec": {"returns": {"$$?": "$$bot.data.flag", "$$:": "fallback"}}},
+        },
+    },
+    "assert": {
+        "data": {"value": "v"},
+        "actions": {
+            "passes": {"$$exec": {"$$assert": "$$bot.data.value", "$$message": "no value"}},
+            "fails": {"$$exec": {"$$assert": "$$bot.data.missing", "$$message": {"$$join": ["missing ", "$$bot.data.value"]}}},
+        },
+    },
+    "macro": {
+        "data": {"x": 2},
+        "drivers": DRIVERS,
+        "macros": {
+            "add": {"$$exec": {"action": "add", "driver": "calc", "args": "$$args", "returns": "$$bot.data.x"}},
+        },
+        "actions": {
+            "exec_macro": {"$$exec": {"macro": "add", "args": {"x": "$$bot.data.x", "y": 3}, "store": "bot.data.sum"}},
+            "macro_call": {"$$macro": {"target": "add", "args": {"x": 5, "y": "$$bot.data.x"}}},
+            "missing_macro": {"$$exec": {"macro": "missing"}},
+        },
+    },
+    "store": {
+        "data": {"x": 1, "nested": {"a": 1}},
+        "drivers": DRIVERS,
+        "actions": {
+            "top": {"$$exec": {"action": "add", "driver": True, "args": {"x": "$$bot.data.x", "y": 1}, "store": "bot.data.x"}},
+            "nested": {"$$exec": {"action": "add", "driver": True, "args": {"x": "$$bot.data.x", "y": 1}, "store": "bot.data.nested.a"}},
+        },
+    },
+    "returns": {
+        "data": {"x": 1},
+        "drivers": DRIVERS,
+        "actions": {
+            "value": {"$$exec": {"action": "add", "driver": True, "args": {"x": 1, "y": 1}, "store": "bot.data.x", "returns": {"value": "$$bot.data.x", "static": [1, {"a": 2}]}}},
+        },
+    },
+    "cache": {
+        "data": {"x": 1, "calls": 0},
+        "drivers": DRIVERS,
+        "actions": {
+            "cached": {"$$exec": {"action": "add", "driver": True, "args": {"x": "$$bot.data.x", "y": 1}, "store": "bot.data.value", "cache": True}},
+            "count": {"$$exec": {"action": "add", "driver": True, "args": {"x": "$$bot.data.calls", "y": 1}, "store": "bot.data.calls"}},
+        },
+    },
+}
+
+CONTEXTS = [None, {"x": 10, "flag": False}, {"value": 0, "number": "5"}, None]
+
+
+def outcomes(bot):
+    results = []
+    for context in CONTEXTS:
+        for action_name in bot.actions:
+            try:
+                with contextlib.redirect_stdout(io.StringIO()):
+                    value = ("value", bot.execute_action(action_name, context))
+            except RuntimeError as e:
+                value = ("error", type(e.__cause__).__name__)
+            results.append((action_name, value, sorted(bot.data.items(), key=str)))
+    return results
+
+
+class BackendEquivalenceTest(unittest.TestCase):
+    def setUp(self):
+        caches.clear()
+
+    def run_case(self, name):
+        results = {}
+        for compiler in ("closures", "python"):
+            definition = {**copy.deepcopy(CASES[name]), "compiler": compiler, "name": name}
+            results[compiler] = outcomes(create_bot(definition))
+        self.assertEqual(results["closures"], results["python"])
+        return dict(
+            ((action_name, index // len(CASES[name]["actions"])), value)
+            for index, (action_name, value, _) in enumerate(results["python"])
+        )
+
+    def test_exec(self):
+        results = self.run_case("exec")
+        self.assertEqual(results["default_driver", 0], ("value", None))
+        self.assertEqual(results["missing_driver_action", 0], ("error", "AttributeError"))
+
+    def test_execs(self):
+        self.run_case("execs")
+
+    def test_join(self):
+        results = self.run_case("join")
+        self.assertEqual(results["bad", 0], ("error", "TypeError"))
+
+    def test_cast(self):
+        results = self.run_case("cast")
+        self.assertEqual(results["number", 0], ("value", 12))
+        self.assertEqual(results["number", 2], ("value", 5))
+        self.assertEqual(results["bad", 0], ("error", "ValueError"))
+
+    def test_if(self):
+        results = self.run_case("if")
+        self.assertEqual(results["if", 0], ("value", "on"))
+        self.assertEqual(results["if", 1], ("value", "off"))
+        self.assertEqual(results["shorthand", 0], ("value", "fallback"))
+
+    def test_assert(self):
+        results = self.run_case("assert")
+        self.assertEqual(results["passes", 0], ("value", None))
+        self.assertEqual(results["fails", 0], ("error", "AssertionError"))
+
+    def test_macro(self):
+        results = self.run_case("macro")
+        self.assertEqual(results["exec_macro", 0], ("value", None))
+        self.assertEqual(results["macro_call", 0], ("value", 2))
+
+    def test_store(self):
+        self.run_case("store")
+
+    def test_returns(self):
+        results = self.run_case("returns")
+        self.assertEqual(results["value", 0], ("value", {"value": 2, "static": [1, {"a": 2}]}))
+
+    def test_cache(self):
+        self.run_case("cache")
+
+
+class CodeCacheTest(unittest.TestCase):
+    def test_generated_code_is_reused(self):
+        definition = {**CASES["returns"], "compiler": "python"}
+        first = Template(definition).create()
+        entries = dict(code_cache.entries)
+        second = Template(definition).create()
+
+        self.assertEqual(code_cache.entries, entries)
+        self.assertEqual(first.execute_action("value"), second.execute_action("value"))
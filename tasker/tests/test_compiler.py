@@ -0,0 +1,124 @@
+import copy
+import unittest
+
+from . import create_bot
+from ..scope import Scope
+from ..compiler import Constant, compile_node
+
+CALCULATOR = {
+    "data": {"name": "Thraize"},
+    "drivers": [{"name": "calc", "default": True, "driver": "notify"}],
+    "macros": {
+        "add": {
+            "$$exec": {
+                "action": "add",
+                "driver": "calc",
+                "args": "$$args",
+                "returns": "$$bot.data.name",
+            }
+        }
+    },
+    "actions": {
+        "calculate": {
+            "$$exec": {
+                "action": "add",
+                "driver": True,
+                "args": {
+                    "x": {"$$if": "$$bot.data.x", "$$then": "$$bot.data.x", "$$else": 10},
+                    "y": {"$$?": "$$bot.data.y", "$$:": 12},
+                },
+                "store": "bot.data.value",
+            }
+        },
+        "greet": {
+            "$$exec": {
+                "macro": "add",
+                "args": {"x": "$$bot.data.value", "y": 1},
+                "store": "bot.data.total",
+            }
+        },
+    },
+}
+
+
+class CompilerTest(unittest.TestCase):
+    def test_compiled_bot_runs_definition(self):
+        bot = create_bot(CALCULATOR)
+
+        bot.execute()
+        self.assertEqual(bot.data["value"], 22)
+        self.assertEqual(bot.data["total"], "Thraize")
+
+        bot.data.update(x=1, y=2)
+        self.assertIsNone(bot.execute_action("calculate"))
+        self.assertEqual(bot.data["value"], 3)
+
+    def test_definition_is_not_read_at_run_time(self):
+        definition = copy.deepcopy(CALCULATOR)
+        bot = create_bot(definition)
+
+        definition["actions"]["calculate"]["$$exec"]["store"] = "bot.data.other"
+        definition["actions"]["calculate"]["$$exec"]["args"]["y"] = 0
+        bot.execute_action("calculate")
+
+        self.assertEqual(bot.data["value"], 22)
+        self.assertNotIn("other", bot.data)
+
+    def test_node_evaluates_against_scope(self):
+        node = compile_node({
+            "text": {"$$join": ["a", "$$args.x", {"$$cast": "string", "target": 1}]},
+            "items": ["$$args.x", {"$$?": "$$args.missing", "$$:": "default"}],
+        })
+
+        self.assertEqual(
+            node(Scope({"args": {"x": "b"}})),
+            {"text": "ab1", "items": ["b", "default"]},
+        )
+        self.assertEqual(
+            node(Scope({"args": {"x": "c"}})),
+            {"text": "ac1", "items": ["c", "default"]},
+        )
+
+    def test_assert_raises_with_message(self):
+        node = compile_node({"$$assert": "$$args.x", "$$message": "missing x"})
+
+        self.assertIsNone(node(Scope({"args": {"x": 1}})))
+        with self.assertRaisesRegex(AssertionError, "missing x"):
+            node(Scope({"args": {}}))
+
+
+class FoldingTest(unittest.TestCase):
+    def test_static_operators_fold_to_constants(self):
+        nodes = {
+            "joined": compile_node({"$$join": ["a", "b", {"$$cast": "string", "target": 1}]}),
+            "if": compile_node({"$$if": 1, "$$then": "yes", "$$else": "no"}),
+            "shorthand": compile_node({"$$?": 0, "$$:": "other"}),
+            "cast": compile_node({"$$cast": "number", "target": "12"}),
+        }
+
+        for name, node in nodes.items():
+            self.assertIsInstance(node, Constant, name)
+        self.assertEqual(
+            {name: node(Scope()) for name, node in nodes.items()},
+            {"joined": "ab1", "if": "yes", "shorthand": "other", "cast": 12},
+        )
+
+    def test_failing_operator_fails_at_run_time(self):
+        node = compile_node({"$$cast": "number", "target": "abc"})
+
+        self.assertNotIsInstance(node, Constant)
+        with self.assertRaises(ValueError):
+            node(Scope())
+
+    def test_static_containers_are_fresh_per_evaluation(self):
+        node = compile_node({"items": [1, {"a": 2}]})
+
+        first = node(Scope())
+        first["items"][1]["a"] = 3
+
+        self.assertEqual(node(Scope()), {"items": [1, {"a": 2}]})
+
+    def test_partially_static_join(self):
+        node = compile_node({"$$join": ["a", "b", "$$args.x", "c", "d"]})
+
+        self.assertEqual(node(Scope({"args": {"x": "-"}})), "ab-cd")
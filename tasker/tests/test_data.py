@@ -0,0 +1,71 @@
+import unittest
+
+from ..bots import Bot
+from ..data import BotData, DataOverlay
+
+
+class BotDataTest(unittest.TestCase):
+    def test_writes_stamp_keys(self):
+        data = BotData(a=1)
+        stamp = data.stamp("a")
+
+        data["a"] = 1
+        self.assertEqual(data.stamp("a"), stamp)
+        data["a"] = 2
+        self.assertGreater(data.stamp("a"), stamp)
+        del data["a"]
+        self.assertIsNone(data.stamp("a"))
+
+    def test_assigned_data_keeps_stamps(self):
+        bot = Bot()
+        bot.data = {"a": 1}
+
+        self.assertIsInstance(bot.data, BotData)
+        self.assertIsNotNone(bot.data.stamp("a"))
+        with bot.overlay({"a": 2}) as overlay:
+            self.assertEqual(bot.data["a"], 2)
+            self.assertIs(bot.data, overlay)
+        self.assertEqual(bot.data["a"], 1)
+
+
+class OverlayTest(unittest.TestCase):
+    def setUp(self):
+        self.bot = Bot()
+        self.bot.data = {"a": 1, "nested": {"b": 1}}
+        self.bot.add_action("write", self.write)
+
+    def write(self):
+        self.bot.data["a"] = self.bot.data["a"] + 1
+        self.bot.data.own("nested")["b"] = 2
+        return self.bot.data["a"]
+
+    def test_context_is_layered_over_data(self):
+        overlay = DataOverlay(self.bot.data, {"a": 5, "c": 1})
+
+        self.assertEqual(overlay.flatten(), {"a": 5, "nested": {"b": 1}, "c": 1})
+        del overlay["c"]
+        self.assertNotIn("c", overlay)
+        self.assertEqual(dict(self.bot.data), {"a": 1, "nested": {"b": 1}})
+
+    def test_successful_action_commits_writes_but_not_context(self):
+        self.assertEqual(self.bot.execute_action("write", {"a": 5, "c": 1}), 6)
+
+        self.assertEqual(dict(self.bot.data), {"a": 6, "nested": {"b": 2}})
+
+    def test_failed_action_discards_writes(self):
+        def fail():
+            self.bot.data["a"] = 10
+            self.bot.data.own("nested")["b"] = 10
+            raise ValueError
+
+        self.bot.add_action("fail", fail)
+
+        with self.assertRaises(RuntimeError):
+            self.bot.execute_action("fail", {"c": 1})
+        self.assertEqual(dict(self.bot.data), {"a": 1, "nested": {"b": 1}})
+
+    def test_assigned_data_runs_with_context(self):
+        self.bot.data = {"a": 1, "nested": {}}
+
+        self.assertEqual(self.bot.execute_action("write", {"a": 1}), 2)
+        self.assertEqual(self.bot.data.stamps(["a", "missing"])[1], None)
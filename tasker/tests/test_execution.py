@@ -0,0 +1,72 @@
+import asyncio
+import unittest
+
+from . import create_bot
+from ..bots import AsyncBot
+from ..execution import ExecutionContext
+
+DEFINITION = {
+    "data": {"factor": 2},
+    "drivers": [{"name": "calc", "default": True, "driver": "notify"}],
+    "actions": {
+        "scale": {
+            "$$exec": {
+                "action": "add",
+                "driver": True,
+                "args": {"x": "$$bot.data.value", "y": "$$bot.data.factor"},
+                "returns": "$$bot.data.value",
+            }
+        },
+        "check": {"$$exec": {"$$assert": "$$bot.data.strict", "$$message": "not strict"}},
+    },
+}
+
+
+class ExecutionContextTest(unittest.TestCase):
+    def test_collects_values_errors_and_timings(self):
+        bot = create_bot(DEFINITION)
+        execution = ExecutionContext()
+
+        with self.assertRaises(RuntimeError):
+            bot.execute({"value": 1}, execution=execution)
+
+        self.assertFalse(execution.success)
+        self.assertEqual(execution.errors, [
+            {"action": "check", "error": "AssertionError", "args": ("not strict",)}
+        ])
+        self.assertEqual(set(execution.timings), {"scale", "check"})
+        # Collecting results does not leave listeners on the bot.
+        self.assertFalse(bot.event_listeners)
+
+    def test_concurrent_runs_keep_their_results(self):
+        bot = create_bot(DEFINITION, AsyncBot)
+        executions = [ExecutionContext(), ExecutionContext()]
+
+        async def main():
+            await asyncio.gather(*(
+                bot.execute({"value": value, "strict": True}, execution=execution)
+                for value, execution in zip((1, 5), executions)
+            ))
+
+        asyncio.run(main())
+
+        self.assertTrue(all(execution.success for execution in executions))
+        self.assertEqual(
+            [execution.values for execution in executions],
+            [[{"action": "scale", "value": 1}], [{"action": "scale", "value": 5}]],
+        )
+
+    def test_merge_and_result(self):
+        first, second = ExecutionContext(), ExecutionContext()
+        first.value("a", 1)
+        second.error("b", ValueError("bad"))
+        second.timing("b", 0.5)
+
+        first.merge(second)
+
+        self.assertEqual(first.result(), {
+            "success": False,
+            "values": [{"action": "a", "value": 1}],
+            "errors": [{"action": "b", "error": "ValueError", "args": ("bad",)}],
+        })
+        self.assertEqual(first.timings, {"b": 0.5})
@@ -0,0 +1,133 @@
+import asyncio
+import unittest
+
+from ..fleet import Fleet, HashRing
+
+KEYS = [f"bot_{index}" for index in range(1000)]
+
+
+class HashRingTest(unittest.TestCase):
+    def test_keys_spread_over_nodes(self):
+        ring = HashRing(["a", "b", "c"])
+        owners = [ring.get(key) for key in KEYS]
+
+        for node in ("a", "b", "c"):
+            self.assertGreater(owners.count(node), 200)
+
+    def test_adding_a_node_only_moves_keys_to_it(self):
+        ring = HashRing(["a", "b", "c"])
+        before = {key: ring.get(key) for key in KEYS}
+        ring.add("d")
+
+        moved = [key for key in KEYS if ring.get(key) != before[key]]
+        self.assertTrue(all(ring.get(key) == "d" for key in moved))
+        self.assertLess(len(moved), 400)
+
+    def test_removing_a_node_only_moves_its_keys(self):
+        ring = HashRing(["a", "b", "c"])
+        before = {key: ring.get(key) for key in KEYS}
+        ring.remove("b")
+
+        self.assertTrue(all(
+            ring.get(key) == owner for key, owner in before.items() if owner != "b"
+        ))
+
+    def test_empty_ring(self):
+        with self.assertRaises(LookupError):
+            HashRing().get("bot")
+
+
+class FakeWorker:
+    # Stands in for a worker process; ``broken`` fails every load.
+    def __init__(self, name, bots=(), broken=False):
+        self.name = name
+        self.bots = {bot_id: {"data": {"id": bot_id}} for bot_id in bots}
+        self.broken = broken
+        self.closed = False
+
+    async def call(self, operation, *args):
+        if operation == "keys":
+            return list(self.bots)
+        if operation == "export":
+            return self.bots.pop(args[0])
+        if operation == "load":
+            if self.broken:
+                raise RuntimeError(f"{self.name}: cannot load")
+            self.bots[args[0]] = args[1]
+
+    def close(self):
+        self.closed = True
+
+
+class RebalanceTest(unittest.TestCase):
+    def setUp(self):
+        self.fleet = self.place("w0", "w1")
+        self.spawned = None
+
+    def place(self, *names):
+        fleet = Fleet(workers=len(names))
+        fleet.ring = HashRing(names)
+        fleet.workers = {
+            name: FakeWorker(name, [key for key in KEYS[:100] if fleet.ring.get(key) == name])
+            for name in names
+        }
+        return fleet
+
+    def spawn(self, broken=False):
+        def spawn():
+            self.spawned = self.fleet.workers["w2"] = FakeWorker("w2", broken=broken)
+            return self.spawned
+
+        # Replaces the process spawning of add_worker.
+        self.fleet._Fleet__spawn = spawn
+
+    def serve(self, coroutine):
+        async def main():
+            self.fleet.ready = asyncio.Event()
+            self.fleet.ready.set()
+            self.fleet.rebalancing = asyncio.Lock()
+            return await coroutine()
+
+        return asyncio.run(main())
+
+    def owners(self):
+        async def owners():
+            return {key: (await self.fleet.owner(key)).name for key in KEYS[:100]}
+
+        return self.serve(owners)
+
+    def test_add_worker_moves_its_bots(self):
+        self.spawn()
+
+        self.assertEqual(self.serve(self.fleet.add_worker), "w2")
+
+        self.assertTrue(self.spawned.bots)
+        for key, name in self.owners().items():
+            self.assertIn(key, self.fleet.workers[name].bots)
+        self.assertEqual(self.fleet.routes, {})
+
+    def test_failed_add_worker_restores_bots_and_terminates_worker(self):
+        self.spawn(broken=True)
+
+        with self.assertRaises(RuntimeError):
+            self.serve(self.fleet.add_worker)
+
+        self.assertTrue(self.spawned.closed)
+        self.assertEqual(set(self.fleet.workers), {"w0", "w1"})
+        self.assertEqual(self.fleet.ring.nodes, ["w0", "w1"])
+        for key, name in self.owners().items():
+            self.assertIn(key, self.fleet.workers[name].bots)
+
+    def test_failed_move_rolls_back_moved_bots(self):
+        self.fleet = self.place("w0", "w1", "w2")
+        self.fleet.workers["w1"].broken = True
+
+        with self.assertRaises(RuntimeError):
+            self.serve(lambda: self.fleet.remove_worker("w0"))
+
+        self.assertFalse(self.fleet.workers["w0"].closed)
+        self.assertEqual(
+            sum(len(worker.bots) for worker in self.fleet.workers.values()), 100
+        )
+        for key, name in self.owners().items():
+            self.assertIn(key, self.fleet.workers[name].bots)
@@ -0,0 +1,61 @@
+import time
+import asyncio
+import unittest
+import threading
+
+from . import sleeping_actions, sleeping_bot
+from ..bots import AsyncBot, Bot
+from ..gateway import ExecutionGateway
+
+DEFINITION = {
+    "drivers": [{"name": "slow", "default": True, "driver": "notify"}],
+    "actions": sleeping_actions(1, 0.2),
+}
+
+
+class GatewayTest(unittest.TestCase):
+    def setUp(self):
+        self.gateway = ExecutionGateway(max_workers=2)
+
+    def tearDown(self):
+        self.gateway.shutdown()
+
+    def run_all(self, *executions):
+        async def main():
+            return await asyncio.gather(*(
+                self.gateway.run(bot, bot.execute) for bot in executions
+            ))
+
+        started = time.perf_counter()
+        asyncio.run(main())
+        return time.perf_counter() - started
+
+    def test_async_bots_run_concurrently_on_the_loop(self):
+        # More bots than gateway workers: none of them takes a worker.
+        bots = [sleeping_bot(DEFINITION, AsyncBot) for _ in range(4)]
+
+        self.assertLess(self.run_all(*bots), 0.6)
+
+    def test_sync_bots_run_on_workers(self):
+        bot = sleeping_bot(DEFINITION)
+        threads = []
+        bot.on("action.execute:before", lambda **_: threads.append(threading.get_ident()))
+
+        self.run_all(bot)
+
+        self.assertNotEqual(threads, [threading.get_ident()])
+
+    def test_executions_of_one_bot_are_queued(self):
+        bot = sleeping_bot(DEFINITION, AsyncBot)
+
+        self.assertGreaterEqual(self.run_all(bot, bot), 0.4)
+
+    def test_busy_while_held(self):
+        bot = Bot()
+
+        async def main():
+            async with self.gateway.lock(bot):
+                return self.gateway.busy(bot)
+
+        self.assertTrue(asyncio.run(main()))
+        self.assertFalse(self.gateway.busy(bot))
@@ -0,0 +1,73 @@
+import unittest
+
+from . import create_bot
+from ..execution import ExecutionContext
+
+COUNTER = {
+    "config": {"incremental": True},
+    "data": {"x": 1, "y": 2},
+    "drivers": [{"name": "calc", "default": True, "driver": "notify"}],
+    "actions": {
+        "sum": {
+            "$$exec": {
+                "action": "add",
+                "driver": True,
+                "args": {"x": "$$bot.data.x", "y": "$$bot.data.y"},
+                "store": "bot.data.sum",
+            }
+        },
+        "double": {
+            "$$exec": {
+                "action": "add",
+                "driver": True,
+                "args": {"x": "$$bot.data.sum", "y": "$$bot.data.sum"},
+                "store": "bot.data.double",
+                "returns": "$$bot.data.sum",
+            }
+        },
+    },
+}
+
+
+class IncrementalTest(unittest.TestCase):
+    def setUp(self):
+        self.bot = create_bot(COUNTER)
+        self.cached = []
+        self.bot.on("action.execute:cached", lambda action: self.cached.append(action))
+
+    def test_unchanged_actions_are_skipped(self):
+        self.bot.execute()
+        self.assertEqual(self.cached, [])
+
+        execution = self.bot.execute()
+
+        self.assertEqual(self.cached, ["sum", "double"])
+        # Skipped actions still report their last value.
+        self.assertEqual(execution.values, [{"action": "double", "value": 3}])
+
+    def test_changed_input_reruns_dependents(self):
+        self.bot.execute()
+        self.bot.data["y"] = 5
+        self.bot.execute()
+
+        self.assertEqual(self.cached, [])
+        self.assertEqual(self.bot.data["double"], 12)
+
+        self.bot.data["y"] = 5
+        self.bot.execute()
+        self.assertEqual(self.cached, ["sum", "double"])
+
+    def test_overwritten_output_reruns(self):
+        self.bot.execute()
+        self.bot.data["double"] = 0
+        self.bot.execute()
+
+        self.assertEqual(self.cached, ["sum"])
+        self.assertEqual(self.bot.data["double"], 6)
+
+    def test_replaced_action_reruns(self):
+        self.bot.execute()
+        self.bot.add_action("sum", lambda: 0)
+        self.bot.execute(execution=ExecutionContext())
+
+        self.assertEqual(self.cached, ["double"])
@@ -0,0 +1,106 @@
+import time
+import asyncio
+import unittest
+
+from threading import Lock, Thread
+
+from . import create_bot
+from ..drivers import DriverLimiter, limiters, split_limits
+
+
+class Tracker:
+    # Records the most calls running at once.
+    def __init__(self):
+        self.running = 0
+        self.most = 0
+        self.lock = Lock()
+
+    def enter(self):
+        with self.lock:
+            self.running += 1
+            self.most = max(self.most, self.running)
+
+    def leave(self):
+        with self.lock:
+            self.running -= 1
+
+    def __call__(self):
+        self.enter()
+        time.sleep(0.02)
+        self.leave()
+
+    async def wait(self):
+        self.enter()
+        await asyncio.sleep(0.02)
+        self.leave()
+
+
+class DriverLimiterTest(unittest.TestCase):
+    def test_concurrency_cap_across_threads(self):
+        limiter = DriverLimiter("service", concurrency=2)
+        tracker = Tracker()
+
+        threads = [Thread(target=limiter.call, args=(tracker,)) for _ in range(6)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(tracker.most, 2)
+        self.assertEqual(limiter.in_flight, 0)
+
+    def test_concurrency_cap_for_async_calls(self):
+        limiter = DriverLimiter("service", concurrency=2)
+        tracker = Tracker()
+
+        async def main():
+            await asyncio.gather(*(limiter.call(tracker.wait, True) for _ in range(6)))
+
+        asyncio.run(main())
+
+        self.assertEqual(tracker.most, 2)
+        self.assertEqual(limiter.in_flight, 0)
+
+    def test_rate_waits_for_tokens(self):
+        limiter = DriverLimiter("service", rate=20, burst=2)
+
+        started = time.perf_counter()
+        for _ in range(4):
+            limiter.call(lambda: None)
+        elapsed = time.perf_counter() - started
+
+        # Two calls fit the burst; the other two wait 50 ms each.
+        self.assertGreaterEqual(elapsed, 0.09)
+        self.assertLess(elapsed, 0.5)
+
+    def test_failed_call_releases_its_slot(self):
+        limiter = DriverLimiter("service", concurrency=1)
+
+        with self.assertRaises(ValueError):
+            limiter.call(lambda: int("x"))
+
+        self.assertEqual(limiter.in_flight, 0)
+
+
+class DriverConfigTest(unittest.TestCase):
+    def setUp(self):
+        limiters.clear()
+
+    def test_split_limits(self):
+        self.assertEqual(
+            split_limits({"url": "x", "rate_limit": 5, "max_concurrency": 2}),
+            ({"url": "x"}, {"rate": 5, "concurrency": 2}),
+        )
+
+    def test_drivers_of_one_service_share_a_limiter(self):
+        definition = {
+            "drivers": [{
+                "name": "calc", "default": True, "driver": "notify",
+                "config": {"max_concurrency": 1},
+            }],
+        }
+        first, second = create_bot(definition), create_bot(definition)
+
+        self.assertIs(first.drivers["calc"].limiter, second.drivers["calc"].limiter)
+        self.assertEqual(first.drivers["calc"].limiter.concurrency, 1)
+        self.assertEqual([entry["in_flight"] for entry in limiters.stats()], [0])
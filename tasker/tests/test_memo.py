@@ -0,0 +1,66 @@
+import unittest
+
+from . import create_bot
+from ..bots import Bot
+from ..scope import Scope
+from ..memo import Memo, Memoized, memo
+from ..compiler import compile_node
+
+GREETER = {
+    "data": {"name": "u1", "user": {"name": "u1"}, "items": [1]},
+    "actions": {
+        "top": {"$$exec": {"returns": {"$$join": ["hi ", "$$bot.data.name"]}}},
+        "nested": {"$$exec": {"returns": {"$$join": ["hi ", "$$bot.data.user.name"]}}},
+        "container": {"$$exec": {"returns": {"$$cast": "string", "target": "$$bot.data.items"}}},
+    },
+}
+
+
+class MemoTest(unittest.TestCase):
+    def test_scalar_reads_are_memoized(self):
+        node = compile_node({"$$join": ["hi ", "$$bot.data.name"]})
+        bot = Bot()
+        bot.data["name"] = "u1"
+        hits = memo.hits
+
+        self.assertIsInstance(node, Memoized)
+        self.assertEqual(node(Scope({"bot": bot})), "hi u1")
+        self.assertEqual(node(Scope({"bot": bot})), "hi u1")
+        self.assertEqual(memo.hits, hits + 1)
+
+        bot.data["name"] = "u2"
+        self.assertEqual(node(Scope({"bot": bot})), "hi u2")
+
+    def test_nested_reads_are_not_memoized(self):
+        node = compile_node({"$$join": ["hi ", "$$bot.data.user.name"]})
+
+        self.assertNotIsInstance(node, Memoized)
+
+    def test_nested_mutation_is_seen(self):
+        bot = create_bot(GREETER)
+
+        self.assertEqual(bot.execute_action("nested"), "hi u1")
+        bot.data["user"]["name"] = "u2"
+        self.assertEqual(bot.execute_action("nested"), "hi u2")
+
+    def test_container_values_are_evaluated(self):
+        bot = create_bot(GREETER)
+
+        self.assertEqual(bot.execute_action("container"), "[1]")
+        bot.data["items"].append(2)
+        self.assertEqual(bot.execute_action("container"), "[1, 2]")
+
+    def test_overlay_writes_invalidate(self):
+        bot = create_bot(GREETER)
+
+        self.assertEqual(bot.execute_action("top", {"name": "u3"}), "hi u3")
+        self.assertEqual(bot.execute_action("top"), "hi u1")
+
+    def test_memo_is_bounded(self):
+        bounded = Memo(maxsize=2)
+        for key in range(3):
+            bounded.put(key, key)
+
+        self.assertEqual(len(bounded), 2)
+        self.assertIsNone(bounded.get(0))
+        self.assertEqual(bounded.get(2), 2)
@@ -0,0 +1,91 @@
+import unittest
+
+from threading import Thread
+
+from . import create_bot
+from .. import metrics
+from ..metrics import Histogram, Registry
+
+DEFINITION = {
+    "name": "metered",
+    "drivers": [{"name": "calc", "default": True, "driver": "notify"}],
+    "actions": {
+        "add": {"$$exec": {"action": "add", "driver": True, "args": {"x": 1, "y": 2}}},
+    },
+}
+
+
+class HistogramTest(unittest.TestCase):
+    def setUp(self):
+        self.histogram = Histogram("latency", "Latency.", ("kind",), buckets=(0.1, 1.0))
+
+    def test_threads_are_merged(self):
+        def observe():
+            for _ in range(1000):
+                self.histogram.observe(("a",), 0.5)
+
+        threads = [Thread(target=observe) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.histogram.observe(("b",), 2.0)
+
+        self.assertEqual(self.histogram.series[("a",)], ([0, 4000, 0], 4000, 2000.0))
+        self.assertEqual(self.histogram.series[("b",)], ([0, 0, 1], 1, 2.0))
+
+    def test_render(self):
+        self.histogram.observe(("a",), 0.05)
+        self.histogram.observe(("a",), 0.5)
+
+        self.assertEqual(list(self.histogram.render()), [
+            "# HELP latency Latency.",
+            "# TYPE latency histogram",
+            'latency_bucket{kind="a",le="0.1"} 1',
+            'latency_bucket{kind="a",le="1.0"} 2',
+            'latency_bucket{kind="a",le="+Inf"} 2',
+            'latency_sum{kind="a"} 0.55',
+            'latency_count{kind="a"} 2',
+        ])
+
+    def test_clear(self):
+        self.histogram.observe(("a",), 0.5)
+        self.histogram.clear()
+
+        self.assertEqual(self.histogram.series, {})
+
+    def test_registry_returns_existing_metric(self):
+        registry = Registry()
+        gauge = registry.gauge("depth", "Depth.", ("driver",))
+        gauge.inc(("calc",), 2)
+
+        self.assertIs(registry.gauge("depth", "Depth.", ("driver",)), gauge)
+        self.assertEqual(registry.render(), (
+            "# HELP depth Depth.\n# TYPE depth gauge\n" 'depth{driver="calc"} 2\n'
+        ))
+
+
+class EnabledTest(unittest.TestCase):
+    def setUp(self):
+        self.enabled, metrics.enabled = metrics.enabled, True
+        metrics.action_seconds.clear()
+        metrics.driver_seconds.clear()
+
+    def tearDown(self):
+        metrics.enabled = self.enabled
+
+    def observed(self, histogram):
+        return {labels for labels in histogram.series if labels[0] == "metered"}
+
+    def test_actions_and_driver_calls_are_observed(self):
+        create_bot(DEFINITION).execute_action("add")
+
+        self.assertEqual(self.observed(metrics.action_seconds), {("metered", "add", "success")})
+        self.assertEqual(self.observed(metrics.driver_seconds), {("metered", "calc", "add")})
+
+    def test_disabled_metrics_observe_nothing(self):
+        metrics.enabled = False
+        create_bot(DEFINITION).execute_action("add")
+
+        self.assertEqual(self.observed(metrics.action_seconds), set())
+        self.assertEqual(self.observed(metrics.driver_seconds), set())
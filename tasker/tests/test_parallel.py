@@ -0,0 +1,57 @@
+import time
+import unittest
+
+from . import sleeping_actions, sleeping_bot
+
+DRIVERS = [{"name": "slow", "default": True, "driver": "notify"}]
+
+
+class ParallelTest(unittest.TestCase):
+    def test_independent_actions_overlap(self):
+        bot = sleeping_bot({
+            "config": {"parallel": 4},
+            "drivers": DRIVERS,
+            "actions": sleeping_actions(4, 0.2),
+        })
+
+        started = time.perf_counter()
+        bot.execute()
+        elapsed = time.perf_counter() - started
+
+        self.assertLess(elapsed, 0.6)
+        self.assertEqual([bot.data[f"result_{index}"] for index in range(1, 4)], [1, 2, 3])
+
+    def test_dependent_action_waits_and_events_keep_action_order(self):
+        actions = sleeping_actions(2, 0.1)
+        actions["total"] = {
+            "$$exec": {
+                "action": "wait",
+                "driver": "slow",
+                "args": {"seconds": 0, "value": {
+                    "$$join": [{"$$cast": "string", "target": "$$bot.data.result_1"}, "!"]
+                }},
+                "store": "bot.data.total",
+            }
+        }
+        bot = sleeping_bot({"config": {"parallel": True}, "drivers": DRIVERS, "actions": actions})
+        executed = []
+        bot.on("action.execute", lambda action, success: executed.append(action))
+
+        bot.data["result_1"] = "before"
+        bot.execute()
+
+        self.assertEqual(bot.data["total"], "1!")
+        self.assertEqual(executed, ["action_0", "action_1", "total"])
+
+    def test_first_error_in_action_order_is_raised(self):
+        bot = sleeping_bot({
+            "config": {"parallel": 2},
+            "drivers": DRIVERS,
+            "actions": {
+                "slow_failure": {"$$exec": {"action": "missing", "driver": "slow"}},
+                "fast_failure": {"$$exec": {"$$assert": 0, "$$message": "fast"}},
+            },
+        })
+
+        with self.assertRaisesRegex(RuntimeError, "slow_failure"):
+            bot.execute()
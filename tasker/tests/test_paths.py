@@ -0,0 +1,48 @@
+import unittest
+
+from ..bots import Bot
+from ..scope import Scope
+from ..paths import (
+    DataAccessor, DataSetter, DictAccessor, NameAccessor, NestedDataSetter,
+    accessor, setter,
+)
+
+
+class PathsTest(unittest.TestCase):
+    def setUp(self):
+        self.bot = Bot()
+        self.bot.data.update(user={"name": "u1", "tags": ["a"]}, count=0)
+
+    def test_paths_are_parsed_once(self):
+        self.assertIs(accessor("$$bot.data.user.name"), accessor("$$bot.data.user.name"))
+        self.assertIs(setter("bot.data.value"), setter("bot.data.value"))
+
+    def test_accessor_kinds(self):
+        self.assertIsInstance(accessor("$$name"), NameAccessor)
+        self.assertIsInstance(accessor("$$args.x"), DictAccessor)
+        self.assertIsInstance(accessor("$$bot.data.user.name"), DataAccessor)
+        self.assertIsInstance(setter("bot.data.value"), DataSetter)
+        self.assertIsInstance(setter("bot.data.user.name"), NestedDataSetter)
+
+    def test_reads(self):
+        context = Scope({"bot": self.bot, "args": {"x": {"y": 2}}})
+
+        self.assertEqual(accessor("$$bot.data.user.name")(context), "u1")
+        self.assertEqual(accessor("$$args.x.y")(context), 2)
+        # Bare names fall back to the bot's data.
+        self.assertEqual(accessor("$$user.name")(context), "u1")
+        self.assertIsNone(accessor("$$bot.data.missing.name")(context))
+        self.assertIsNone(accessor("$$args.x.z.w")(context))
+
+    def test_writes(self):
+        context = Scope({"bot": self.bot})
+        stamp = self.bot.data.stamp("user")
+
+        setter("bot.data.value")(context, 5)
+        setter("bot.data.user.name")(context, "u2")
+        setter("local")(context, 1)
+
+        self.assertEqual(self.bot.data["value"], 5)
+        self.assertEqual(self.bot.data["user"]["name"], "u2")
+        self.assertNotEqual(self.bot.data.stamp("user"), stamp)
+        self.assertEqual(context["local"], 1)
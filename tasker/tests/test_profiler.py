@@ -0,0 +1,54 @@
+import unittest
+
+from . import sleeping_actions, sleeping_bot
+from .. import profiler
+from ..profiler import Profiler
+
+DEFINITION = {
+    "drivers": [{"name": "slow", "default": True, "driver": "notify"}],
+    "actions": sleeping_actions(1, 0.1),
+}
+
+
+class ProfilerTest(unittest.TestCase):
+    def test_samples_carry_dsl_labels(self):
+        bot = sleeping_bot(DEFINITION)
+        profile = Profiler(bot, interval=0.002)
+
+        profile.start()
+        try:
+            bot.execute()
+        finally:
+            profile.stop()
+
+        stacks = profile.collapsed().splitlines()
+        self.assertTrue(stacks)
+        self.assertTrue(all("action:action_0" in stack for stack in stacks))
+        self.assertTrue(any("driver:slow.wait" in stack for stack in stacks))
+        self.assertEqual(profiler.active, 0)
+
+    def test_other_bots_are_left_out(self):
+        profile = Profiler(sleeping_bot(DEFINITION), interval=0.002)
+
+        profile.start()
+        try:
+            sleeping_bot(DEFINITION).execute()
+        finally:
+            profile.stop()
+
+        self.assertEqual(profile.collapsed(), "")
+
+    def test_labels_are_only_pushed_while_profiling(self):
+        bot = sleeping_bot(DEFINITION)
+        pushed = []
+        bot.add_action("peek", lambda: pushed.append(any(profiler._labels.values())))
+
+        bot.execute_action("peek")
+        profile = Profiler(bot)
+        profile.start()
+        try:
+            bot.execute_action("peek")
+        finally:
+            profile.stop()
+
+        self.assertEqual(pushed, [False, True])
@@ -0,0 +1,97 @@
+import unittest
+
+from . import create_bot
+from ..registry import BotRegistry
+
+DEFINITION = {
+    "drivers": [{"name": "calc", "default": True, "driver": "notify"}],
+    "actions": {"add": {"$$exec": {"action": "add", "driver": True, "args": {"x": 1, "y": 2}}}},
+}
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def factory(bot_data):
+    bot = create_bot(bot_data)
+    bot.definition = {key: value for key, value in bot_data.items() if key != "data"}
+    return bot
+
+
+class BotRegistryTest(unittest.TestCase):
+    def setUp(self):
+        self.clock = Clock()
+        self.bots = BotRegistry(factory, max_bots=2, idle_seconds=60, clock=self.clock)
+        for index in range(3):
+            self.bots[f"bot_{index}"] = factory({**DEFINITION, "data": {"n": index}})
+
+    def test_least_recently_used_are_parked(self):
+        self.assertEqual(list(self.bots.live), ["bot_1", "bot_2"])
+        self.assertEqual(list(self.bots.parked), ["bot_0"])
+        self.assertEqual(len(self.bots), 3)
+
+    def test_parked_bots_are_rebuilt_with_their_data(self):
+        self.assertEqual(self.bots.peek("bot_0"), ({"n": 0}, ["add"]))
+
+        bot = self.bots["bot_0"]
+
+        self.assertEqual(bot.data["n"], 0)
+        self.assertEqual(bot.name, "bot_0")
+        self.assertNotIn("bot_1", self.bots.live)
+
+    def test_idle_bots_are_evicted(self):
+        self.clock.now = 30
+        self.bots["bot_2"]
+        self.clock.now = 61
+
+        self.assertEqual(self.bots.evict_idle(), 1)
+        self.assertEqual(list(self.bots.live), ["bot_2"])
+
+    def test_bots_with_listeners_stay(self):
+        self.bots["bot_1"].on("tick", lambda: None)
+        self.clock.now = 61
+
+        self.bots.evict_idle()
+
+        self.assertIn("bot_1", self.bots.live)
+
+    def test_pinned_bot_stays_the_same_instance(self):
+        with self.bots.pin("bot_1"):
+            bot = self.bots["bot_1"]
+            self.bots["bot_3"] = factory(DEFINITION)
+            self.bots["bot_0"]
+            self.clock.now = 61
+            self.bots.evict_idle()
+
+            self.assertIs(self.bots["bot_1"], bot)
+            bot.data["n"] = 10
+
+        self.assertEqual(self.bots.pins, {})
+        self.clock.now = 200
+        self.bots.evict_idle()
+        self.assertEqual(self.bots["bot_1"].data["n"], 10)
+
+    def test_pins_nest(self):
+        with self.bots.pin("bot_1"):
+            with self.bots.pin("bot_1"):
+                self.assertEqual(self.bots.pins, {"bot_1": 2})
+            self.assertEqual(self.bots.pins, {"bot_1": 1})
+        self.assertEqual(self.bots.pins, {})
+
+    def test_failed_build_keeps_the_bot(self):
+        def failing(bot_data):
+            self.bots.factory = factory
+            raise RuntimeError("cannot build")
+
+        self.bots.factory = failing
+        with self.assertRaises(RuntimeError):
+            self.bots["bot_0"]
+
+        self.assertIn("bot_0", self.bots.parked)
+        self.assertEqual(self.bots["bot_0"].data["n"], 0)
+        self.assertNotIn("bot_0", self.bots.parked)
@@ -0,0 +1,44 @@
+import unittest
+
+from ..bots import Bot
+from ..router import EventRouter
+
+
+class RouterTest(unittest.TestCase):
+    def test_listeners_follow_event_type_registration_order(self):
+        router = EventRouter()
+        first = router.on("action.execute", lambda: "first")
+        pattern = router.on("action.*", lambda: "pattern")
+        last = router.on("action.execute", lambda: "last")
+
+        self.assertEqual(router.resolve("action.execute"), (first, last, pattern))
+        self.assertEqual(router.resolve("action.execute:before"), (pattern,))
+        self.assertEqual(router.resolve("trigger.add"), ())
+
+    def test_off_invalidates_resolved_listeners(self):
+        router = EventRouter()
+        listener = router.on("action.*", lambda: None)
+        self.assertEqual(router.resolve("action.add"), (listener,))
+
+        router.off("action.*", listener)
+
+        self.assertEqual(router.resolve("action.add"), ())
+        self.assertFalse(router)
+
+    def test_bot_dispatch(self):
+        bot = Bot()
+        calls = []
+        bot.on("action.add", lambda action: calls.append(("exact", action)))
+        bot.on("action.add:*", lambda action: calls.append(("before", action)))
+
+        bot.add_action("run", lambda: None)
+        bot.dispatch("other")
+
+        self.assertEqual(calls, [("before", "run"), ("exact", "run")])
+
+    def test_dispatch_wraps_listener_errors(self):
+        bot = Bot()
+        bot.on("boom", lambda: 1 / 0)
+
+        with self.assertRaisesRegex(RuntimeError, "Error dispatching event: 'boom'"):
+            bot.dispatch("boom")
@@ -0,0 +1,34 @@
+import unittest
+
+from ..scope import Scope
+
+
+class ScopeTest(unittest.TestCase):
+    def test_lookups_walk_outwards(self):
+        root = Scope({"bot": "bot", "args": {"x": 1}})
+        local = root.child({"args": {"x": 2}})
+
+        self.assertEqual(local["args"], {"x": 2})
+        self.assertEqual(local["bot"], "bot")
+        self.assertEqual(local.get("missing", 3), 3)
+        self.assertIn("bot", local)
+        with self.assertRaises(KeyError):
+            local["missing"]
+
+    def test_child_does_not_copy_or_write_parents(self):
+        vars = {"bot": "bot"}
+        root = Scope(vars)
+        local = root.child()
+
+        local["value"] = 1
+
+        self.assertIs(root.vars, vars)
+        self.assertIs(local.parent, root)
+        self.assertNotIn("value", root)
+        self.assertEqual(local["value"], 1)
+
+    def test_flatten_prefers_inner_frames(self):
+        local = Scope({"a": 1, "b": 1}).child({"b": 2})
+
+        self.assertEqual(dict(local.flatten()), {"a": 1, "b": 2})
+        self.assertEqual({**local}, {"a": 1, "b": 2})
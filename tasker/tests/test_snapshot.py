@@ -0,0 +1,87 @@
+import os
+import random
+import tempfile
+import unittest
+
+from . import create_bot
+from ..registry import BotRegistry
+from ..snapshot import (
+    Snapshot, SnapshotError, SnapshotWriter, encode_data, encode_definition
+)
+
+DEFINITION = {
+    "drivers": [{"name": "calc", "default": True, "driver": "notify"}],
+    "actions": {"add": {"$$exec": {"action": "add", "driver": True, "args": {"x": 1, "y": 2}}}},
+}
+
+
+class SnapshotTest(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, "bots.snapshot")
+
+    def write(self, count: int = 3) -> bytes:
+        writer = SnapshotWriter(self.path)
+        for index in range(count):
+            writer.add(f"bot_{index}", encode_definition(DEFINITION), encode_data({"n": index}))
+        writer.close()
+        with open(self.path, "rb") as file:
+            return file.read()
+
+    def open(self, content: bytes) -> Snapshot:
+        with open(self.path, "wb") as file:
+            file.write(content)
+        return Snapshot(self.path)
+
+    def test_round_trip(self):
+        self.write()
+        snapshot = Snapshot(self.path)
+        self.addCleanup(snapshot.close)
+
+        self.assertEqual(list(snapshot), ["bot_0", "bot_1", "bot_2"])
+        self.assertEqual(snapshot["bot_2"], (DEFINITION, {"n": 2}))
+        # Bots sharing a definition share the decoded object.
+        self.assertIs(snapshot["bot_0"][0], snapshot["bot_1"][0])
+
+    def test_registry_round_trip(self):
+        registry = BotRegistry(lambda data: create_bot(data))
+        bot = create_bot({**DEFINITION, "name": "saved"})
+        bot.definition = DEFINITION
+        bot.data["n"] = 7
+        registry["saved"] = bot
+        registry.save(self.path)
+
+        restored = BotRegistry(lambda data: create_bot(data))
+        restored.load(Snapshot(self.path))
+
+        self.assertEqual(restored["saved"].data["n"], 7)
+        self.assertEqual(restored["saved"].execute_action("add"), None)
+
+    def test_truncated_files_raise_snapshot_error(self):
+        content = self.write()
+
+        for length in range(len(content)):
+            with self.subTest(length=length), self.assertRaises(SnapshotError):
+                self.open(content[:length])
+
+    def test_corrupt_bytes_raise_snapshot_error(self):
+        content = self.write()
+        generator = random.Random(0)
+
+        for _ in range(300):
+            corrupt = bytearray(content)
+            for _ in range(generator.randint(1, 4)):
+                corrupt[generator.randrange(len(corrupt))] = generator.randrange(256)
+            try:
+                snapshot = self.open(bytes(corrupt))
+            except SnapshotError:
+                continue
+            try:
+                for bot_id in snapshot:
+                    try:
+                        snapshot[bot_id]
+                    except SnapshotError:
+                        pass
+            finally:
+                snapshot.close()
@@ -0,0 +1,63 @@
+import unittest
+
+from ..templates import Template, TemplateCache
+
+DEFINITION = {
+    "data": {"value": 1},
+    "drivers": [{"name": "calc", "default": True, "driver": "notify"}],
+    "actions": {
+        "double": {
+            "$$exec": {
+                "action": "add",
+                "driver": "calc",
+                "args": {"x": "$$bot.data.value", "y": "$$bot.data.value"},
+                "store": "bot.data.value",
+            }
+        }
+    },
+}
+
+
+class TemplateTest(unittest.TestCase):
+    def setUp(self):
+        self.templates = TemplateCache(maxsize=2)
+
+    def test_same_definition_shares_template(self):
+        template = self.templates.get(DEFINITION)
+
+        self.assertIs(self.templates.get({**DEFINITION, "data": {"value": 5}}), template)
+        self.assertEqual((self.templates.hits, self.templates.misses), (1, 1))
+        self.assertIsNot(
+            self.templates.get({**DEFINITION, "compiler": "python"}), template
+        )
+
+    def test_bots_from_one_template_are_independent(self):
+        template = self.templates.get(DEFINITION)
+        first = template.create({"value": 1})
+        second = template.create({"value": 10})
+
+        first.execute()
+
+        self.assertEqual(first.data["value"], 2)
+        self.assertEqual(second.data["value"], 10)
+        self.assertIsNot(first.drivers["calc"], second.drivers["calc"])
+        self.assertEqual(first.default_driver, "calc")
+
+    def test_least_recently_used_template_is_dropped(self):
+        first = self.templates.get(DEFINITION)
+        self.templates.get({**DEFINITION, "compiler": "python"})
+        self.templates.get({**DEFINITION, "actions": {}})
+
+        self.assertEqual(len(self.templates), 2)
+        self.assertIsNot(self.templates.get(DEFINITION), first)
+
+    def test_unserializable_definition_is_not_cached(self):
+        template = self.templates.get({**DEFINITION, "actions": {"bad": {1, 2}}})
+
+        self.assertIsInstance(template, Template)
+        self.assertIsNone(template.key)
+        self.assertEqual(len(self.templates), 0)
+
+    def test_unknown_compiler(self):
+        with self.assertRaises(ValueError):
+            self.templates.get({**DEFINITION, "compiler": "missing"})
@@ -1,5 +1,7 @@
 
 class BaseTrigger:
+    __slots__ = ("bot",)
+
     def setup(self, bot):
         self.bot = bot
 
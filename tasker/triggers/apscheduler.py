@@ -9,10 +9,14 @@ from apscheduler.triggers.cron import CronTrigger
 
 
 class Trigger(BaseTrigger):
+    __slots__ = ()
+
     def get_scheduler_trigger(self):
         pass
 
 class IntervalTrigger(Trigger):
+    __slots__ = ("interval_seconds",)
+
     def __init__(self, seconds):
         self.interval_seconds = seconds
 
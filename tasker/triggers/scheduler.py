@@ -3,4 +3,4 @@ from scheduler import Scheduler, trigger # pyright: ignore
 from . import BaseTrigger
 
 class ScheduleTrigger(BaseTrigger):
-    pass
+    __slots__ = ()
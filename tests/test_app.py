@@ -0,0 +1,116 @@
+import os
+import tempfile
+import unittest
+
+from starlette.testclient import TestClient
+
+from app import app, bots
+from tasker.snapshot import Snapshot, SnapshotWriter, encode_data, encode_definition
+
+SCALER = {
+    "data": {"factor": 2},
+    "drivers": [{"name": "calc", "default": True, "driver": "notify"}],
+    "actions": {
+        "scale": {
+            "$$exec": {
+                "action": "add",
+                "driver": True,
+                "args": {"x": "$$bot.data.value", "y": "$$bot.data.factor"},
+                "store": "bot.data.result",
+                "returns": "$$bot.data.result",
+            }
+        },
+    },
+}
+
+
+class AppTest(unittest.TestCase):
+    def setUp(self):
+        self.client = TestClient(app)
+        self.bot_id = f"test-{self.id().rsplit('.', 1)[-1]}"
+        response = self.client.post("/bots/create", json={**SCALER, "name": self.bot_id})
+        self.assertTrue(response.json()["success"])
+
+    def tearDown(self):
+        bots.pop(self.bot_id, None)
+        # Handlers pin their bot only while they run.
+        self.assertEqual(bots.pins, {})
+
+    def test_trigger_batch(self):
+        response = self.client.post(
+            f"/bots/{self.bot_id}/trigger/batch?workers=2",
+            json=[{"value": 1}, {"value": 5}, {"value": "x"}],
+        )
+        rows = response.json()["rows"]
+
+        self.assertFalse(response.json()["success"])
+        self.assertEqual(
+            [row["values"] for row in rows[:2]],
+            [[{"action": "scale", "value": 3}], [{"action": "scale", "value": 7}]],
+        )
+        self.assertEqual(rows[2]["errors"][0]["error"], "TypeError")
+        self.assertNotIn("result", self.client.get(f"/bots/{self.bot_id}/data/").json()["data"])
+
+    def test_trigger_batch_ndjson(self):
+        response = self.client.post(
+            f"/bots/{self.bot_id}/trigger/batch",
+            content=b'{"value": 1}\n\n{"value": 2}\n',
+            headers={"content-type": "application/x-ndjson"},
+        )
+
+        self.assertEqual(len(response.json()["rows"]), 2)
+        self.assertTrue(response.json()["success"])
+
+    def test_watch_streams_its_execution(self):
+        with self.client.websocket_connect(f"/bots/{self.bot_id}/watch/") as websocket:
+            websocket.send_json({"value": 1})
+            messages = [websocket.receive_json() for _ in range(3)]
+
+        self.assertEqual([message["type"] for message in messages], ["execute", "return", "execute"])
+        self.assertEqual(messages[1]["value"], {"action": "scale", "value": 3})
+        # Every listener of the watch is removed once the execution ends.
+        self.assertFalse(bots.get(self.bot_id).router)
+
+
+class CorruptSnapshotTest(unittest.TestCase):
+    def setUp(self):
+        self.client = TestClient(app)
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = os.path.join(directory.name, "bots.snapshot")
+
+        writer = SnapshotWriter(path)
+        writer.add("snapshot-good", encode_definition(SCALER), encode_data({"factor": 3}))
+        writer.add("snapshot-bad", encode_definition(SCALER), b"{not json")
+        writer.close()
+
+        saved = bots.snapshot, bots.cold
+        bots.load(Snapshot(path))
+        bots.cold |= saved[1]
+        self.addCleanup(self.restore, *saved)
+
+    def restore(self, snapshot, cold):
+        bots.snapshot.close()
+        bots.snapshot, bots.cold = snapshot, cold
+        bots.failed.clear()
+        bots.pop("snapshot-good", None)
+
+    def test_index_lists_the_good_bots(self):
+        response = self.client.get("/")
+
+        self.assertEqual(response.status_code, 200)
+        index = response.json()["bots"]
+        self.assertEqual(index["snapshot-good"]["data"], {"factor": 3})
+        self.assertNotIn("snapshot-bad", index)
+        self.assertIn("LoggerBot", index)
+        self.assertEqual(bots.failed, {"snapshot-bad"})
+
+    def test_corrupt_bot_is_missing(self):
+        response = self.client.get("/bots/snapshot-bad/data/")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["error"], "ValueError")
+        self.assertNotIn("snapshot-bad", bots)
+        self.assertEqual(
+            self.client.get("/bots/snapshot-good/data/").json()["data"], {"factor": 3}
+        )
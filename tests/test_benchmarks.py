@@ -0,0 +1,51 @@
+import io
+import json
+import unittest
+import contextlib
+
+from benchmarks.suite import BASELINE, calibration, cases, compare, measure
+from tasker.templates import COMPILERS
+
+
+class CompareTest(unittest.TestCase):
+    def compare(self, results, baseline, tolerance=0.25):
+        with contextlib.redirect_stdout(io.StringIO()) as output:
+            passed = compare(results, baseline, tolerance)
+        return passed, output.getvalue()
+
+    def test_ratios_are_compared_not_absolute_times(self):
+        # Ten times slower in usec, but so was the calibration loop.
+        passed, output = self.compare({"case": (100.0, 0.5)}, {"case": 0.5})
+
+        self.assertTrue(passed)
+        self.assertNotIn("SLOWER", output)
+
+    def test_tolerance_band(self):
+        self.assertTrue(self.compare({"case": (1.0, 0.62)}, {"case": 0.5})[0])
+
+        passed, output = self.compare({"case": (1.0, 0.63)}, {"case": 0.5})
+        self.assertFalse(passed)
+        self.assertIn("SLOWER", output)
+
+    def test_new_cases_pass(self):
+        passed, output = self.compare({"case": (1.0, 0.5)}, {})
+
+        self.assertTrue(passed)
+        self.assertIn("new", output)
+
+    def test_calibration_against_itself(self):
+        seconds, ratio = measure(calibration, 3)
+
+        self.assertGreater(seconds, 0)
+        self.assertAlmostEqual(ratio, 1, delta=0.5)
+
+
+class CasesTest(unittest.TestCase):
+    def test_baseline_covers_every_case(self):
+        names = [name for name, _ in cases()]
+        with open(BASELINE) as file:
+            ratios = json.load(file)["ratios"]
+
+        self.assertEqual(sorted(ratios), sorted(names))
+        for compiler_name in COMPILERS:
+            self.assertIn(f"evaluate deep (64) {compiler_name}", names)